@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark registered prepared statements against plain (unprepared) execution
+
+Runs every statement registered with db_pool.register_prepared_statement
+against DATABASE_URL, once with prepare=False (parse + plan every call) and
+once with prepare=True (plan once per connection), and prints per-call latency.
+
+Usage:
+    DATABASE_URL=postgres://... python benchmark_prepared_statements.py [iterations]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import psycopg
+from psycopg.rows import dict_row
+
+# Importing these registers their hot queries
+import utils.credits  # noqa: F401
+import utils.auth_dependency  # noqa: F401
+import routes.publisher  # noqa: F401
+from db_pool import _prepared_statements
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    raise RuntimeError("DATABASE_URL environment variable is not set")
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+
+async def sample_params(conn):
+    """Real ids so the statements hit rows, falling back to a random UUID"""
+    cur = conn.cursor()
+    await cur.execute("SELECT user_id, service_type FROM connected_services LIMIT 1")
+    service = await cur.fetchone()
+    await cur.execute("SELECT id FROM users LIMIT 1")
+    user = await cur.fetchone()
+
+    user_id = str(user["id"]) if user else "00000000-0000-0000-0000-000000000000"
+    if service:
+        service_params = (str(service["user_id"]), service["service_type"])
+    else:
+        service_params = (user_id, "twitter")
+
+    return {
+        "credits.get_user_credits": (user_id,),
+        "auth.get_user_context": (user_id,),
+        "publisher.get_user_service_credentials": service_params,
+    }
+
+
+async def time_calls(conn, sql, params, prepare):
+    cur = conn.cursor()
+    timings = []
+    for _ in range(ITERATIONS):
+        started = time.perf_counter()
+        await cur.execute(sql, params, prepare=prepare)
+        await cur.fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def summarise(timings):
+    timings = sorted(timings)
+    return statistics.mean(timings), timings[len(timings) // 2], timings[int(len(timings) * 0.95)]
+
+
+async def main():
+    print(f"⏱️  Prepared statement benchmark ({ITERATIONS} calls per statement)\n")
+
+    async with await psycopg.AsyncConnection.connect(DATABASE_URL, row_factory=dict_row, autocommit=True) as conn:
+        params_by_name = await sample_params(conn)
+
+        print(f"{'statement':<42} {'plain avg':>10} {'prep avg':>10} {'plain p95':>10} {'prep p95':>10} {'saving':>8}")
+        print("-" * 96)
+
+        for name, sql in sorted(_prepared_statements.items()):
+            params = params_by_name.get(name)
+            if params is None:
+                print(f"{name:<42} (no sample parameters - skipped)")
+                continue
+
+            # Warm the shared buffers so both runs read the same cached pages
+            await time_calls(conn, sql, params, prepare=False)
+
+            plain_avg, _, plain_p95 = summarise(await time_calls(conn, sql, params, prepare=False))
+            prep_avg, _, prep_p95 = summarise(await time_calls(conn, sql, params, prepare=True))
+            saving = plain_avg - prep_avg
+
+            print(
+                f"{name:<42} {plain_avg:>8.3f}ms {prep_avg:>8.3f}ms "
+                f"{plain_p95:>8.3f}ms {prep_p95:>8.3f}ms {saving:>6.3f}ms"
+            )
+
+    print("\n✅ Saving is per call, per statement (network round trip is the same in both runs)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
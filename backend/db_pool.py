@@ -2,35 +2,431 @@
 Database Connection Pool
 Centralized psycopg2 connection pooling for all routes
 Replaces individual get_db_connection() functions in each route file
+
+Async routes should use get_async_db_connection() instead, which is backed
+by a psycopg 3 AsyncConnectionPool and never blocks the event loop.
+
+If DATABASE_REPLICA_URL is set, both accept readonly=True to send heavy
+reads to the replica (falling back to the primary when it lags).
 """
 
 import psycopg2
 from psycopg2 import pool
-from psycopg2.extras import RealDictCursor
+from psycopg.pq import TransactionStatus
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
 import os
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
 from logger import setup_logger
+from query_stats import get_cursor_factory, get_async_cursor_factory
+import asyncio
 import atexit
+import bisect
+import math
+import sys
+import threading
+import time
+import traceback
+import weakref
 
 logger = setup_logger(__name__)
 
+# Connections held longer than this are reported as possible leaks
+LEAK_THRESHOLD_SECONDS = float(os.getenv("DB_POOL_LEAK_THRESHOLD_SECONDS", "30"))
+
+# How long get_db_connection() queues for a free connection before giving up
+CHECKOUT_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_CHECKOUT_TIMEOUT_SECONDS", "5"))
+
+# Shorter default when called on the event loop thread (async route using the
+# sync pool) - waiting there stalls every in-flight request
+LOOP_CHECKOUT_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_LOOP_CHECKOUT_TIMEOUT_SECONDS", "1"))
+
+# Connections older than this are closed and replaced (Railway drops long-lived TCP)
+MAX_LIFETIME_SECONDS = float(os.getenv("DB_POOL_MAX_LIFETIME_SECONDS", "1800"))
+
+# Connections idle longer than this get a cheap SELECT 1 before being handed out
+PING_AFTER_IDLE_SECONDS = float(os.getenv("DB_POOL_PING_AFTER_IDLE_SECONDS", "30"))
+
+# readonly=True falls back to the primary when the replica lags more than this
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+
+# How often the replica lag is re-measured (result is cached in between)
+REPLICA_LAG_CHECK_INTERVAL_SECONDS = float(os.getenv("DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS", "5"))
+
+# Dedicated partition for background jobs (scheduler workers) so they
+# can never take connections the API pools need
+WORKER_POOL_MIN_CONNECTIONS = int(os.getenv("DB_WORKER_POOL_MIN_CONNECTIONS", "1"))
+WORKER_POOL_MAX_CONNECTIONS = int(os.getenv("DB_WORKER_POOL_MAX_CONNECTIONS", "3"))
+
+# Background jobs are not latency sensitive - they queue longer than requests
+WORKER_CHECKOUT_TIMEOUT_SECONDS = float(os.getenv("DB_WORKER_CHECKOUT_TIMEOUT_SECONDS", "30"))
+
+# Server-side prepared statements for registered hot queries. Turn off behind
+# a transaction-mode PgBouncer, which cannot route PREPAREd names - this also
+# disables psycopg's automatic prepares on the async pool.
+PREPARED_STATEMENTS_ENABLED = os.getenv("DB_PREPARED_STATEMENTS_ENABLED", "true").lower() != "false"
+
+# Zero when the replica has replayed everything it received, so an idle
+# primary does not look like replica lag. NULL when not a standby.
+REPLICA_LAG_QUERY = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END AS lag_seconds
+"""
+
+# Upper bounds (ms) of the checkout wait-time histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Files skipped when working out who checked a connection out
+_POOL_INTERNAL_FILES = {"db_pool.py", "contextlib.py"}
+
 # Global connection pool
 _connection_pool = None
 
-def init_connection_pool(minconn=2, maxconn=20):
+# Global async connection pool (psycopg 3)
+_async_connection_pool = None
+_async_last_used = weakref.WeakKeyDictionary()  # conn -> last returned (monotonic)
+
+# Optional read-replica pools (DATABASE_REPLICA_URL)
+_replica_pool = None
+_async_replica_pool = None
+_replica_lag = {"checked_at": None, "lag_seconds": None, "healthy": False}
+_replica_lag_lock = threading.Lock()
+
+# Connection held by the outermost get_db_connection() /
+# get_async_db_connection() block in the current request or task, as
+# (conn, from_replica, owner). Nested calls join it instead of checking out
+# another - but only from the owning thread and task (sync) or task (async):
+# threads started with a copied context (asyncio.to_thread) and tasks created
+# inside the block inherit the variable, and must not share the connection.
+_held_connection = ContextVar("db_held_connection", default=None)
+_held_async_connection = ContextVar("db_held_async_connection", default=None)
+_joined_checkouts = Counter()
+
+# Background worker pool (sync, capped separately)
+_worker_pool = None
+_worker_pool_lock = threading.Lock()
+
+# Async jobs run their worker-pool queries on these threads (see
+# run_in_worker_pool), one per worker connection
+_worker_executor = ThreadPoolExecutor(max_workers=WORKER_POOL_MAX_CONNECTIONS, thread_name_prefix="db-worker")
+
+# Prepared statement registry: name -> SQL, plus which names each async
+# connection has already prepared
+_prepared_statements = {}
+_prepared_on = weakref.WeakKeyDictionary()  # conn -> set of statement names
+_prepared_counts = Counter()
+
+
+class PoolTimeoutError(Exception):
+    """
+    Raised when no pooled connection frees up before the checkout deadline
+
+    main.py turns this into a 503 with a Retry-After header.
+    """
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.retry_after = max(1, math.ceil(timeout))
+        super().__init__(f"No database connection available within {timeout:g}s")
+
+
+def _checkout_timeout(timeout=None):
+    """Resolve the checkout deadline, capping the default on the event loop thread"""
+    if timeout is not None:
+        return timeout
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return CHECKOUT_TIMEOUT_SECONDS
+
+    return min(CHECKOUT_TIMEOUT_SECONDS, LOOP_CHECKOUT_TIMEOUT_SECONDS)
+
+
+def _sync_owner():
+    """Owner of a sync checkout: this thread, and the task running on it (if any)"""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return threading.get_ident(), task
+
+
+def _find_call_site(frame):
+    """Return "file:line function" of the first frame outside the pool code"""
+    while frame is not None:
+        filename = os.path.basename(frame.f_code.co_filename)
+        if filename not in _POOL_INTERNAL_FILES:
+            return f"{filename}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+class InstrumentedConnectionPool(pool.ThreadedConnectionPool):
+    """
+    ThreadedConnectionPool with queued checkout and usage metrics
+
+    When every connection is in use, getconn() waits in a FIFO queue until
+    one is returned or the timeout expires (PoolTimeoutError), instead of
+    psycopg2's immediate "connection pool exhausted" PoolError.
+
+    Before a connection is handed out it is discarded and replaced if it is
+    closed or older than max_lifetime, and pinged with SELECT 1 if it has
+    been idle longer than ping_after_idle. Closed or expired connections
+    are never put back into the pool.
+
+    Tracks:
+    - In-use and idle connection counts
+    - Checkout wait-time histogram (WAIT_BUCKETS_MS)
+    - Checkouts per call site ("file:line function")
+    - Connections held longer than leak_threshold, with the acquiring stack
+
+    Stack capture skips source line lookup, so the per-checkout overhead
+    stays in the low microseconds.
+    """
+
+    def __init__(self, minconn, maxconn, *args, leak_threshold=LEAK_THRESHOLD_SECONDS,
+                 max_lifetime=MAX_LIFETIME_SECONDS, ping_after_idle=PING_AFTER_IDLE_SECONDS, **kwargs):
+        super().__init__(minconn, maxconn, *args, **kwargs)
+        self.leak_threshold = leak_threshold
+        self.max_lifetime = max_lifetime
+        self.ping_after_idle = ping_after_idle
+        self._born = weakref.WeakKeyDictionary()       # conn -> first seen (monotonic)
+        self._last_used = weakref.WeakKeyDictionary()  # conn -> last returned (monotonic)
+        self._available = threading.Condition(self._lock)
+        self._waiters = deque()
+        self._stats_lock = threading.Lock()
+        self._checked_out = {}  # id(conn) -> (acquired_at, call_site, stack)
+        self._wait_histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self._wait_total_ms = 0.0
+        self._wait_max_ms = 0.0
+        self._checkouts = 0
+        self._checkout_errors = 0
+        self._checkout_timeouts = 0
+        self._long_holds = 0
+        self._discarded = Counter()  # reason -> count
+        self._call_sites = Counter()
+
+    def _has_capacity(self):
+        return bool(self._pool) or len(self._used) < self.maxconn
+
+    def _checkout(self, key, deadline):
+        """Wait (FIFO) until a connection is free and take it, or return None at the deadline"""
+        with self._available:
+            waiter = object()
+            self._waiters.append(waiter)
+            try:
+                while self._waiters[0] is not waiter or not self._has_capacity():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    self._available.wait(remaining)
+
+                return self._getconn(key)
+            finally:
+                self._waiters.remove(waiter)
+                # Let the next waiter re-check now the head of the queue moved
+                self._available.notify_all()
+
+    def _unusable_reason(self, conn):
+        """Return why conn must not be handed out, or None if it is healthy"""
+        if conn.closed:
+            return "closed"
+
+        now = time.monotonic()
+        if now - self._born.setdefault(conn, now) > self.max_lifetime:
+            return "expired"
+
+        last_used = self._last_used.get(conn)
+        if last_used is not None and now - last_used > self.ping_after_idle:
+            try:
+                autocommit = conn.autocommit
+                conn.autocommit = True  # Keep the ping to a single round trip
+                try:
+                    cur = conn.cursor()
+                    cur.execute("SELECT 1")
+                    cur.close()
+                finally:
+                    conn.autocommit = autocommit
+            except psycopg2.Error:
+                return "ping_failed"
+
+        return None
+
+    def _discard(self, conn, reason):
+        """Close a checked-out connection and free its slot"""
+        with self._available:
+            self._putconn(conn, close=True)
+            self._available.notify_all()
+
+        with self._stats_lock:
+            self._discarded[reason] += 1
+        logger.info(f"♻️  Discarded pooled connection ({reason})")
+
+    def getconn(self, key=None, timeout=None):
+        """
+        Get a healthy connection, queueing up to `timeout` seconds if none are free
+
+        Raises:
+            PoolTimeoutError: If no connection is returned before the deadline
+        """
+        if timeout is None:
+            timeout = CHECKOUT_TIMEOUT_SECONDS
+
+        started = time.perf_counter()
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                conn = self._checkout(key, deadline)
+                if conn is None:
+                    raise PoolTimeoutError(timeout)
+                reason = self._unusable_reason(conn)
+                if reason is None:
+                    break
+                self._discard(conn, reason)
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self._checkout_timeouts += 1
+            logger.warning(f"⚠️  Connection pool exhausted: no connection within {timeout:g}s")
+            raise
+        except Exception:
+            with self._stats_lock:
+                self._checkout_errors += 1
+            raise
+        waited_ms = (time.perf_counter() - started) * 1000
+
+        frame = sys._getframe(1)
+        call_site = _find_call_site(frame)
+        stack = traceback.StackSummary.extract(
+            traceback.walk_stack(frame), limit=15, lookup_lines=False
+        )
+
+        with self._stats_lock:
+            self._checkouts += 1
+            self._wait_total_ms += waited_ms
+            self._wait_max_ms = max(self._wait_max_ms, waited_ms)
+            self._wait_histogram[bisect.bisect_left(WAIT_BUCKETS_MS, waited_ms)] += 1
+            self._call_sites[call_site] += 1
+            self._checked_out[id(conn)] = (time.monotonic(), call_site, stack)
+
+        return conn
+
+    def putconn(self, conn=None, key=None, close=False):
+        with self._stats_lock:
+            checkout = self._checked_out.pop(id(conn), None)
+
+        if checkout:
+            held = time.monotonic() - checkout[0]
+            if held > self.leak_threshold:
+                with self._stats_lock:
+                    self._long_holds += 1
+                logger.warning(
+                    f"⚠️  Connection held for {held:.1f}s (threshold {self.leak_threshold}s) by {checkout[1]}"
+                )
+
+        # Never return a dead or expired connection to the pool
+        if not close and not conn.closed:
+            born = self._born.get(conn)
+            close = born is not None and time.monotonic() - born > self.max_lifetime
+
+        with self._available:
+            self._putconn(conn, key, close)
+            self._last_used[conn] = time.monotonic()
+            self._available.notify_all()
+
+    def get_leaked_connections(self):
+        """
+        Get connections currently held longer than leak_threshold
+
+        Returns:
+            list: [{"call_site", "held_seconds", "stack"}], longest held first
+        """
+        now = time.monotonic()
+        with self._stats_lock:
+            checkouts = list(self._checked_out.values())
+
+        leaks = [
+            {
+                "call_site": call_site,
+                "held_seconds": round(now - acquired_at, 1),
+                "stack": "".join(reversed(stack.format())),
+            }
+            for acquired_at, call_site, stack in checkouts
+            if now - acquired_at > self.leak_threshold
+        ]
+        return sorted(leaks, key=lambda leak: leak["held_seconds"], reverse=True)
+
+    def get_stats(self, top_call_sites=10):
+        """
+        Get a snapshot of pool usage metrics
+
+        Args:
+            top_call_sites: Number of busiest call sites to include
+        """
+        with self._lock:
+            in_use = len(self._used)
+            idle = len(self._pool)
+            waiting = len(self._waiters)
+
+        with self._stats_lock:
+            labels = [f"<={bound}ms" for bound in WAIT_BUCKETS_MS] + [f">{WAIT_BUCKETS_MS[-1]}ms"]
+            return {
+                "in_use": in_use,
+                "idle": idle,
+                "waiting": waiting,
+                "utilisation": round(in_use / self.maxconn, 2) if self.maxconn else 0,
+                "checkouts": self._checkouts,
+                "checkout_errors": self._checkout_errors,
+                "checkout_timeouts": self._checkout_timeouts,
+                "long_holds": self._long_holds,
+                "discarded": dict(self._discarded),
+                "wait_ms": {
+                    "avg": round(self._wait_total_ms / self._checkouts, 2) if self._checkouts else 0,
+                    "max": round(self._wait_max_ms, 2),
+                    "histogram": dict(zip(labels, self._wait_histogram)),
+                },
+                "top_call_sites": dict(self._call_sites.most_common(top_call_sites)),
+            }
+
+
+def _create_connection_pool(dsn, minconn, maxconn):
+    return InstrumentedConnectionPool(
+        minconn=minconn,
+        maxconn=maxconn,
+        dsn=dsn,
+        cursor_factory=get_cursor_factory(),  # RealDictCursor + query timing
+        # Connection health check settings
+        keepalives=1,              # Enable TCP keepalive
+        keepalives_idle=30,        # Start keepalive probes after 30s
+        keepalives_interval=10,    # Send probe every 10s
+        keepalives_count=5,        # Close connection after 5 failed probes
+        # Timeout settings
+        connect_timeout=10         # Connection timeout in seconds
+    )
+
+
+def init_connection_pool(minconn=2, maxconn=11):
     """
     Initialize the global connection pool
 
     Args:
         minconn: Minimum number of connections in pool (default: 2)
-        maxconn: Maximum number of connections in pool (default: 20)
+        maxconn: Maximum number of connections in pool (default: 11)
 
     Connection pool configuration:
     - Minimum connections: 2 (always available, reduces cold start latency)
-    - Maximum connections: 20 (Railway free tier PostgreSQL limit is 20)
+    - Maximum connections: 11 (Railway free tier PostgreSQL limit is 20,
+      6 belong to the async pool and 3 to the worker pool)
     - Pool type: ThreadedConnectionPool (thread-safe)
+
+    If DATABASE_REPLICA_URL is set, a replica pool of the same size is
+    created too. Failing to reach the replica is logged, not fatal.
     """
-    global _connection_pool
+    global _connection_pool, _replica_pool
 
     if _connection_pool is not None:
         logger.warning("⚠️  Connection pool already initialized")
@@ -42,22 +438,18 @@ def init_connection_pool(minconn=2, maxconn=20):
         raise ValueError("DATABASE_URL environment variable not set")
 
     try:
-        _connection_pool = psycopg2.pool.ThreadedConnectionPool(
-            minconn=minconn,
-            maxconn=maxconn,
-            dsn=DATABASE_URL,
-            cursor_factory=RealDictCursor,
-            # Connection health check settings
-            keepalives=1,              # Enable TCP keepalive
-            keepalives_idle=30,        # Start keepalive probes after 30s
-            keepalives_interval=10,    # Send probe every 10s
-            keepalives_count=5,        # Close connection after 5 failed probes
-            # Timeout settings
-            connect_timeout=10         # Connection timeout in seconds
-        )
+        _connection_pool = _create_connection_pool(DATABASE_URL, minconn, maxconn)
 
         logger.info(f"✅ Database connection pool initialized (min={minconn}, max={maxconn})")
 
+        DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+        if DATABASE_REPLICA_URL:
+            try:
+                _replica_pool = _create_connection_pool(DATABASE_REPLICA_URL, 1, maxconn)
+                logger.info(f"✅ Read-replica connection pool initialized (max={maxconn})")
+            except Exception as e:
+                logger.warning(f"⚠️  Read replica unavailable, reads will use the primary: {str(e)}")
+
         # Register cleanup on exit
         atexit.register(close_all_connections)
 
@@ -85,11 +477,61 @@ def get_connection_pool():
     return _connection_pool
 
 
+def _replica_lag_is_fresh():
+    checked_at = _replica_lag["checked_at"]
+    return checked_at is not None and time.monotonic() - checked_at < REPLICA_LAG_CHECK_INTERVAL_SECONDS
+
+
+def _record_replica_lag(lag_seconds=None, error=None):
+    """Cache the latest replica lag measurement and whether reads may use it"""
+    with _replica_lag_lock:
+        was_healthy = _replica_lag["healthy"]
+        healthy = error is None and (lag_seconds is None or lag_seconds <= REPLICA_MAX_LAG_SECONDS)
+        _replica_lag.update(checked_at=time.monotonic(), lag_seconds=lag_seconds, healthy=healthy)
+
+    if was_healthy and not healthy:
+        reason = error or f"lag {lag_seconds:.1f}s > {REPLICA_MAX_LAG_SECONDS:g}s"
+        logger.warning(f"⚠️  Read replica unhealthy ({reason}), routing reads to primary")
+    elif healthy and not was_healthy:
+        logger.info("✅ Read replica healthy, routing reads to replica")
+
+
+def _replica_is_usable():
+    """Whether readonly checkouts may go to the sync replica pool right now"""
+    if _replica_pool is None:
+        return False
+
+    if not _replica_lag_is_fresh():
+        try:
+            conn = _replica_pool.getconn(timeout=1)
+            try:
+                cur = conn.cursor()
+                cur.execute(REPLICA_LAG_QUERY)
+                lag_seconds = cur.fetchone()["lag_seconds"]
+                cur.close()
+                conn.rollback()
+            finally:
+                _replica_pool.putconn(conn)
+            _record_replica_lag(float(lag_seconds) if lag_seconds is not None else None)
+        except Exception as e:
+            _record_replica_lag(error=str(e))
+
+    return _replica_lag["healthy"]
+
+
 @contextmanager
-def get_db_connection():
+def get_db_connection(timeout=None, readonly=False):
     """
     Context manager to get a connection from the pool
 
+    Args:
+        timeout: Seconds to queue for a free connection (default:
+                 DB_POOL_CHECKOUT_TIMEOUT_SECONDS, or the shorter
+                 DB_POOL_LOOP_CHECKOUT_TIMEOUT_SECONDS on the event loop)
+        readonly: Use the read replica when configured and within
+                  DB_REPLICA_MAX_LAG_SECONDS, otherwise the primary.
+                  Only for reads that tolerate a few seconds of lag.
+
     Usage:
         with get_db_connection() as conn:
             cur = conn.cursor()
@@ -98,32 +540,50 @@ def get_db_connection():
             cur.close()
 
     The connection is automatically returned to the pool when exiting the context.
+
+    Nested calls (e.g. a helper called inside another helper's block) on
+    the same thread and task reuse the outer connection and join its transaction, so
+    a request never holds more than one pooled connection. Only the
+    outermost block rolls back on error and returns the connection, and
+    nested blocks must not commit or roll back themselves. A write nested
+    inside a replica block still gets its own primary connection.
+
+    Raises:
+        PoolTimeoutError: If the pool stays exhausted until the deadline
     """
-    pool_instance = get_connection_pool()
-    conn = None
+    held = _held_connection.get()
+    if held is not None and held[2] == _sync_owner() and (readonly or not held[1]):
+        _joined_checkouts["sync"] += 1
+        yield held[0]
+        return
 
-    try:
-        # Get connection from pool
-        conn = pool_instance.getconn()
+    if readonly and _replica_is_usable():
+        pool_instance = _replica_pool
+    else:
+        pool_instance = get_connection_pool()
 
-        if conn is None:
-            raise Exception("Failed to get connection from pool")
+    # Outside the try: a checkout timeout is not a database error to roll back
+    conn = pool_instance.getconn(timeout=_checkout_timeout(timeout))
+    token = _held_connection.set((conn, pool_instance is _replica_pool, _sync_owner()))
 
+    try:
         yield conn
 
     except Exception as e:
-        if conn:
+        # A dropped server connection is already closed - rolling back would
+        # raise InterfaceError and hide the real error
+        if not conn.closed:
             conn.rollback()
         logger.error(f"❌ Database error: {str(e)}")
         raise
 
     finally:
-        # Always return connection to pool
-        if conn:
-            pool_instance.putconn(conn)
+        _held_connection.reset(token)
+        # Always return connection to pool (closed ones are discarded)
+        pool_instance.putconn(conn)
 
 
-def get_db_connection_legacy():
+def get_db_connection_legacy(timeout=None):
     """
     Legacy non-context-manager connection getter
     For backward compatibility with old code patterns
@@ -142,7 +602,7 @@ def get_db_connection_legacy():
             return_connection(conn)
     """
     pool_instance = get_connection_pool()
-    return pool_instance.getconn()
+    return pool_instance.getconn(timeout=_checkout_timeout(timeout))
 
 
 def return_connection(conn):
@@ -157,12 +617,114 @@ def return_connection(conn):
         pool_instance.putconn(conn)
 
 
+def init_worker_pool(minconn=WORKER_POOL_MIN_CONNECTIONS, maxconn=WORKER_POOL_MAX_CONNECTIONS):
+    """
+    Initialize the background worker pool
+
+    Args:
+        minconn: Connections kept open between job runs (default: 1)
+        maxconn: Hard cap for all background jobs together (default: 3)
+
+    Called from the FastAPI startup handler. get_worker_db_connection()
+    initializes it on first use too, so workers also run standalone.
+    """
+    global _worker_pool
+
+    with _worker_pool_lock:
+        if _worker_pool is not None:
+            return _worker_pool
+
+        DATABASE_URL = os.getenv("DATABASE_URL")
+
+        if not DATABASE_URL:
+            raise ValueError("DATABASE_URL environment variable not set")
+
+        _worker_pool = _create_connection_pool(DATABASE_URL, minconn, maxconn)
+        logger.info(f"✅ Worker connection pool initialized (min={minconn}, max={maxconn})")
+
+        atexit.register(close_all_connections)
+
+        return _worker_pool
+
+
+@contextmanager
+def get_worker_db_connection(timeout=WORKER_CHECKOUT_TIMEOUT_SECONDS):
+    """
+    Context manager to get a connection from the background worker pool
+
+    Use from scheduler jobs instead of psycopg2.connect().
+    Same semantics as get_db_connection() (dict rows, rollback on error,
+    connection returned on exit), but drawn from a separate, capped pool.
+
+    Args:
+        timeout: Seconds to queue for a free connection
+                 (default: DB_WORKER_CHECKOUT_TIMEOUT_SECONDS)
+
+    Usage:
+        with get_worker_db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT ...")
+            conn.commit()
+
+    Raises:
+        PoolTimeoutError: If every worker connection stays busy until the deadline
+    """
+    pool_instance = _worker_pool or init_worker_pool()
+
+    conn = pool_instance.getconn(timeout=timeout)
+
+    try:
+        yield conn
+
+    except Exception as e:
+        if not conn.closed:
+            conn.rollback()
+        logger.error(f"❌ Database error in background job: {str(e)}")
+        raise
+
+    finally:
+        pool_instance.putconn(conn)
+
+
+async def run_in_worker_pool(func, *args):
+    """
+    Run a blocking function that uses get_worker_db_connection() from async code
+
+    Use instead of asyncio.to_thread() in background jobs. The scheduler,
+    dispatcher and comment monitor together run far more concurrent tasks
+    than the worker pool has connections; this caps their checkouts in flight
+    at the pool size, and extra calls queue here (no deadline) instead of
+    timing out in the pool with PoolTimeoutError.
+
+    Usage:
+        renewed = await run_in_worker_pool(_renew_claim, post_id, worker_id)
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_worker_executor, func, *args)
+
+
 def close_all_connections():
     """
     Close all connections in the pool
     Called automatically on application shutdown
     """
-    global _connection_pool
+    global _connection_pool, _replica_pool, _worker_pool
+
+    if _worker_pool is not None:
+        try:
+            _worker_pool.closeall()
+        except Exception as e:
+            logger.error(f"❌ Error closing worker connections: {str(e)}")
+        finally:
+            _worker_pool = None
+
+    if _replica_pool is not None:
+        try:
+            _replica_pool.closeall()
+        except Exception as e:
+            logger.error(f"❌ Error closing replica connections: {str(e)}")
+        finally:
+            _replica_pool = None
 
     if _connection_pool is not None:
         try:
@@ -174,25 +736,322 @@ def close_all_connections():
             _connection_pool = None
 
 
+# ============================================================================
+# ASYNC CONNECTION POOL
+# ============================================================================
+
+async def _check_async_connection(conn):
+    """Pool `check` callback: ping connections that sat idle past PING_AFTER_IDLE_SECONDS"""
+    last_used = _async_last_used.get(conn)
+    if last_used is not None and time.monotonic() - last_used > PING_AFTER_IDLE_SECONDS:
+        await AsyncConnectionPool.check_connection(conn)
+
+
+def _create_async_connection_pool(dsn, minconn, maxconn):
+    kwargs = {
+        "row_factory": dict_row,  # Dict rows, same as RealDictCursor
+        "cursor_factory": get_async_cursor_factory(),
+        "keepalives": 1,
+        "keepalives_idle": 30,
+        "keepalives_interval": 10,
+        "keepalives_count": 5,
+        "connect_timeout": 10,
+    }
+    if not PREPARED_STATEMENTS_ENABLED:
+        # psycopg also prepares any query run 5+ times on its own - turn that off too
+        kwargs["prepare_threshold"] = None
+
+    return AsyncConnectionPool(
+        conninfo=dsn,
+        min_size=minconn,
+        max_size=maxconn,
+        timeout=CHECKOUT_TIMEOUT_SECONDS,
+        max_lifetime=MAX_LIFETIME_SECONDS,
+        check=_check_async_connection,
+        kwargs=kwargs,
+        open=False
+    )
+
+
+async def init_async_connection_pool(minconn=1, maxconn=6):
+    """
+    Initialize the global async connection pool
+
+    Args:
+        minconn: Minimum number of connections in pool (default: 1)
+        maxconn: Maximum number of connections in pool (default: 6)
+
+    The async pool shares the Railway 20-connection limit with the sync
+    pool, so the two maxconn values must add up to at most 20.
+
+    Creates an async replica pool too when DATABASE_REPLICA_URL is set.
+    """
+    global _async_connection_pool, _async_replica_pool
+
+    if _async_connection_pool is not None:
+        logger.warning("⚠️  Async connection pool already initialized")
+        return _async_connection_pool
+
+    DATABASE_URL = os.getenv("DATABASE_URL")
+
+    if not DATABASE_URL:
+        raise ValueError("DATABASE_URL environment variable not set")
+
+    try:
+        _async_connection_pool = _create_async_connection_pool(DATABASE_URL, minconn, maxconn)
+        await _async_connection_pool.open()
+
+        logger.info(f"✅ Async database connection pool initialized (min={minconn}, max={maxconn})")
+
+        DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+        if DATABASE_REPLICA_URL:
+            try:
+                _async_replica_pool = _create_async_connection_pool(DATABASE_REPLICA_URL, 1, maxconn)
+                await _async_replica_pool.open()
+                logger.info(f"✅ Async read-replica connection pool initialized (max={maxconn})")
+            except Exception as e:
+                _async_replica_pool = None
+                logger.warning(f"⚠️  Async read replica unavailable, reads will use the primary: {str(e)}")
+
+        return _async_connection_pool
+
+    except Exception as e:
+        _async_connection_pool = None
+        logger.error(f"❌ Failed to initialize async connection pool: {str(e)}")
+        raise
+
+
+def get_async_connection_pool():
+    """
+    Get the global async connection pool instance
+
+    Raises:
+        RuntimeError: If pool not initialized
+    """
+    if _async_connection_pool is None:
+        raise RuntimeError(
+            "Async connection pool not initialized. Call init_async_connection_pool() first."
+        )
+
+    return _async_connection_pool
+
+
+async def _async_replica_is_usable():
+    """Whether readonly checkouts may go to the async replica pool right now"""
+    if _async_replica_pool is None:
+        return False
+
+    if not _replica_lag_is_fresh():
+        try:
+            async with _async_replica_pool.connection(timeout=1) as conn:
+                cur = await conn.execute(REPLICA_LAG_QUERY)
+                lag_seconds = (await cur.fetchone())["lag_seconds"]
+            _record_replica_lag(float(lag_seconds) if lag_seconds is not None else None)
+        except Exception as e:
+            _record_replica_lag(error=str(e))
+
+    return _replica_lag["healthy"]
+
+
+@asynccontextmanager
+async def get_async_db_connection(readonly=False):
+    """
+    Async context manager to get a connection from the async pool
+
+    Args:
+        readonly: Use the async read replica when configured and within
+                  DB_REPLICA_MAX_LAG_SECONDS, otherwise the primary
+
+    Usage:
+        async with get_async_db_connection() as conn:
+            cur = conn.cursor()
+            await cur.execute("SELECT * FROM users WHERE id = %s", (user_id,))
+            user = await cur.fetchone()
+            await cur.close()
+
+    Rows come back as dicts, so code written against RealDictCursor works
+    unchanged. As with get_db_connection(), writes must call
+    `await conn.commit()`; anything left uncommitted is rolled back when
+    the connection goes back to the pool.
+
+    Nested calls in the same task reuse the outer connection and join its
+    transaction (see get_db_connection()), so e.g. deduct_credits() and the
+    balance helpers it calls share one connection. Helpers that write should
+    wrap their statements in `async with conn.transaction():` - it commits
+    when the block is outermost and is a savepoint when it was joined.
+    """
+    held = _held_async_connection.get()
+    if held is not None and held[2] is asyncio.current_task() and (readonly or not held[1]):
+        _joined_checkouts["async"] += 1
+        yield held[0]
+        return
+
+    if readonly and await _async_replica_is_usable():
+        pool_instance = _async_replica_pool
+    else:
+        pool_instance = get_async_connection_pool()
+
+    try:
+        conn = await pool_instance.getconn()
+    except PoolTimeout:
+        logger.warning("⚠️  Async connection pool exhausted")
+        raise PoolTimeoutError(pool_instance.timeout) from None
+
+    token = _held_async_connection.set((conn, pool_instance is _async_replica_pool, asyncio.current_task()))
+
+    try:
+        yield conn
+
+    except Exception as e:
+        if not conn.closed:
+            await conn.rollback()
+        logger.error(f"❌ Database error: {str(e)}")
+        raise
+
+    finally:
+        _held_async_connection.reset(token)
+        # Match psycopg2 putconn(): discard any open transaction quietly
+        if not conn.closed and conn.info.transaction_status != TransactionStatus.IDLE:
+            await conn.rollback()
+        _async_last_used[conn] = time.monotonic()
+        await pool_instance.putconn(conn)
+
+
+async def close_async_connections():
+    """
+    Close all connections in the async pool
+    Called from the FastAPI shutdown handler
+    """
+    global _async_connection_pool, _async_replica_pool
+
+    if _async_replica_pool is not None:
+        try:
+            await _async_replica_pool.close()
+        except Exception as e:
+            logger.error(f"❌ Error closing async replica connections: {str(e)}")
+        finally:
+            _async_replica_pool = None
+
+    if _async_connection_pool is not None:
+        try:
+            await _async_connection_pool.close()
+            logger.info("✅ All async database connections closed")
+        except Exception as e:
+            logger.error(f"❌ Error closing async connections: {str(e)}")
+        finally:
+            _async_connection_pool = None
+
+
+def register_prepared_statement(name, sql):
+    """
+    Register a hot query to run as a server-side prepared statement
+
+    Call once at import time from the module that owns the query. The SQL is
+    parsed and planned the first time each pooled connection runs it; later
+    calls on that connection only bind parameters and execute.
+
+    Args:
+        name: Unique statement name (e.g. "credits.get_user_credits")
+        sql: Query text with %s placeholders
+
+    Returns:
+        str: The name, for use with execute_prepared()
+    """
+    existing = _prepared_statements.get(name)
+    if existing is not None and existing != sql:
+        raise ValueError(f"Prepared statement {name!r} already registered with different SQL")
+    _prepared_statements[name] = sql
+    return name
+
+
+async def execute_prepared(cursor, name, params=None):
+    """
+    Execute a registered statement on an async cursor, preparing it on first use
+
+    Usage:
+    ```python
+    GET_BALANCE = register_prepared_statement("credits.balance", "SELECT ... WHERE id = %s")
+
+    async with get_async_db_connection() as conn:
+        cur = conn.cursor()
+        await execute_prepared(cur, GET_BALANCE, (user_id,))
+        row = await cur.fetchone()
+    ```
+    """
+    sql = _prepared_statements[name]
+
+    if not PREPARED_STATEMENTS_ENABLED:
+        return await cursor.execute(sql, params)
+
+    prepared = _prepared_on.setdefault(cursor.connection, set())
+    if name in prepared:
+        _prepared_counts["reused"] += 1
+    else:
+        prepared.add(name)
+        _prepared_counts["prepared"] += 1
+
+    # psycopg keeps the prepared statement in the connection's cache, so it
+    # survives being returned to and checked out of the pool
+    return await cursor.execute(sql, params, prepare=True)
+
+
+def get_prepared_statement_stats():
+    """Registered statements and how often they were prepared vs reused"""
+    return {
+        "enabled": PREPARED_STATEMENTS_ENABLED,
+        "registered": sorted(_prepared_statements),
+        "prepared": _prepared_counts["prepared"],
+        "reused": _prepared_counts["reused"],
+    }
+
+
 def get_pool_status():
     """
     Get current connection pool statistics
 
     Returns:
-        dict: Pool statistics (available, allocated, total)
+        dict: Pool statistics (in use, idle, wait times, call sites, leaks)
     """
     try:
         pool_instance = get_connection_pool()
 
-        # Access internal pool state (psycopg2 doesn't expose this cleanly)
-        # This is a workaround - pool stats aren't officially supported
-        return {
+        status = {
             "status": "healthy",
             "min_connections": pool_instance.minconn,
             "max_connections": pool_instance.maxconn,
-            "note": "psycopg2 pool doesn't expose detailed stats"
+            **pool_instance.get_stats(),
+            "leaked_connections": pool_instance.get_leaked_connections(),
+            "joined_checkouts": dict(_joined_checkouts),
         }
 
+        if _async_connection_pool is not None:
+            async_stats = _async_connection_pool.get_stats()
+            status["async_pool"] = {
+                "min_connections": _async_connection_pool.min_size,
+                "max_connections": _async_connection_pool.max_size,
+                "pool_size": async_stats.get("pool_size", 0),
+                "available": async_stats.get("pool_available", 0),
+                "waiting": async_stats.get("requests_waiting", 0),
+                "prepared_statements": get_prepared_statement_stats(),
+            }
+
+        if _worker_pool is not None:
+            status["worker_pool"] = {
+                "min_connections": _worker_pool.minconn,
+                "max_connections": _worker_pool.maxconn,
+                **_worker_pool.get_stats(),
+                "leaked_connections": _worker_pool.get_leaked_connections(),
+            }
+
+        if _replica_pool is not None:
+            status["replica"] = {
+                **_replica_pool.get_stats(),
+                "healthy": _replica_lag["healthy"],
+                "lag_seconds": _replica_lag["lag_seconds"],
+            }
+
+        return status
+
     except Exception as e:
         return {
             "status": "error",
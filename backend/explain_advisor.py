@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Index advisor - runs EXPLAIN (ANALYZE, BUFFERS) over the app's hot queries
+and reports sequential scans, sorts and slow plans
+
+Point it at a seeded local copy of the database, never production:
+EXPLAIN ANALYZE executes each query (inside a transaction that is rolled back).
+
+Usage:
+    DATABASE_URL=postgresql://localhost/orla3 python explain_advisor.py [--min-rows 1000] [--verbose]
+
+Exit code is 1 if any sequential scan hits a table with at least --min-rows
+rows, so it can gate a CI job that seeds a database.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+# name -> SQL, exactly as the app runs it (%(name)s params filled from sample_params)
+QUERY_CATALOGUE = {
+    "scheduler.due_posts": """
+        SELECT id
+        FROM content_calendar
+        WHERE (status = 'scheduled' AND scheduled_date <= NOW())
+        OR (status = 'retrying' AND next_attempt_at <= NOW())
+        ORDER BY scheduled_date ASC
+        LIMIT 200
+    """,
+    "dispatcher.next_due": """
+        SELECT EXTRACT(EPOCH FROM LEAST(
+            (SELECT MIN(scheduled_date) FROM content_calendar WHERE status = 'scheduled'),
+            (SELECT MIN(lease_expires_at) FROM content_calendar WHERE status = 'publishing'),
+            (SELECT MIN(next_attempt_at) FROM content_calendar WHERE status = 'retrying')
+        ) - NOW())
+    """,
+    "calendar.list_events": """
+        SELECT * FROM content_calendar WHERE user_id = %(user_id)s ORDER BY scheduled_date ASC
+    """,
+    "calendar.due_events_for_user": """
+        SELECT id, title, content_type, platform, content, media_url, notes, scheduled_date
+        FROM content_calendar
+        WHERE user_id = %(user_id)s
+        AND status = 'scheduled'
+        AND scheduled_date <= NOW()
+        ORDER BY scheduled_date ASC
+    """,
+    "library.count": """
+        SELECT COUNT(*) as total FROM content_library WHERE user_id = %(user_id)s
+    """,
+    "library.list": """
+        SELECT id, user_id, title, content_type, status, platform, tags, media_url, created_at
+        FROM content_library
+        WHERE user_id = %(user_id)s
+        ORDER BY created_at DESC
+        LIMIT 50 OFFSET 0
+    """,
+    "publisher.get_user_service_credentials": """
+        SELECT access_token, refresh_token, token_expires_at, service_id, service_metadata, is_active
+        FROM connected_services
+        WHERE user_id = %(user_id)s AND service_type = %(service_type)s AND is_active = true
+        ORDER BY connected_at DESC
+        LIMIT 1
+    """,
+    "credits.get_user_credits": """
+        SELECT credit_balance, monthly_credit_allocation, total_credits_used,
+               total_credits_purchased, last_credit_reset_at
+        FROM users
+        WHERE id = %(user_id)s
+    """,
+    "credits.history": """
+        SELECT id, transaction_type, amount, balance_after, operation_type, operation_details,
+               description, created_at
+        FROM credit_transactions
+        WHERE user_id = %(user_id)s
+        ORDER BY created_at DESC
+        LIMIT 50
+    """,
+    "auth.get_user_context": """
+        SELECT u.current_organization_id, om.role
+        FROM users u
+        LEFT JOIN organization_members om ON om.user_id = u.id
+            AND om.organization_id = u.current_organization_id
+        WHERE u.id = %(user_id)s
+    """,
+}
+
+
+def sample_params(cur):
+    """Use the busiest user so per-user queries see realistic row counts"""
+    cur.execute("""
+        SELECT user_id, COUNT(*) AS n FROM content_library
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id ORDER BY n DESC LIMIT 1
+    """)
+    row = cur.fetchone()
+    if row:
+        user_id = str(row["user_id"])
+    else:
+        cur.execute("SELECT id FROM users LIMIT 1")
+        row = cur.fetchone()
+        user_id = str(row["id"]) if row else "00000000-0000-0000-0000-000000000000"
+
+    cur.execute("SELECT service_type FROM connected_services WHERE user_id = %s LIMIT 1", (user_id,))
+    row = cur.fetchone()
+
+    return {"user_id": user_id, "service_type": row["service_type"] if row else "twitter"}
+
+
+def table_rows(cur):
+    cur.execute("""
+        SELECT relname, GREATEST(reltuples, 0)::bigint AS rows
+        FROM pg_class
+        WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace
+    """)
+    return {row["relname"]: row["rows"] for row in cur.fetchall()}
+
+
+def walk(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from walk(child)
+
+
+def explain(cur, sql, params):
+    cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+    result = cur.fetchone()["QUERY PLAN"]
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-rows", type=int, default=1000,
+                        help="Only flag sequential scans on tables with at least this many rows")
+    parser.add_argument("--verbose", action="store_true", help="Print every plan node")
+    args = parser.parse_args()
+
+    DATABASE_URL = os.getenv("DATABASE_URL")
+    if not DATABASE_URL:
+        print("❌ ERROR: DATABASE_URL environment variable not set")
+        sys.exit(2)
+
+    conn = psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
+    cur = conn.cursor()
+
+    print("=" * 60)
+    print("🔎 ORLA³ INDEX ADVISOR")
+    print("=" * 60)
+
+    params = sample_params(cur)
+    rows_by_table = table_rows(cur)
+    conn.rollback()
+    print(f"👤 Sample user: {params['user_id']}\n")
+
+    problems = 0
+
+    for name, sql in QUERY_CATALOGUE.items():
+        try:
+            result = explain(cur, sql, params)
+        except psycopg2.Error as e:
+            print(f"⚠️  {name}: could not EXPLAIN ({str(e).strip()})\n")
+            continue
+        finally:
+            # EXPLAIN ANALYZE executes the query - never keep its effects
+            conn.rollback()
+
+        plan = result["Plan"]
+        print(f"📄 {name}: {result['Execution Time']:.2f}ms, "
+              f"buffers hit={plan.get('Shared Hit Blocks', 0)} read={plan.get('Shared Read Blocks', 0)}")
+
+        for node in walk(plan):
+            node_type = node["Node Type"]
+            relation = node.get("Relation Name")
+
+            if args.verbose:
+                print(f"     · {node_type} {relation or ''} (rows={node.get('Actual Rows')})")
+
+            if node_type == "Seq Scan":
+                table_size = rows_by_table.get(relation, 0)
+                detail = f"Seq Scan on {relation} ({table_size} rows)"
+                if node.get("Filter"):
+                    detail += f" filter: {node['Filter']}"
+                if table_size >= args.min_rows:
+                    problems += 1
+                    print(f"   ❌ {detail}")
+                else:
+                    print(f"   ℹ️  {detail} - table below --min-rows, planner prefers a scan")
+
+            elif node_type == "Sort" and node.get("Sort Space Type") == "Disk":
+                problems += 1
+                print(f"   ❌ Sort spilled to disk on {node.get('Sort Key')}")
+
+            elif node_type == "Sort":
+                print(f"   ⚠️  Explicit sort on {node.get('Sort Key')} - an index with this order would avoid it")
+
+        print()
+
+    cur.close()
+    conn.close()
+
+    print("=" * 60)
+    if problems:
+        print(f"❌ {problems} problem(s) found - see migrations/016_add_query_shape_indexes.sql for the pattern")
+        sys.exit(1)
+    print("✅ No sequential scans on large tables")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Shared HTTP Clients
+App-lifetime httpx.AsyncClient registry for outbound platform API calls
+
+One client per platform (each with its own connection limits), created on
+first use after startup binds the registry and closed on shutdown. Requests reuse warm keep-alive connections
+instead of paying DNS, TCP and TLS setup on every call. The clients are
+shared by every tenant, so they never store cookies.
+
+    async with http_client("instagram", timeout=TIMEOUTS["upload"]) as client:
+        await client.post(...)
+
+httpx connections belong to the event loop that opened them. The registry
+clients are used on the app's loop; code running on another loop (the
+scheduler's asyncio.run batches) can open an http_client_scope() to share
+clients for its own lifetime, otherwise each http_client() block gets a
+short-lived client of its own.
+"""
+
+import asyncio
+import functools
+import http.cookiejar
+import os
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+import httpx
+
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Per platform client: open connections, idle keep-alive connections, idle expiry
+MAX_CONNECTIONS = int(os.getenv("HTTP_CLIENT_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS", "10"))
+KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS", "30"))
+
+# HTTP/2 multiplexes requests to one host over a single connection (needs the h2 package)
+HTTP2_ENABLED = os.getenv("HTTP_CLIENT_HTTP2", "false").lower() == "true"
+
+# Per-operation timeouts - connecting should always be quick, reads may not be
+TIMEOUTS = {
+    "api": httpx.Timeout(30.0, connect=10.0),
+    "upload": httpx.Timeout(300.0, connect=10.0),
+    "video": httpx.Timeout(600.0, connect=10.0),
+}
+
+_clients = {}
+_app_loop = None
+
+# Clients opened by http_client_scope() on a non-app event loop
+_scoped_clients = ContextVar("scoped_http_clients", default=None)
+
+
+@functools.lru_cache(maxsize=None)
+def _http2_available():
+    """Checked once - clients are created per scheduler batch off the app loop"""
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        logger.warning("⚠️ HTTP_CLIENT_HTTP2=true but the h2 package is not installed - using HTTP/1.1")
+        return False
+
+
+class _RejectAllCookies(http.cookiejar.DefaultCookiePolicy):
+    """Never store or send cookies - one user's Set-Cookie must not reach another's requests"""
+
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+
+def _create_client():
+    return httpx.AsyncClient(
+        cookies=http.cookiejar.CookieJar(policy=_RejectAllCookies()),
+        timeout=TIMEOUTS["api"],
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        http2=_http2_available(),
+    )
+
+
+class _TimeoutClient:
+    """
+    View of a shared client with its own default timeout
+
+    Shared clients can't have their timeout changed per caller, so the
+    operation's timeout is passed on each request instead.
+    """
+
+    _REQUEST_METHODS = {"request", "stream", "build_request", "get", "post", "put", "patch", "delete", "head", "options"}
+
+    def __init__(self, client, timeout):
+        self._client = client
+        self._timeout = timeout
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name not in self._REQUEST_METHODS:
+            return attr
+
+        def with_timeout(*args, **kwargs):
+            kwargs.setdefault("timeout", self._timeout)
+            return attr(*args, **kwargs)
+        return with_timeout
+
+
+def _registry():
+    """Clients usable on the current event loop, or None"""
+    scoped = _scoped_clients.get()
+    if scoped is not None:
+        return scoped
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    return _clients if loop is _app_loop else None
+
+
+@asynccontextmanager
+async def http_client(name: str = "default", timeout=None):
+    """
+    Shared client for one platform
+
+    Args:
+        name: Platform (separate client and connection limits per name)
+        timeout: Default for requests in this block - seconds, httpx.Timeout
+            or a TIMEOUTS key (default: TIMEOUTS["api"])
+
+    Yields:
+        Client with the httpx.AsyncClient request API. Don't close it.
+    """
+    if isinstance(timeout, str):
+        timeout = TIMEOUTS[timeout]
+    elif timeout is None:
+        timeout = TIMEOUTS["api"]
+    elif not isinstance(timeout, httpx.Timeout):
+        timeout = httpx.Timeout(timeout, connect=min(timeout, TIMEOUTS["api"].connect))
+
+    registry = _registry()
+    if registry is None:
+        # Not on a loop the registry serves - one-off client, closed on exit
+        async with _create_client() as client:
+            yield _TimeoutClient(client, timeout)
+        return
+
+    client = registry.get(name)
+    if client is None or client.is_closed:
+        client = registry[name] = _create_client()
+    yield _TimeoutClient(client, timeout)
+
+
+@asynccontextmanager
+async def http_client_scope():
+    """Share clients between http_client() blocks for the duration of this block (non-app loops)"""
+    if _registry() is not None:
+        yield
+        return
+
+    clients = {}
+    token = _scoped_clients.set(clients)
+    try:
+        yield
+    finally:
+        _scoped_clients.reset(token)
+        await _close_clients(clients)
+
+
+async def _close_clients(clients):
+    for name, client in list(clients.items()):
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"⚠️ Error closing HTTP client '{name}': {e}")
+    clients.clear()
+
+
+async def init_http_clients():
+    """Bind the registry to the running (app) event loop - call on startup"""
+    global _app_loop
+    _app_loop = asyncio.get_running_loop()
+    logger.info(
+        f"✅ Shared HTTP clients ready (max {MAX_CONNECTIONS} connections/platform, "
+        f"keep-alive {KEEPALIVE_EXPIRY_SECONDS:g}s, http2={_http2_available()})"
+    )
+
+
+async def close_http_clients():
+    """Close every registry client - call on shutdown"""
+    global _app_loop
+    await _close_clients(_clients)
+    _app_loop = None
+
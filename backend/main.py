@@ -1,6 +1,10 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.exception_handlers import http_exception_handler as default_http_exception_handler
+from fastapi.responses import JSONResponse
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from config import Config
+from db_pool import PoolTimeoutError
 from logger import setup_logger
 from middleware import UserContextMiddleware, RateLimitMiddleware
 from utils.monitoring import init_sentry
@@ -42,6 +46,40 @@ app.add_middleware(UserContextMiddleware)
 # Can be disabled via DISABLE_RATE_LIMITING=true environment variable
 app.add_middleware(RateLimitMiddleware)
 
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    """Turn database pool exhaustion into a retryable 503 instead of a 500"""
+    logger.warning(f"⚠️  {request.method} {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please retry shortly"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def _pool_timeout_cause(exc: BaseException):
+    """The PoolTimeoutError an exception was raised from or while handling, if any"""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        if isinstance(exc, PoolTimeoutError):
+            return exc
+        seen.add(id(exc))
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+@app.exception_handler(StarletteHTTPException)
+async def http_exception_handler(request: Request, exc: StarletteHTTPException):
+    """
+    Most routes catch Exception and re-raise HTTPException(500), which hides
+    PoolTimeoutError from the handler above; answer those with the same 503
+    """
+    if exc.status_code >= 500:
+        pool_timeout = _pool_timeout_cause(exc)
+        if pool_timeout is not None:
+            return await pool_timeout_handler(request, pool_timeout)
+    return await default_http_exception_handler(request, exc)
+
 from routes import carousel, publisher, media, drive, draft, social, social_caption, brand_voice, brand_voice_upload, brand_assets, strategy, calendar, library, competitor, ai_generation, oauth, auth, cloud_storage_oauth, cloud_storage_browse, social_auth, payment, credits, social_engagement, social_discovery, auto_reply_settings, debug, admin, admin_pricing, organization, version, draft_campaign, analytics
 app.include_router(version.router, tags=["version"])
 app.include_router(debug.router, tags=["debug"])
@@ -80,15 +118,22 @@ app.include_router(analytics.router, tags=["analytics"])
 async def startup_event():
     logger.info("🚀 Orla3 Marketing Automation API starting...")
 
-    # Initialize database connection pool
+    # Initialize database connection pools
+    # Sync, async and worker pools share Railway's 20-connection limit (11 + 6 + 3)
     try:
-        from db_pool import init_connection_pool
-        init_connection_pool(minconn=2, maxconn=20)
-        logger.info("✅ Database connection pool initialized")
+        from db_pool import init_connection_pool, init_async_connection_pool, init_worker_pool
+        init_connection_pool(minconn=2, maxconn=11)
+        await init_async_connection_pool(minconn=1, maxconn=6)
+        init_worker_pool(minconn=1, maxconn=3)
+        logger.info("✅ Database connection pools initialized")
     except Exception as e:
         logger.error(f"❌ Failed to initialize connection pool: {e}")
         raise  # Critical error - can't continue without database
 
+    # Shared outbound HTTP clients (keep-alive connections to platform APIs)
+    from http_clients import init_http_clients
+    await init_http_clients()
+
     logger.info(f"✅ Frontend URL: {Config.FRONTEND_URL}")
     logger.info(f"✅ OpenAI API: {'Configured' if Config.OPENAI_API_KEY else 'Missing'}")
     logger.info(f"✅ Anthropic API: {'Configured' if Config.ANTHROPIC_API_KEY else 'Missing'}")
@@ -111,11 +156,12 @@ def read_root():
 async def shutdown_event():
     logger.info("🛑 Orla3 Marketing Automation API shutting down...")
 
-    # Close database connection pool
+    # Close database connection pools
     try:
-        from db_pool import close_all_connections
+        from db_pool import close_all_connections, close_async_connections
         close_all_connections()
-        logger.info("✅ Database connection pool closed")
+        await close_async_connections()
+        logger.info("✅ Database connection pools closed")
     except Exception as e:
         logger.error(f"❌ Error closing connection pool: {e}")
 
@@ -127,6 +173,14 @@ async def shutdown_event():
     except Exception as e:
         logger.error(f"❌ Error stopping scheduler: {e}")
 
+    # Close shared HTTP clients
+    try:
+        from http_clients import close_http_clients
+        await close_http_clients()
+        logger.info("✅ Shared HTTP clients closed")
+    except Exception as e:
+        logger.error(f"❌ Error closing HTTP clients: {e}")
+
 @app.get("/health")
 def health_check():
     """
@@ -152,14 +206,16 @@ def health_check():
     database_url = os.getenv("DATABASE_URL")
     if database_url:
         try:
-            import psycopg2
+            from db_pool import get_db_connection
             start_time = time.time()
-            conn = psycopg2.connect(database_url, connect_timeout=5)
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.fetchone()
+            # Request pool: this is what the API serves from, and busy
+            # background workers must not make a healthy app look down
+            with get_db_connection(timeout=2) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+                cursor.close()
             latency_ms = round((time.time() - start_time) * 1000, 2)
-            conn.close()
             health_status["database"]["connected"] = True
             health_status["database"]["latency_ms"] = latency_ms
         except Exception as e:
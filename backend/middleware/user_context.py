@@ -18,6 +18,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from logger import setup_logger
+from query_stats import current_route
 from utils.auth import decode_token
 
 logger = setup_logger(__name__)
@@ -53,6 +54,9 @@ class UserContextMiddleware(BaseHTTPMiddleware):
     """
 
     async def dispatch(self, request: Request, call_next):
+        # Attribute slow queries to the route that ran them
+        current_route.set(f"{request.method} {request.url.path}")
+
         user_id = SYSTEM_USER_ID
         user_role = 'system_admin'
 
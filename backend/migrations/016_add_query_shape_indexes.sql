@@ -0,0 +1,43 @@
+-- Migration 016: Composite and partial indexes matching hot query shapes
+-- Date: 2026-10-16
+-- Description: The existing indexes are mostly single-column, so the planner
+-- filters or sorts after the index lookup. These match each query's
+-- WHERE + ORDER BY exactly. Check with: python explain_advisor.py
+
+-- Scheduler: WHERE status = 'scheduled' AND scheduled_date <= NOW() ORDER BY scheduled_date
+-- Partial, so it only holds the (small) set of posts still waiting to go out
+CREATE INDEX IF NOT EXISTS idx_content_calendar_due
+ON content_calendar(scheduled_date)
+WHERE status = 'scheduled';
+
+-- Calendar list and publish-due: WHERE user_id = ? [AND status = 'scheduled'] ORDER BY scheduled_date
+CREATE INDEX IF NOT EXISTS idx_content_calendar_user_date
+ON content_calendar(user_id, scheduled_date);
+
+-- Library list: WHERE user_id = ? ORDER BY created_at DESC LIMIT ? OFFSET ?
+CREATE INDEX IF NOT EXISTS idx_content_library_user_created
+ON content_library(user_id, created_at DESC);
+
+-- Publisher credentials: WHERE user_id = ? AND service_type = ? AND is_active = true
+-- ORDER BY connected_at DESC LIMIT 1
+CREATE INDEX IF NOT EXISTS idx_connected_services_active_lookup
+ON connected_services(user_id, service_type, connected_at DESC)
+WHERE is_active = true;
+
+-- Credit history: WHERE user_id = ? ORDER BY created_at DESC LIMIT ?
+CREATE INDEX IF NOT EXISTS idx_credit_transactions_user_created
+ON credit_transactions(user_id, created_at DESC);
+
+-- Single-column user_id indexes are now prefixes of the composites above
+-- and only add write cost
+DROP INDEX IF EXISTS idx_content_calendar_user;
+DROP INDEX IF EXISTS idx_content_library_user;
+DROP INDEX IF EXISTS idx_credit_transactions_user;
+
+ANALYZE content_calendar;
+ANALYZE content_library;
+ANALYZE connected_services;
+ANALYZE credit_transactions;
+
+COMMENT ON INDEX idx_content_calendar_due IS 'Scheduler due-post scan (status = scheduled only)';
+COMMENT ON INDEX idx_connected_services_active_lookup IS 'publisher.get_user_service_credentials lookup';
@@ -0,0 +1,26 @@
+-- Migration 017: Claim scheduled posts with a lease before publishing
+-- Date: 2026-10-16
+-- Description: The post scheduler moves due posts to 'publishing' with
+-- FOR UPDATE SKIP LOCKED, so several scheduler instances can drain the queue
+-- without publishing a post twice. A claim expires after a lease; posts whose
+-- worker died mid-publish are recovered once their lease runs out - since
+-- migration 019 to 'retrying', or 'dead_letter' when out of attempts.
+
+ALTER TABLE content_calendar
+DROP CONSTRAINT IF EXISTS content_calendar_status_check;
+
+ALTER TABLE content_calendar
+ADD CONSTRAINT content_calendar_status_check
+CHECK (status IN ('scheduled', 'publishing', 'published', 'cancelled', 'failed'));
+
+ALTER TABLE content_calendar
+ADD COLUMN IF NOT EXISTS claimed_by TEXT,
+ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+
+-- Lease recovery: WHERE status = 'publishing' AND lease_expires_at < NOW()
+CREATE INDEX IF NOT EXISTS idx_content_calendar_lease
+ON content_calendar(lease_expires_at)
+WHERE status = 'publishing';
+
+COMMENT ON COLUMN content_calendar.claimed_by IS 'Scheduler run that owns a publishing post (NULL otherwise)';
+COMMENT ON COLUMN content_calendar.lease_expires_at IS 'When an unfinished publishing claim is recovered for a retry';
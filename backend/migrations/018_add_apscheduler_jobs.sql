@@ -0,0 +1,20 @@
+-- Migration 018: Persistent APScheduler job store
+-- Date: 2026-10-16
+-- Description: Background jobs used to live in each process's memory, so every
+-- uvicorn worker ran its own post checker and comment monitor. Jobs are now
+-- stored here and only the instance holding the scheduler advisory lock
+-- (pg_try_advisory_lock(hashtext('orla3-background-scheduler'))) runs them.
+-- PostgresJobStore also creates this table on start if it is missing.
+
+CREATE TABLE IF NOT EXISTS apscheduler_jobs (
+    id VARCHAR(191) PRIMARY KEY,
+    next_run_time DOUBLE PRECISION,
+    job_state BYTEA NOT NULL
+);
+
+-- Scheduler wakeup: WHERE next_run_time <= ? / ORDER BY next_run_time LIMIT 1
+CREATE INDEX IF NOT EXISTS idx_apscheduler_jobs_next_run_time
+ON apscheduler_jobs(next_run_time);
+
+COMMENT ON TABLE apscheduler_jobs IS 'Pickled APScheduler jobs (scheduler_jobstore.PostgresJobStore)';
+COMMENT ON COLUMN apscheduler_jobs.next_run_time IS 'UTC epoch seconds; NULL while a job is paused';
@@ -0,0 +1,29 @@
+-- Migration 019: Retry failed publishes with backoff, dead-letter after N attempts
+-- Date: 2026-10-16
+-- Description: A failed publish used to set status = 'failed' and overwrite
+-- notes (which hold the post text) with the error, so one transient platform
+-- 5xx lost the post. Transient failures now go to 'retrying' until
+-- next_attempt_at; permanent ones to 'failed'; posts out of attempts to
+-- 'dead_letter'. Errors are kept in last_error and notes are left alone.
+
+ALTER TABLE content_calendar
+DROP CONSTRAINT IF EXISTS content_calendar_status_check;
+
+ALTER TABLE content_calendar
+ADD CONSTRAINT content_calendar_status_check
+CHECK (status IN ('scheduled', 'publishing', 'retrying', 'published', 'cancelled', 'failed', 'dead_letter'));
+
+ALTER TABLE content_calendar
+ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMPTZ,
+ADD COLUMN IF NOT EXISTS last_error TEXT;
+
+-- Claim: ... OR (status = 'retrying' AND next_attempt_at <= NOW())
+-- Dispatcher: MIN(next_attempt_at) WHERE status = 'retrying'
+CREATE INDEX IF NOT EXISTS idx_content_calendar_retry
+ON content_calendar(next_attempt_at)
+WHERE status = 'retrying';
+
+COMMENT ON COLUMN content_calendar.attempts IS 'Publish attempts started (reset when the user reschedules)';
+COMMENT ON COLUMN content_calendar.next_attempt_at IS 'When a retrying post becomes due again';
+COMMENT ON COLUMN content_calendar.last_error IS 'Error from the most recent failed attempt';
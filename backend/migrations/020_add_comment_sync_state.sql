@@ -0,0 +1,41 @@
+-- Migration 020: Incremental comment sync for the auto-reply monitor
+-- Date: 2026-10-16
+-- Description: The comment monitor used to derive `since` from
+-- auto_reply_settings.last_check_at (our clock) and kept no record of the
+-- comments it had answered, so clock skew or a failed run caused double
+-- replies or missed comments. It now keeps a high-water mark per
+-- (user, platform, post) in the platform's own timestamps, plus an index of
+-- handled comment IDs for the overlap at each mark.
+
+CREATE TABLE IF NOT EXISTS comment_sync_cursors (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    platform VARCHAR(50) NOT NULL,
+    post_id TEXT NOT NULL,
+
+    -- Newest comment timestamp fully handled on this post (platform clock).
+    -- Held back to the oldest unanswered comment when a run stops early.
+    last_comment_at TIMESTAMPTZ NOT NULL,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+
+    PRIMARY KEY (user_id, platform, post_id)
+);
+
+-- Comments the monitor already replied to or deliberately skipped.
+-- Only needs to cover comments at or after the cursors, so old rows are
+-- pruned (COMMENT_MONITOR_SEEN_RETENTION_DAYS).
+CREATE TABLE IF NOT EXISTS seen_comments (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    platform VARCHAR(50) NOT NULL,
+    comment_id TEXT NOT NULL,
+    replied BOOLEAN NOT NULL DEFAULT false,
+    handled_at TIMESTAMPTZ DEFAULT NOW(),
+
+    PRIMARY KEY (user_id, platform, comment_id)
+);
+
+-- Retention sweeps: WHERE handled_at < NOW() - interval / updated_at < ...
+CREATE INDEX IF NOT EXISTS idx_seen_comments_handled_at ON seen_comments(handled_at);
+CREATE INDEX IF NOT EXISTS idx_comment_sync_cursors_updated_at ON comment_sync_cursors(updated_at);
+
+COMMENT ON TABLE comment_sync_cursors IS 'Per-post comment high-water marks for the auto-reply monitor';
+COMMENT ON TABLE seen_comments IS 'Comment IDs the auto-reply monitor has handled (replied or skipped)';
@@ -0,0 +1,30 @@
+-- Migration 021: Cap auto-reply attempts and keep seen IDs the cursors still need
+-- Date: 2026-10-16
+-- Description: A comment whose reply kept failing held its post's cursor
+-- back forever, so every tick refetched the same window and regenerated the
+-- same replies. Once the cursor's updated_at kept being refreshed, the
+-- retention sweep could also delete seen_comments rows still at or after
+-- that cursor, and those comments were answered a second time. Failed
+-- replies are now counted per comment (and given up after
+-- COMMENT_MONITOR_MAX_REPLY_ATTEMPTS), and seen rows record their post and
+-- timestamp so the sweep only drops rows behind the post's cursor.
+
+ALTER TABLE seen_comments
+    ADD COLUMN IF NOT EXISTS post_id TEXT,
+    ADD COLUMN IF NOT EXISTS comment_created_at TIMESTAMPTZ;
+
+-- Failed reply attempts for comments not yet in seen_comments
+CREATE TABLE IF NOT EXISTS comment_reply_attempts (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    platform VARCHAR(50) NOT NULL,
+    comment_id TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+
+    PRIMARY KEY (user_id, platform, comment_id)
+);
+
+-- Retention sweep: WHERE updated_at < NOW() - interval
+CREATE INDEX IF NOT EXISTS idx_comment_reply_attempts_updated_at ON comment_reply_attempts(updated_at);
+
+COMMENT ON TABLE comment_reply_attempts IS 'Failed auto-reply attempts per comment (capped by COMMENT_MONITOR_MAX_REPLY_ATTEMPTS)';
@@ -0,0 +1,13 @@
+-- Migration 022: Allow draft calendar events
+-- Date: 2026-10-16
+-- Description: The calendar API no longer accepts 'publishing', 'retrying'
+-- or 'dead_letter' from clients; those are set by the scheduler, which
+-- holds the publishing claim. The calendar UI creates 'draft' events, which
+-- the constraint did not allow yet.
+
+ALTER TABLE content_calendar
+DROP CONSTRAINT IF EXISTS content_calendar_status_check;
+
+ALTER TABLE content_calendar
+ADD CONSTRAINT content_calendar_status_check
+CHECK (status IN ('draft', 'scheduled', 'publishing', 'retrying', 'published', 'cancelled', 'failed', 'dead_letter'));
@@ -0,0 +1,213 @@
+"""
+Query-Level Instrumentation
+Cursor factories for db_pool that time every execute() and aggregate the
+results per SQL fingerprint (literals and parameters replaced by ?)
+
+Per fingerprint: count, total/avg/p50/p95/max time and rows.
+Statements slower than DB_SLOW_QUERY_MS are logged with the route that ran them.
+
+Configuration via environment variables:
+- DB_QUERY_STATS_ENABLED: Set to "false" to turn instrumentation off (default: true)
+- DB_SLOW_QUERY_MS: Slow query log threshold in milliseconds (default: 500)
+"""
+
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from functools import lru_cache
+
+import psycopg
+from psycopg2.extras import RealDictCursor
+
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+QUERY_STATS_ENABLED = os.getenv("DB_QUERY_STATS_ENABLED", "true").lower() != "false"
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "500"))
+
+# Durations kept per fingerprint for percentiles
+SAMPLES_PER_FINGERPRINT = 256
+
+# New fingerprints beyond this are folded into OVERFLOW_FINGERPRINT
+MAX_FINGERPRINTS = 1000
+OVERFLOW_FINGERPRINT = "<other>"
+
+# "METHOD /path" of the request running the query (set by UserContextMiddleware)
+current_route: ContextVar = ContextVar("current_route", default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMETER = re.compile(r"%(?:\(\w+\))?s")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql: str) -> str:
+    """
+    Normalise SQL so statements differing only in values group together
+
+    Example:
+        "SELECT * FROM users WHERE id = %s AND plan IN ('pro', 'team')"
+        -> "SELECT * FROM users WHERE id = ? AND plan IN (...)"
+    """
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PARAMETER.sub("?", sql)
+    sql = _VALUE_LIST.sub("(...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+class _FingerprintStats:
+    __slots__ = ("count", "total_ms", "max_ms", "rows", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.samples = deque(maxlen=SAMPLES_PER_FINGERPRINT)
+
+
+class QueryStats:
+    """Thread-safe per-fingerprint aggregation of query timings"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._since = time.time()
+
+    def record(self, sql: str, duration_ms: float, rows: int):
+        key = fingerprint(sql)
+
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                if len(self._stats) >= MAX_FINGERPRINTS:
+                    key = OVERFLOW_FINGERPRINT
+                stats = self._stats.setdefault(key, _FingerprintStats())
+            stats.count += 1
+            stats.total_ms += duration_ms
+            stats.max_ms = max(stats.max_ms, duration_ms)
+            stats.rows += max(rows, 0)
+            stats.samples.append(duration_ms)
+
+        if duration_ms >= SLOW_QUERY_MS:
+            route = current_route.get() or "background"
+            logger.warning(f"🐢 Slow query ({duration_ms:.0f}ms) in {route}: {key[:500]}")
+
+    def report(self, top: int = 20, sort: str = "total_ms") -> dict:
+        """
+        Get the top-N fingerprints
+
+        Args:
+            top: Number of fingerprints to return
+            sort: total_ms | avg_ms | p95_ms | max_ms | count | rows
+        """
+        with self._lock:
+            snapshot = [
+                (key, stats.count, stats.total_ms, stats.max_ms, stats.rows, sorted(stats.samples))
+                for key, stats in self._stats.items()
+            ]
+            since = self._since
+
+        queries = []
+        for key, count, total_ms, max_ms, rows, samples in snapshot:
+            queries.append({
+                "fingerprint": key,
+                "count": count,
+                "total_ms": round(total_ms, 2),
+                "avg_ms": round(total_ms / count, 2),
+                "p50_ms": round(samples[int(0.50 * (len(samples) - 1))], 2),
+                "p95_ms": round(samples[int(0.95 * (len(samples) - 1))], 2),
+                "max_ms": round(max_ms, 2),
+                "rows": rows,
+                "avg_rows": round(rows / count, 1),
+            })
+
+        if queries and sort not in queries[0]:
+            sort = "total_ms"
+        queries.sort(key=lambda query: query[sort], reverse=True)
+
+        return {
+            "enabled": QUERY_STATS_ENABLED,
+            "slow_query_ms": SLOW_QUERY_MS,
+            "since": since,
+            "fingerprints": len(snapshot),
+            "total_queries": sum(query["count"] for query in queries),
+            "total_ms": round(sum(query["total_ms"] for query in queries), 2),
+            "queries": queries[:top],
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._since = time.time()
+
+
+query_stats = QueryStats()
+
+
+def _query_text(query, context) -> str:
+    if isinstance(query, str):
+        return query
+    if isinstance(query, bytes):
+        return query.decode("utf-8", "replace")
+    try:
+        return query.as_string(context)  # psycopg2.sql / psycopg.sql Composed
+    except Exception:
+        return str(query)
+
+
+class InstrumentedCursor(RealDictCursor):
+    """RealDictCursor that records every execute() in query_stats"""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            query_stats.record(
+                _query_text(query, self),
+                (time.perf_counter() - started) * 1000,
+                self.rowcount
+            )
+
+
+class InstrumentedAsyncCursor(psycopg.AsyncCursor):
+    """psycopg 3 AsyncCursor that records every execute() in query_stats"""
+
+    async def execute(self, query, params=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().execute(query, params, **kwargs)
+        finally:
+            query_stats.record(
+                _query_text(query, self.connection),
+                (time.perf_counter() - started) * 1000,
+                self.rowcount
+            )
+
+
+def get_cursor_factory():
+    """Cursor factory for the sync pool"""
+    return InstrumentedCursor if QUERY_STATS_ENABLED else RealDictCursor
+
+
+def get_async_cursor_factory():
+    """Cursor factory for the async pool"""
+    return InstrumentedAsyncCursor if QUERY_STATS_ENABLED else psycopg.AsyncCursor
+
+
+def get_query_report(top: int = 20, sort: str = "total_ms") -> dict:
+    """Top-N query fingerprints by `sort` (see QueryStats.report)"""
+    return query_stats.report(top=top, sort=sort)
+
+
+def reset_query_stats():
+    """Clear all collected query statistics"""
+    query_stats.reset()
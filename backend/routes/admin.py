@@ -15,7 +15,8 @@ import stripe
 from datetime import datetime, timedelta
 from utils.auth_dependency import get_current_user_id, verify_super_admin
 from logger import setup_logger
-from db_pool import get_db_connection  # Use connection pool
+from db_pool import get_db_connection, get_pool_status  # Use connection pool
+from query_stats import get_query_report, reset_query_stats
 
 router = APIRouter()
 logger = setup_logger(__name__)
@@ -38,7 +39,7 @@ async def get_platform_overview(admin_id: str = Depends(verify_super_admin)):
     - Content generation stats
     - Growth trends
     """
-    with get_db_connection() as conn:
+    with get_db_connection(readonly=True) as conn:
         cursor = conn.cursor()
         try:
             # User & Organization Metrics
@@ -781,3 +782,43 @@ async def get_audit_log(
             }
         finally:
             cursor.close()
+
+
+# ============================================================================
+# SYSTEM METRICS
+# ============================================================================
+
+@router.get("/admin/system/db-pool")
+async def get_db_pool_metrics(admin_id: str = Depends(verify_super_admin)):
+    """
+    Get database connection pool metrics
+
+    Returns in-use/idle counts, checkout wait-time histogram, busiest call
+    sites and any connections held past the leak threshold (with the stack
+    that acquired them).
+    """
+    return get_pool_status()
+
+
+@router.get("/admin/system/queries")
+async def get_query_metrics(
+    top: int = Query(20, ge=1, le=200),
+    sort: str = Query("total_ms", pattern="^(total_ms|avg_ms|p95_ms|max_ms|count|rows)$"),
+    admin_id: str = Depends(verify_super_admin)
+):
+    """
+    Get the most expensive SQL statements grouped by fingerprint
+
+    Each entry has call count, total/avg/p50/p95/max time and rows returned.
+    Sort by total_ms to find where database time goes overall, or by p95_ms
+    to find the individually slow statements.
+    """
+    return get_query_report(top=top, sort=sort)
+
+
+@router.delete("/admin/system/queries")
+async def reset_query_metrics(admin_id: str = Depends(verify_super_admin)):
+    """Reset query statistics (e.g. before measuring a change)"""
+    reset_query_stats()
+    logger.info(f"🧹 Query statistics reset by admin {admin_id}")
+    return {"success": True}
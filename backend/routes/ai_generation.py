@@ -196,7 +196,7 @@ async def generate_image(image_request: ImageGenerateRequest, request: Request):
 
         # Check and deduct credits BEFORE generating (20 credits for ultra quality)
         try:
-            deduct_credits(
+            await deduct_credits(
                 user_id=user_id,
                 operation_type="ai_image_ultra",
                 operation_details={
@@ -445,7 +445,7 @@ async def generate_video_veo(video_request: VideoGenerateRequest, request: Reque
 
         # Check and deduct credits BEFORE generating (200 credits for 8-second video)
         try:
-            deduct_credits(
+            await deduct_credits(
                 user_id=user_id,
                 operation_type="ai_video_8sec",
                 operation_details={
@@ -137,7 +137,7 @@ async def get_post_analytics(
     start_date = datetime.now() - timedelta(days=days)
 
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(readonly=True) as conn:
             cursor = conn.cursor()
 
             # Fetch published posts with engagement data
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Literal
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import os
@@ -11,6 +11,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from logger import setup_logger
 from db_pool import get_db_connection  # Use connection pool
 from middleware import get_user_id
+from workers.post_dispatcher import notify_schedule_changed
+from workers.post_scheduler import claim_post, finish_post, new_worker_id
 
 router = APIRouter()
 logger = setup_logger(__name__)
@@ -22,12 +24,18 @@ if not DATABASE_URL:
 # Import PublishRequest for publishing
 from routes.publisher import PublishRequest
 
+# Statuses a client may set or send back unchanged when editing an event.
+# 'publishing', 'retrying' and 'dead_letter' belong to the scheduler (a
+# 'publishing' or 'retrying' row without a claim would never be picked up)
+ClientStatus = Literal["draft", "scheduled", "published", "cancelled", "failed"]
+
+
 class ContentItem(BaseModel):
     id: Optional[str] = None
     title: str
     content_type: str
     scheduled_date: str
-    status: str
+    status: ClientStatus
     platform: Optional[str] = None
     content: Optional[str] = None
     media_url: Optional[str] = None
@@ -38,16 +46,16 @@ def get_calendar_events(request: Request):
     """Get all calendar events for the authenticated user"""
     try:
         user_id = get_user_id(request)
-        conn = get_db_connection()
-        cur = conn.cursor()
+        with get_db_connection(readonly=True) as conn:
+            cur = conn.cursor()
 
-        cur.execute(
-            "SELECT * FROM content_calendar WHERE user_id = %s ORDER BY scheduled_date ASC",
-            (str(user_id),)
-        )
+            cur.execute(
+                "SELECT * FROM content_calendar WHERE user_id = %s ORDER BY scheduled_date ASC",
+                (str(user_id),)
+            )
 
-        events = cur.fetchall()
-        cur.close()
+            events = cur.fetchall()
+            cur.close()
 
         logger.info(f"Loaded {len(events)} calendar events for user {user_id}")
         return {"events": events}
@@ -60,32 +68,33 @@ def create_event(item: ContentItem, request: Request):
     """Create a new calendar event for the authenticated user"""
     try:
         user_id = get_user_id(request)
-        conn = get_db_connection()
-        cur = conn.cursor()
+        with get_db_connection() as conn:
+            cur = conn.cursor()
 
-        cur.execute("""
-            INSERT INTO content_calendar (
-                user_id, title, content_type, scheduled_date, status,
-                platform, content, media_url, created_at
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING id, user_id, title, content_type, scheduled_date, status,
-                      platform, content, media_url, created_at
-        """, (
-            str(user_id),
-            item.title,
-            item.content_type,
-            item.scheduled_date,
-            item.status,
-            item.platform,
-            item.content,
-            item.media_url,
-            datetime.now()
-        ))
-
-        event = cur.fetchone()
-        conn.commit()
-        cur.close()
+            cur.execute("""
+                INSERT INTO content_calendar (
+                    user_id, title, content_type, scheduled_date, status,
+                    platform, content, media_url, created_at
+                )
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                RETURNING id, user_id, title, content_type, scheduled_date, status,
+                          platform, content, media_url, created_at
+            """, (
+                str(user_id),
+                item.title,
+                item.content_type,
+                item.scheduled_date,
+                item.status,
+                item.platform,
+                item.content,
+                item.media_url,
+                datetime.now()
+            ))
+
+            event = cur.fetchone()
+            notify_schedule_changed(cur, event['id'])
+            conn.commit()
+            cur.close()
 
         logger.info(f"Created event for user {user_id}: {item.title}")
         return {"success": True, "event": event}
@@ -98,34 +107,49 @@ def update_event(event_id: str, item: ContentItem, request: Request):
     """Update a calendar event (user can only update their own events)"""
     try:
         user_id = get_user_id(request)
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        cur.execute("""
-            UPDATE content_calendar
-            SET title = %s, content_type = %s, scheduled_date = %s, status = %s,
-                platform = %s, content = %s, media_url = %s
-            WHERE id = %s AND user_id = %s
-            RETURNING id, user_id, title, content_type, scheduled_date, status,
-                      platform, content, media_url, created_at
-        """, (
-            item.title,
-            item.content_type,
-            item.scheduled_date,
-            item.status,
-            item.platform,
-            item.content,
-            item.media_url,
-            event_id,
-            str(user_id)
-        ))
-
-        event = cur.fetchone()
-        if not event:
-            raise HTTPException(status_code=404, detail="Event not found or not owned by user")
-
-        conn.commit()
-        cur.close()
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+
+            cur.execute("""
+                UPDATE content_calendar
+                SET title = %s, content_type = %s, scheduled_date = %s, status = %s,
+                    platform = %s, content = %s, media_url = %s,
+                    -- Rescheduling (e.g. a dead-lettered post) starts a fresh retry budget
+                    attempts = CASE WHEN %s = 'scheduled' THEN 0 ELSE attempts END,
+                    next_attempt_at = NULL,
+                    last_error = CASE WHEN %s = 'scheduled' THEN NULL ELSE last_error END
+                WHERE id = %s AND user_id = %s
+                -- A worker holding a live claim is publishing this post right now
+                AND NOT (status = 'publishing' AND lease_expires_at > NOW())
+                RETURNING id, user_id, title, content_type, scheduled_date, status,
+                          platform, content, media_url, created_at
+            """, (
+                item.title,
+                item.content_type,
+                item.scheduled_date,
+                item.status,
+                item.platform,
+                item.content,
+                item.media_url,
+                item.status,
+                item.status,
+                event_id,
+                str(user_id)
+            ))
+
+            event = cur.fetchone()
+            if not event:
+                cur.execute(
+                    "SELECT 1 FROM content_calendar WHERE id = %s AND user_id = %s",
+                    (event_id, str(user_id))
+                )
+                if cur.fetchone():
+                    raise HTTPException(status_code=409, detail="Post is being published right now, try again shortly")
+                raise HTTPException(status_code=404, detail="Event not found or not owned by user")
+
+            notify_schedule_changed(cur, event_id)
+            conn.commit()
+            cur.close()
 
         logger.info(f"Updated event for user {user_id}: {event_id}")
         return {"success": True, "event": event}
@@ -140,20 +164,21 @@ def delete_event(event_id: str, request: Request):
     """Delete a calendar event (user can only delete their own events)"""
     try:
         user_id = get_user_id(request)
-        conn = get_db_connection()
-        cur = conn.cursor()
+        with get_db_connection() as conn:
+            cur = conn.cursor()
 
-        cur.execute(
-            "DELETE FROM content_calendar WHERE id = %s AND user_id = %s RETURNING id",
-            (event_id, str(user_id))
-        )
+            cur.execute(
+                "DELETE FROM content_calendar WHERE id = %s AND user_id = %s RETURNING id",
+                (event_id, str(user_id))
+            )
 
-        deleted_event = cur.fetchone()
-        if not deleted_event:
-            raise HTTPException(status_code=404, detail="Event not found or not owned by user")
+            deleted_event = cur.fetchone()
+            if not deleted_event:
+                raise HTTPException(status_code=404, detail="Event not found or not owned by user")
 
-        conn.commit()
-        cur.close()
+            notify_schedule_changed(cur, event_id)
+            conn.commit()
+            cur.close()
 
         logger.info(f"Deleted event for user {user_id}: {event_id}")
         return {"success": True}
@@ -169,86 +194,56 @@ async def publish_event_now(event_id: str, request: Request):
     """
     Publish a scheduled calendar event immediately
     Updates event status to 'published' or 'failed' after attempt
+
+    The event is claimed like a scheduled post first, so it can't be
+    published twice or overwritten while the scheduler is publishing it.
     """
     try:
         user_id = get_user_id(request)
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        # Get event details
-        cur.execute("""
-            SELECT id, title, content_type, platform, content, media_url, notes
-            FROM content_calendar
-            WHERE id = %s AND user_id = %s
-        """, (event_id, str(user_id)))
-
-        event = cur.fetchone()
+        worker_id = new_worker_id()
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+
+            # Claim the event (status 'publishing' under our lease) and get its details
+            event = claim_post(cur, event_id, str(user_id), worker_id)
+            if not event:
+                cur.execute(
+                    "SELECT status FROM content_calendar WHERE id = %s AND user_id = %s",
+                    (event_id, str(user_id))
+                )
+                existing = cur.fetchone()
+                if existing:
+                    raise HTTPException(status_code=409, detail=f"Post can't be published while it is {existing['status']}")
+                raise HTTPException(status_code=404, detail="Event not found or not owned by user")
 
-        if not event:
+            conn.commit()
             cur.close()
-            raise HTTPException(status_code=404, detail="Event not found or not owned by user")
-
-        # Extract event data
-        platform = event['platform']
-        content = event['content'] or ""
-        media_url = event['media_url']
-
-        # Parse notes for additional data (like subreddit, video_url)
-        import json
-        notes_data = {}
-        if event.get('notes'):
-            try:
-                notes_data = json.loads(event['notes']) if isinstance(event['notes'], str) else event['notes']
-            except (json.JSONDecodeError, ValueError, TypeError):
-                pass
-
-        # Call the publisher endpoint
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            # Get authorization header from request
-            auth_header = request.headers.get('authorization')
-
-            publish_payload = {
-                "platform": platform,
-                "content_type": event['content_type'],
-                "caption": content,
-                "image_urls": [media_url] if media_url and media_url.startswith('http') else [],
-                "video_url": notes_data.get('video_url'),
-                "subreddit": notes_data.get('subreddit'),
-                "title": event['title'],
-                "link_url": notes_data.get('link_url')
-            }
-
-            # Call internal publisher endpoint
-            backend_url = os.getenv("BACKEND_URL", "http://localhost:8000")
-            response = await client.post(
-                f"{backend_url}/publisher/publish",
-                json=publish_payload,
-                headers={"Authorization": auth_header} if auth_header else {}
-            )
 
-            result = response.json()
+        try:
+            result = await _publish_claimed_event(event, request)
+        except Exception as e:
+            logger.error(f"Error publishing event {event_id}: {e}")
+            result = {"success": False, "error": str(e)}
 
-            # Update event status based on result
-            new_status = "published" if result.get("success") else "failed"
-
-            cur.execute("""
-                UPDATE content_calendar
-                SET status = %s, published_at = %s
-                WHERE id = %s AND user_id = %s
-            """, (new_status, datetime.utcnow(), event_id, str(user_id)))
+        # Release the claim with the outcome (no connection held during the publish call)
+        new_status = "published" if result.get("success") else "failed"
 
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            finish_post(cur, event_id, worker_id, new_status,
+                        None if result.get("success") else result.get("error"))
             conn.commit()
             cur.close()
 
-            logger.info(f"Published event {event_id} for user {user_id}: {result.get('success')}")
+        logger.info(f"Published event {event_id} for user {user_id}: {result.get('success')}")
 
-            return {
-                "success": result.get("success"),
-                "message": result.get("message") or ("Published successfully" if result.get("success") else result.get("error")),
-                "post_url": result.get("post_url"),
-                "event_id": event_id,
-                "status": new_status
-            }
+        return {
+            "success": result.get("success"),
+            "message": result.get("message") or ("Published successfully" if result.get("success") else result.get("error")),
+            "post_url": result.get("post_url"),
+            "event_id": event_id,
+            "status": new_status
+        }
 
     except HTTPException:
         raise
@@ -257,29 +252,75 @@ async def publish_event_now(event_id: str, request: Request):
         return {"success": False, "error": str(e)}
 
 
+async def _publish_claimed_event(event, request: Request) -> dict:
+    """Send a claimed event to the publisher endpoint and return its result"""
+    # Extract event data
+    platform = event['platform']
+    content = event['content'] or ""
+    media_url = event['media_url']
+
+    # Parse notes for additional data (like subreddit, video_url)
+    import json
+    notes_data = {}
+    if event.get('notes'):
+        try:
+            notes_data = json.loads(event['notes']) if isinstance(event['notes'], str) else event['notes']
+        except (json.JSONDecodeError, ValueError, TypeError):
+            pass
+
+    # Call the publisher endpoint
+    async with httpx.AsyncClient(timeout=120.0) as client:
+        # Get authorization header from request
+        auth_header = request.headers.get('authorization')
+
+        publish_payload = {
+            "platform": platform,
+            "content_type": event['content_type'],
+            "caption": content,
+            "image_urls": [media_url] if media_url and media_url.startswith('http') else [],
+            "video_url": notes_data.get('video_url'),
+            "subreddit": notes_data.get('subreddit'),
+            "title": event['title'],
+            "link_url": notes_data.get('link_url')
+        }
+
+        # Call internal publisher endpoint
+        backend_url = os.getenv("BACKEND_URL", "http://localhost:8000")
+        response = await client.post(
+            f"{backend_url}/publisher/publish",
+            json=publish_payload,
+            headers={"Authorization": auth_header} if auth_header else {}
+        )
+
+        return response.json()
+
+
 @router.post("/publish-all-due")
 async def publish_all_due_events(request: Request):
     """
     Publish all events that are scheduled for now or earlier
-    Returns summary of published, failed, and total events
+    Returns summary of published, failed, skipped, and total events
+
+    Each event is claimed by publish_event_now(), so events the scheduler
+    picks up in the meantime are skipped rather than published twice.
     """
     try:
         user_id = get_user_id(request)
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        # Get all due events
-        cur.execute("""
-            SELECT id, title, content_type, platform, content, media_url, notes, scheduled_date
-            FROM content_calendar
-            WHERE user_id = %s
-            AND status = 'scheduled'
-            AND scheduled_date <= NOW()
-            ORDER BY scheduled_date ASC
-        """, (str(user_id),))
-
-        due_events = cur.fetchall()
-        cur.close()
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+
+            # Get all due events
+            cur.execute("""
+                SELECT id, title, content_type, platform, content, media_url, notes, scheduled_date
+                FROM content_calendar
+                WHERE user_id = %s
+                AND status = 'scheduled'
+                AND scheduled_date <= NOW()
+                ORDER BY scheduled_date ASC
+            """, (str(user_id),))
+
+            due_events = cur.fetchall()
+            cur.close()
 
         logger.info(f"Found {len(due_events)} due events for user {user_id}")
 
@@ -287,6 +328,7 @@ async def publish_all_due_events(request: Request):
             "total": len(due_events),
             "published": 0,
             "failed": 0,
+            "skipped": 0,
             "results": []
         }
 
@@ -310,6 +352,11 @@ async def publish_all_due_events(request: Request):
                 })
 
             except Exception as e:
+                if isinstance(e, HTTPException) and e.status_code == 409:
+                    # Claimed by the scheduler (or another request) since the listing
+                    results["skipped"] += 1
+                    continue
+
                 logger.error(f"Error publishing event {event['id']}: {e}")
                 results["failed"] += 1
                 results["results"].append({
@@ -320,7 +367,7 @@ async def publish_all_due_events(request: Request):
                     "error": str(e)
                 })
 
-        logger.info(f"Bulk publish complete: {results['published']} published, {results['failed']} failed")
+        logger.info(f"Bulk publish complete: {results['published']} published, {results['failed']} failed, {results['skipped']} skipped")
 
         return {
             "success": True,
@@ -258,7 +258,7 @@ async def analyze_competitor(competitor_id: str, user_id: str = Depends(get_curr
 
         # Check and deduct credits BEFORE analyzing (5 credits)
         try:
-            deduct_credits(
+            await deduct_credits(
                 user_id=user_id,
                 operation_type="competitor_analysis",
                 operation_details={
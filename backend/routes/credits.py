@@ -38,7 +38,7 @@ async def get_credit_balance(user_id: str = Depends(get_current_user_id)):
         }
     """
     try:
-        credit_info = get_user_credits(user_id)
+        credit_info = await get_user_credits(user_id)
 
         # Calculate percentage used this month
         allocation = credit_info['monthly_allocation']
@@ -80,7 +80,7 @@ async def get_transaction_history(limit: int = 50, user_id: str = Depends(get_cu
         # Limit the limit
         limit = min(limit, 200)
 
-        transactions = get_credit_history(user_id, limit)
+        transactions = await get_credit_history(user_id, limit)
 
         return {
             "success": True,
@@ -132,7 +132,7 @@ async def check_credit_availability(operation_type: str, user_id: str = Depends(
             raise HTTPException(status_code=400, detail=f"Invalid operation type: {operation_type}")
 
         # Get user's balance
-        credit_info = get_user_credits(user_id)
+        credit_info = await get_user_credits(user_id)
 
         return {
             "success": True,
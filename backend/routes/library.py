@@ -48,7 +48,7 @@ def get_library_content(request: Request, limit: int = 100, offset: int = 0):
         user_id = get_user_id(request)
         # Convert UUID to string for PostgreSQL compatibility
         user_id_str = str(user_id)
-        with get_db_connection() as conn:
+        with get_db_connection(readonly=True) as conn:
             cur = conn.cursor()
             try:
                 # Get total count
@@ -553,7 +553,7 @@ async def handle_checkout_success(session):
 
         try:
             # Add credits to user's balance
-            result = add_credits(
+            result = await add_credits(
                 user_id=user_id,
                 credits=credits,
                 transaction_type='purchased',
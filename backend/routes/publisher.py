@@ -1,18 +1,25 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Literal, Dict
 import os
+import asyncio
 import httpx
 import json
+import time
 from datetime import datetime
-from requests_oauthlib import OAuth1Session
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.auth_dependency import get_current_user_id
 from logger import setup_logger
-from db_pool import get_db_connection  # Use connection pool
+from db_pool import get_async_db_connection, register_prepared_statement, execute_prepared  # Use connection pool
+from http_clients import http_client
+from utils.media_upload import MediaUploadError, media_download_cache, relay_resumable_upload
+from utils import twitter_media
+from utils.twitter_media import OAuth1Auth
+from utils.platforms import service_type_for
 
 router = APIRouter()
 logger = setup_logger(__name__)
@@ -22,8 +29,23 @@ logger = setup_logger(__name__)
 # MULTI-TENANT AUTH HELPERS
 # ============================================================================
 
-
-def get_user_service_credentials(user_id: str, service_type: str) -> Optional[Dict]:
+# Looked up on every publish - prepared once per pooled connection
+GET_SERVICE_CREDENTIALS = register_prepared_statement("publisher.get_user_service_credentials", """
+    SELECT
+        access_token,
+        refresh_token,
+        token_expires_at,
+        service_id,
+        service_metadata,
+        is_active
+    FROM connected_services
+    WHERE user_id = %s AND service_type = %s AND is_active = true
+    ORDER BY connected_at DESC
+    LIMIT 1
+""")
+
+
+async def get_user_service_credentials(user_id: str, service_type: str) -> Optional[Dict]:
     """
     Get user's OAuth credentials for a specific service from connected_services table
 
@@ -34,24 +56,12 @@ def get_user_service_credentials(user_id: str, service_type: str) -> Optional[Di
     Returns:
         Dict with access_token and other service metadata, or None if not connected
     """
-    with get_db_connection() as conn:
+    async with get_async_db_connection() as conn:
         cur = conn.cursor()
         try:
-            cur.execute("""
-                SELECT
-                    access_token,
-                    refresh_token,
-                    token_expires_at,
-                    service_id,
-                    service_metadata,
-                    is_active
-                FROM connected_services
-                WHERE user_id = %s AND service_type = %s AND is_active = true
-                ORDER BY connected_at DESC
-                LIMIT 1
-            """, (user_id, service_type))
+            await execute_prepared(cur, GET_SERVICE_CREDENTIALS, (user_id, service_type))
 
-            result = cur.fetchone()
+            result = await cur.fetchone()
 
             if not result:
                 logger.warning(f"No active {service_type} connection for user {user_id}")
@@ -63,7 +73,40 @@ def get_user_service_credentials(user_id: str, service_type: str) -> Optional[Di
             logger.error(f"Error fetching service credentials for user {user_id}: {e}")
             return None
         finally:
-            cur.close()
+            await cur.close()
+
+
+async def get_user_services_credentials(user_id: str, service_types: List[str]) -> Dict[str, Dict]:
+    """
+    Credentials for several platforms in one query (fan-out publishing)
+
+    Returns:
+        service_type -> row shaped like get_user_service_credentials() (missing if not connected)
+    """
+    async with get_async_db_connection() as conn:
+        cur = conn.cursor()
+        try:
+            await cur.execute("""
+                SELECT DISTINCT ON (service_type)
+                    service_type,
+                    access_token,
+                    refresh_token,
+                    token_expires_at,
+                    service_id,
+                    service_metadata,
+                    is_active
+                FROM connected_services
+                WHERE user_id = %s AND service_type = ANY(%s) AND is_active = true
+                ORDER BY service_type, connected_at DESC
+            """, (user_id, list(service_types)))
+
+            return {row['service_type']: dict(row) for row in await cur.fetchall()}
+
+        except Exception as e:
+            logger.error(f"Error fetching service credentials for user {user_id}: {e}")
+            return {}
+        finally:
+            await cur.close()
 
 
 router = APIRouter()
@@ -72,8 +115,10 @@ router = APIRouter()
 # MODELS
 # ============================================================================
 
+PlatformName = Literal["instagram", "linkedin", "twitter", "x", "facebook", "tiktok", "youtube", "reddit", "tumblr", "wordpress"]
+
 class PublishRequest(BaseModel):
-    platform: Literal["instagram", "linkedin", "twitter", "x", "facebook", "tiktok", "youtube", "reddit", "tumblr", "wordpress"]
+    platform: PlatformName
     content_type: Literal["text", "image", "video", "carousel", "reel", "story", "article"]
     caption: str
     image_urls: Optional[List[str]] = []
@@ -102,6 +147,11 @@ class PublishRequest(BaseModel):
     # WordPress-specific fields
     status: Optional[str] = "publish"  # WordPress: publish, draft, pending, private
 
+class FanoutPublishRequest(PublishRequest):
+    """One post for several platforms at once (POST /publish/fanout)"""
+    platform: Optional[PlatformName] = None  # Unused - see platforms
+    platforms: List[PlatformName]
+
 class PublishResponse(BaseModel):
     success: bool
     platform: str
@@ -115,6 +165,16 @@ class PublishResponse(BaseModel):
 # INSTAGRAM PUBLISHER
 # ============================================================================
 
+# Carousel child containers created at once per post
+INSTAGRAM_CONTAINER_CONCURRENCY = int(os.getenv("INSTAGRAM_CONTAINER_CONCURRENCY", "5"))
+
+# Container status polling: first wait, backoff cap, and how long to wait per media type
+INSTAGRAM_STATUS_POLL_INITIAL_SECONDS = 1.0
+INSTAGRAM_STATUS_POLL_MAX_SECONDS = 15.0
+INSTAGRAM_IMAGE_READY_TIMEOUT_SECONDS = 60.0
+INSTAGRAM_VIDEO_READY_TIMEOUT_SECONDS = float(os.getenv("INSTAGRAM_VIDEO_READY_TIMEOUT_SECONDS", "300"))
+
+
 class InstagramPublisher:
     """
     Instagram Graph API publisher
@@ -129,6 +189,67 @@ class InstagramPublisher:
         self.api_version = "v21.0"
         self.base_url = f"https://graph.facebook.com/{self.api_version}"
 
+    async def create_container(self, client, data: dict) -> str:
+        """
+        Create a media container
+
+        Returns:
+            str: Container (creation) ID
+
+        Raises:
+            MediaUploadError: If Instagram rejects the container
+        """
+        response = await client.post(
+            f"{self.base_url}/{self.business_account_id}/media",
+            data={**data, "access_token": self.access_token}
+        )
+        if response.status_code != 200:
+            raise MediaUploadError(response.text)
+        return response.json()["id"]
+
+    async def wait_until_ready(self, client, container_id: str,
+                               timeout: float = INSTAGRAM_IMAGE_READY_TIMEOUT_SECONDS) -> None:
+        """
+        Poll a container until Instagram has processed it (status_code FINISHED)
+
+        Waits with exponential backoff (asyncio.sleep, never blocks the loop).
+
+        Raises:
+            MediaUploadError: If processing fails, the container expires, or timeout passes
+        """
+        deadline = time.monotonic() + timeout
+        delay = INSTAGRAM_STATUS_POLL_INITIAL_SECONDS
+
+        while True:
+            response = await client.get(
+                f"{self.base_url}/{container_id}",
+                params={"fields": "status_code,status", "access_token": self.access_token}
+            )
+            if response.status_code == 200:
+                data = response.json()
+                status_code = data.get("status_code")
+                if status_code in ("FINISHED", "PUBLISHED"):
+                    return
+                if status_code in ("ERROR", "EXPIRED"):
+                    raise MediaUploadError(f"Container {container_id} {status_code.lower()}: {data.get('status', '')}")
+            elif 400 <= response.status_code < 500 and response.status_code != 429:
+                # Invalid token, deleted container... polling won't fix it
+                raise MediaUploadError(f"Container {container_id} status check failed: {response.status_code} - {response.text}")
+            else:
+                logger.warning(f"Instagram container status check failed: {response.status_code}")
+
+            if time.monotonic() + delay > deadline:
+                raise MediaUploadError(f"Container {container_id} not ready after {timeout:g}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, INSTAGRAM_STATUS_POLL_MAX_SECONDS)
+
+    async def create_ready_container(self, client, data: dict,
+                                     timeout: float = INSTAGRAM_IMAGE_READY_TIMEOUT_SECONDS) -> str:
+        """Create a container and wait until it can be published"""
+        container_id = await self.create_container(client, data)
+        await self.wait_until_ready(client, container_id, timeout)
+        return container_id
+
     async def publish(self, post_data: dict) -> dict:
         """
         Generic publish method for scheduler compatibility
@@ -158,7 +279,7 @@ class InstagramPublisher:
             }
         
         try:
-            async with httpx.AsyncClient() as client:
+            async with http_client("instagram") as client:
                 # Step 1: Create media container
                 container_response = await client.post(
                     f"{self.base_url}/{self.business_account_id}/media",
@@ -215,47 +336,45 @@ class InstagramPublisher:
             }
         
         try:
-            async with httpx.AsyncClient() as client:
-                # Step 1: Create media containers for each image
-                media_ids = []
-                
-                for image_url in image_urls:
-                    container_response = await client.post(
-                        f"{self.base_url}/{self.business_account_id}/media",
-                        data={
+            async with http_client("instagram") as client:
+                # Step 1: Create child containers concurrently (bounded), each polled until ready
+                semaphore = asyncio.Semaphore(INSTAGRAM_CONTAINER_CONCURRENCY)
+
+                async def create_child(image_url):
+                    async with semaphore:
+                        return await self.create_ready_container(client, {
                             "image_url": image_url,
-                            "is_carousel_item": True,
-                            "access_token": self.access_token
-                        }
-                    )
-                    
-                    if container_response.status_code != 200:
-                        return {
-                            "success": False,
-                            "error": f"Failed to create carousel item: {container_response.text}"
-                        }
-                    
-                    media_ids.append(container_response.json()["id"])
-                
-                # Step 2: Create carousel container
-                carousel_response = await client.post(
-                    f"{self.base_url}/{self.business_account_id}/media",
-                    data={
+                            "is_carousel_item": True
+                        })
+
+                tasks = [asyncio.create_task(create_child(image_url)) for image_url in image_urls]
+                try:
+                    media_ids = await asyncio.gather(*tasks)
+                except BaseException as e:
+                    # One child failed (or we were cancelled) - stop creating the rest
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    if not isinstance(e, MediaUploadError):
+                        raise
+                    return {
+                        "success": False,
+                        "error": f"Failed to create carousel item: {e}"
+                    }
+
+                # Step 2: Create carousel container (in child order) and wait for it
+                try:
+                    carousel_id = await self.create_ready_container(client, {
                         "media_type": "CAROUSEL",
                         "caption": caption,
-                        "children": ",".join(media_ids),
-                        "access_token": self.access_token
-                    }
-                )
-                
-                if carousel_response.status_code != 200:
+                        "children": ",".join(media_ids)
+                    })
+                except MediaUploadError as e:
                     return {
                         "success": False,
-                        "error": f"Failed to create carousel: {carousel_response.text}"
+                        "error": f"Failed to create carousel: {e}"
                     }
-                
-                carousel_id = carousel_response.json()["id"]
-                
+
                 # Step 3: Publish carousel
                 publish_response = await client.post(
                     f"{self.base_url}/{self.business_account_id}/media_publish",
@@ -306,34 +425,31 @@ class InstagramPublisher:
             }
 
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
+            async with http_client("instagram", timeout=60.0) as client:
                 # Step 1: Create Reel container
                 container_data = {
                     "media_type": "REELS",
                     "video_url": video_url,
                     "caption": caption,
-                    "share_to_feed": share_to_feed,
-                    "access_token": self.access_token
+                    "share_to_feed": share_to_feed
                 }
 
                 # Add cover image if provided
                 if cover_url:
                     container_data["cover_url"] = cover_url
 
-                container_response = await client.post(
-                    f"{self.base_url}/{self.business_account_id}/media",
-                    data=container_data
-                )
-
-                if container_response.status_code != 200:
+                # Video is processed asynchronously - wait until it can be published
+                try:
+                    container_id = await self.create_ready_container(
+                        client, container_data, INSTAGRAM_VIDEO_READY_TIMEOUT_SECONDS
+                    )
+                except MediaUploadError as e:
                     return {
                         "success": False,
-                        "error": f"Failed to create Reel container: {container_response.text}"
+                        "error": f"Failed to create Reel container: {e}"
                     }
 
-                container_id = container_response.json()["id"]
-
-                # Step 2: Publish Reel (may take time to process video)
+                # Step 2: Publish Reel
                 publish_response = await client.post(
                     f"{self.base_url}/{self.business_account_id}/media_publish",
                     data={
@@ -390,7 +506,7 @@ class InstagramPublisher:
             }
 
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
+            async with http_client("instagram", timeout=60.0) as client:
                 # Step 1: Create Story container
                 container_data = {
                     "media_type": "STORIES",
@@ -419,6 +535,16 @@ class InstagramPublisher:
 
                 container_id = container_response.json()["id"]
 
+                # Story videos are processed asynchronously like Reels
+                if media_type.upper() == "VIDEO":
+                    try:
+                        await self.wait_until_ready(client, container_id, INSTAGRAM_VIDEO_READY_TIMEOUT_SECONDS)
+                    except MediaUploadError as e:
+                        return {
+                            "success": False,
+                            "error": f"Story video processing failed: {e}"
+                        }
+
                 # Step 2: Publish Story
                 publish_response = await client.post(
                     f"{self.base_url}/{self.business_account_id}/media_publish",
@@ -479,7 +605,7 @@ class LinkedInPublisher:
             }
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client("linkedin", timeout=30.0) as client:
                 response = await client.post(
                     f"{self.base_url}/posts",
                     headers={
@@ -542,10 +668,10 @@ class LinkedInPublisher:
             }
 
         try:
-            from utils.media_upload import download_url_to_file, validate_media_file
+            from utils.media_upload import download_url_to_file, validate_media_file, aiter_file
             import tempfile
 
-            async with httpx.AsyncClient(timeout=60.0) as client:
+            async with http_client("linkedin", timeout=60.0) as client:
                 # Download image to temp file for validation and upload
                 with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp_file:
                     tmp_path = tmp_file.name
@@ -680,10 +806,10 @@ class LinkedInPublisher:
             }
 
         try:
-            from utils.media_upload import download_url_to_file, validate_media_file
+            from utils.media_upload import download_url_to_file, validate_media_file, aiter_file
             import tempfile
 
-            async with httpx.AsyncClient(timeout=300.0) as client:
+            async with http_client("linkedin", timeout=300.0) as client:
                 # Download video to temp file for validation and upload
                 with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp_file:
                     tmp_path = tmp_file.name
@@ -728,22 +854,22 @@ class LinkedInPublisher:
                 upload_url = register_data['value']['uploadMechanism']['com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest']['uploadUrl']
                 asset_urn = register_data['value']['asset']
 
-                # Step 2: Upload video binary
-                with open(tmp_path, 'rb') as f:
-                    upload_response = await client.put(
-                        upload_url,
-                        headers={
-                            "Authorization": f"Bearer {self.access_token}"
-                        },
-                        content=f.read()
-                    )
+                # Step 2: Upload video binary (streamed from disk)
+                upload_response = await client.put(
+                    upload_url,
+                    headers={
+                        "Authorization": f"Bearer {self.access_token}",
+                        "Content-Length": str(os.path.getsize(tmp_path))
+                    },
+                    content=aiter_file(tmp_path)
+                )
 
-                    if upload_response.status_code != 201:
-                        logger.error(f"LinkedIn video upload failed: {upload_response.status_code} - {upload_response.text}")
-                        return {
-                            "success": False,
-                            "error": f"LinkedIn video upload failed: {upload_response.status_code}"
-                        }
+                if upload_response.status_code != 201:
+                    logger.error(f"LinkedIn video upload failed: {upload_response.status_code} - {upload_response.text}")
+                    return {
+                        "success": False,
+                        "error": f"LinkedIn video upload failed: {upload_response.status_code}"
+                    }
 
                 # Step 3: Create post with video
                 post_response = await client.post(
@@ -819,7 +945,7 @@ class LinkedInPublisher:
             }
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client("linkedin", timeout=30.0) as client:
                 post_payload = {
                     "author": self.person_urn,
                     "commentary": article_text[:3000],
@@ -894,7 +1020,7 @@ class TwitterPublisher:
         self.access_token = access_token
         self.access_token_secret = access_token_secret
         self.base_url = "https://api.twitter.com/2"
-        self.upload_url = "https://upload.twitter.com/1.1"
+        self.auth = OAuth1Auth(api_key, api_secret, access_token, access_token_secret)
 
     async def publish_tweet(self, caption: str, image_urls: Optional[List[str]] = None) -> dict:
         """
@@ -914,69 +1040,50 @@ class TwitterPublisher:
             }
 
         try:
-            # Create OAuth 1.0a session (required for Twitter API v2 posting)
-            oauth = OAuth1Session(
-                self.api_key,
-                client_secret=self.api_secret,
-                resource_owner_key=self.access_token,
-                resource_owner_secret=self.access_token_secret
-            )
-
-            media_ids = []
-
-            # Upload images if provided (max 4)
-            if image_urls:
-                if len(image_urls) > 4:
-                    return {
-                        "success": False,
-                        "error": "Twitter supports maximum 4 images per tweet"
-                    }
-
-                from utils.media_upload import download_url_to_file, validate_media_file
-                import tempfile
+            async with http_client("twitter", timeout=60.0) as client:
+                media_ids = []
 
-                for image_url in image_urls:
-                    # Download image to temp file
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp_file:
-                        tmp_path = tmp_file.name
+                # Upload images if provided (max 4)
+                if image_urls:
+                    if len(image_urls) > 4:
+                        return {
+                            "success": False,
+                            "error": "Twitter supports maximum 4 images per tweet"
+                        }
 
-                    # Download and validate
-                    await download_url_to_file(image_url, tmp_path)
-                    validate_media_file(tmp_path, "twitter", "image")
+                    from utils.media_upload import download_url_to_file
+                    import tempfile
 
-                    # Upload to Twitter
-                    with open(tmp_path, 'rb') as f:
-                        files = {'media': f}
-                        media_response = oauth.post(
-                            f"{self.upload_url}/media/upload.json",
-                            files=files
-                        )
+                    for image_url in image_urls:
+                        # Download image to temp file
+                        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp_file:
+                            tmp_path = tmp_file.name
 
-                        if media_response.status_code != 200:
-                            logger.error(f"Twitter media upload failed: {media_response.status_code} - {media_response.text}")
-                            os.unlink(tmp_path)
+                        try:
+                            await download_url_to_file(image_url, tmp_path)
+                            media_ids.append(await twitter_media.upload_image(client, self.auth, tmp_path))
+                        except MediaUploadError as e:
+                            logger.error(f"Twitter media upload failed: {e}")
                             return {
                                 "success": False,
-                                "error": f"Twitter media upload failed: {media_response.status_code}"
+                                "error": str(e)
                             }
+                        finally:
+                            # Cleanup temp file
+                            os.unlink(tmp_path)
 
-                        media_data = media_response.json()
-                        media_ids.append(media_data['media_id_string'])
-
-                    # Cleanup temp file
-                    os.unlink(tmp_path)
-
-            # Post tweet using OAuth 1.0a
-            payload = {"text": caption}
+                # Post tweet using OAuth 1.0a
+                payload = {"text": caption}
 
-            # Add media IDs if images were uploaded
-            if media_ids:
-                payload["media"] = {"media_ids": media_ids}
+                # Add media IDs if images were uploaded
+                if media_ids:
+                    payload["media"] = {"media_ids": media_ids}
 
-            response = oauth.post(
-                f"{self.base_url}/tweets",
-                json=payload
-            )
+                response = await client.post(
+                    f"{self.base_url}/tweets",
+                    json=payload,
+                    auth=self.auth
+                )
 
             if response.status_code not in [200, 201]:
                 logger.error(f"Twitter API error: {response.status_code} - {response.text}")
@@ -1020,143 +1127,43 @@ class TwitterPublisher:
             }
 
         try:
-            from utils.media_upload import download_url_to_file, validate_media_file
+            from utils.media_upload import download_url_to_file
             import tempfile
-            import time
-
-            # Create OAuth 1.0a session
-            oauth = OAuth1Session(
-                self.api_key,
-                client_secret=self.api_secret,
-                resource_owner_key=self.access_token,
-                resource_owner_secret=self.access_token_secret
-            )
 
-            # Download video to temp file
+            # Download video to temp file (streamed to disk)
             with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp_file:
                 tmp_path = tmp_file.name
 
-            await download_url_to_file(video_url, tmp_path)
-            validate_media_file(tmp_path, "twitter", "video")
-
-            # Get file size
-            file_size = os.path.getsize(tmp_path)
-
-            # INIT: Initialize chunked upload
-            init_response = oauth.post(
-                f"{self.upload_url}/media/upload.json",
-                data={
-                    'command': 'INIT',
-                    'media_type': 'video/mp4',
-                    'total_bytes': file_size,
-                    'media_category': 'tweet_video'
-                }
-            )
-
-            if init_response.status_code != 200:
-                logger.error(f"Twitter video INIT failed: {init_response.status_code} - {init_response.text}")
-                os.unlink(tmp_path)
-                return {
-                    "success": False,
-                    "error": f"Twitter video upload initialization failed: {init_response.status_code}"
-                }
-
-            media_id = init_response.json()['media_id_string']
-
-            # APPEND: Upload video in chunks
-            chunk_size = 5 * 1024 * 1024  # 5MB chunks
-            segment_index = 0
-
-            with open(tmp_path, 'rb') as video_file:
-                while True:
-                    chunk = video_file.read(chunk_size)
-                    if not chunk:
-                        break
-
-                    append_response = oauth.post(
-                        f"{self.upload_url}/media/upload.json",
-                        data={
-                            'command': 'APPEND',
-                            'media_id': media_id,
-                            'segment_index': segment_index
-                        },
-                        files={'media': chunk}
-                    )
-
-                    if append_response.status_code not in [200, 201, 204]:
-                        logger.error(f"Twitter video APPEND failed: {append_response.status_code}")
-                        os.unlink(tmp_path)
+            try:
+                async with http_client("twitter", timeout=120.0) as client:
+                    await download_url_to_file(video_url, tmp_path)
+
+                    # INIT, parallel APPENDs, FINALIZE, then STATUS polling (non-blocking)
+                    try:
+                        media_id = await twitter_media.upload_video(client, self.auth, tmp_path)
+                    except MediaUploadError as e:
+                        logger.error(f"Twitter video upload failed: {e}")
                         return {
                             "success": False,
-                            "error": f"Twitter video upload failed at segment {segment_index}"
+                            "error": str(e)
                         }
 
-                    segment_index += 1
-
-            # FINALIZE: Complete upload
-            finalize_response = oauth.post(
-                f"{self.upload_url}/media/upload.json",
-                data={
-                    'command': 'FINALIZE',
-                    'media_id': media_id
-                }
-            )
-
-            if finalize_response.status_code != 200:
-                logger.error(f"Twitter video FINALIZE failed: {finalize_response.status_code}")
-                os.unlink(tmp_path)
-                return {
-                    "success": False,
-                    "error": "Twitter video finalization failed"
-                }
-
-            finalize_data = finalize_response.json()
-
-            # STATUS: Wait for video processing
-            processing_info = finalize_data.get('processing_info')
-            if processing_info:
-                state = processing_info.get('state')
-
-                while state in ['pending', 'in_progress']:
-                    check_after_secs = processing_info.get('check_after_secs', 5)
-                    time.sleep(check_after_secs)
-
-                    status_response = oauth.get(
-                        f"{self.upload_url}/media/upload.json",
-                        params={
-                            'command': 'STATUS',
-                            'media_id': media_id
+                    # Post tweet with video
+                    payload = {
+                        "text": caption,
+                        "media": {
+                            "media_ids": [media_id]
                         }
-                    )
-
-                    if status_response.status_code != 200:
-                        break
-
-                    processing_info = status_response.json().get('processing_info', {})
-                    state = processing_info.get('state')
-
-                if state == 'failed':
-                    os.unlink(tmp_path)
-                    return {
-                        "success": False,
-                        "error": "Twitter video processing failed"
                     }
 
-            # Post tweet with video
-            payload = {
-                "text": caption,
-                "media": {
-                    "media_ids": [media_id]
-                }
-            }
-
-            response = oauth.post(
-                f"{self.base_url}/tweets",
-                json=payload
-            )
-
-            # Cleanup temp file
-            os.unlink(tmp_path)
+                    response = await client.post(
+                        f"{self.base_url}/tweets",
+                        json=payload,
+                        auth=self.auth
+                    )
+            finally:
+                # Cleanup temp file
+                os.unlink(tmp_path)
 
             if response.status_code not in [200, 201]:
                 logger.error(f"Twitter API error: {response.status_code} - {response.text}")
@@ -1194,7 +1201,142 @@ async def publish_content(publish_request: PublishRequest, user_id: str = Depend
 
     MULTI-TENANT: Requires JWT authentication, publishes to user's connected accounts only
     """
+    platform = service_type_for(publish_request.platform)
+
+    # Get user's credentials for this platform
+    credentials = await get_user_service_credentials(user_id, platform)
 
+    return await publish_with_credentials(publish_request, credentials, user_id)
+
+
+# Fan-out runs own their publishes and run detached from the response: a
+# client disconnecting mid-stream doesn't cancel them (a half-finished upload
+# can't be taken back), and every platform's outcome is logged instead
+_fanout_runs = set()
+
+
+async def _run_fanout(fanout_request: FanoutPublishRequest, platforms: List[str],
+                      credentials: Dict[str, Dict], user_id: str, results: asyncio.Queue):
+    """Publish to every platform concurrently, queueing each PublishResponse as it finishes"""
+    base = fanout_request.model_dump(exclude={"platform", "platforms"})
+    reported = set()
+    succeeded = 0
+
+    def failed(platform, error):
+        return PublishResponse(
+            success=False,
+            platform=platform,
+            error=error,
+            published_at=datetime.utcnow().isoformat()
+        )
+
+    def report(response):
+        nonlocal succeeded
+        # Logged too: nobody may be reading the stream any more
+        if response.success:
+            succeeded += 1
+            logger.info(f"Fan-out publish to {response.platform} for user {user_id}: "
+                        f"{response.post_url or response.post_id}")
+        else:
+            logger.warning(f"Fan-out publish to {response.platform} for user {user_id} failed: {response.error}")
+        reported.add(response.platform)
+        results.put_nowait(response)
+
+    async def publish_one(platform):
+        service_type = service_type_for(platform)
+        try:
+            response = await publish_with_credentials(
+                PublishRequest(**base, platform=platform), credentials.get(service_type), user_id
+            )
+        except Exception as e:
+            response = failed(platform, str(e))
+        report(response)
+
+    error = "Publishing was interrupted"
+    try:
+        # Platforms that download the media (LinkedIn, X) share one copy per URL
+        async with media_download_cache():
+            await asyncio.gather(*(publish_one(platform) for platform in platforms))
+    except Exception as e:
+        logger.error(f"Fan-out publish failed for user {user_id}: {e}")
+        error = str(e)
+    finally:
+        # Every platform still gets a line, even if the run was cancelled
+        # (e.g. at shutdown), so the stream always completes
+        for platform in platforms:
+            if platform not in reported:
+                report(failed(platform, error))
+        logger.info(f"Fan-out publish for user {user_id} finished: {succeeded}/{len(platforms)} published")
+
+
+@router.post("/publish/fanout")
+async def publish_fanout(fanout_request: FanoutPublishRequest, user_id: str = Depends(get_current_user_id)):
+    """
+    Publish one post to several platforms concurrently
+
+    Streams newline-delimited JSON: one PublishResponse per platform in the
+    order they finish, then a summary line. Total time is that of the
+    slowest platform.
+
+    The publishes run detached from the stream: if the client disconnects,
+    they still finish and each platform's result is logged.
+
+    MULTI-TENANT: Requires JWT authentication, publishes to user's connected accounts only
+    """
+    # One entry per account (x and twitter are the same one)
+    platforms = []
+    service_types = []
+    for platform in fanout_request.platforms:
+        service_type = service_type_for(platform)
+        if service_type not in service_types:
+            service_types.append(service_type)
+            platforms.append(platform)
+
+    if not platforms:
+        raise HTTPException(status_code=400, detail="Select at least one platform")
+
+    credentials = await get_user_services_credentials(user_id, service_types)
+
+    results = asyncio.Queue()
+    run = asyncio.create_task(_run_fanout(fanout_request, platforms, credentials, user_id, results))
+    _fanout_runs.add(run)
+    run.add_done_callback(_fanout_runs.discard)
+
+    async def stream():
+        started = time.monotonic()
+        succeeded = 0
+        for _ in platforms:
+            response = await results.get()
+            succeeded += response.success
+            yield json.dumps({**response.model_dump(), "elapsed_seconds": round(time.monotonic() - started, 2)}) + "\n"
+
+        yield json.dumps({
+            "done": True,
+            "platforms": len(platforms),
+            "succeeded": succeeded,
+            "failed": len(platforms) - succeeded,
+            "elapsed_seconds": round(time.monotonic() - started, 2)
+        }) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+async def publish_with_credentials(
+    publish_request: PublishRequest,
+    credentials: Optional[Dict],
+    user_id: str = None
+) -> PublishResponse:
+    """
+    Publish using already-loaded connected_services credentials
+
+    Shared by the /publish endpoint and the post scheduler, which loads
+    credentials in bulk from its own pool before publishing concurrently.
+
+    Args:
+        publish_request: What to publish and where
+        credentials: Row shaped like get_user_service_credentials() output, or None
+        user_id: For logging only
+    """
     logger.info(f"Publishing to {publish_request.platform} for user {user_id}")
 
     # Validate character limits BEFORE attempting to publish
@@ -1220,11 +1362,7 @@ async def publish_content(publish_request: PublishRequest, user_id: str = Depend
     }
 
     try:
-        # Handle X/Twitter alias
-        platform = "twitter" if publish_request.platform == "x" else publish_request.platform
-
-        # Get user's credentials for this platform
-        credentials = get_user_service_credentials(user_id, platform)
+        platform = service_type_for(publish_request.platform)
 
         # Instagram supports both OAuth and environment variable credentials
         # Don't error out if no OAuth - let InstagramPublisher fall back to env vars
@@ -1726,7 +1864,7 @@ async def check_publisher_status(user_id: str = Depends(get_current_user_id)):
     status = {}
 
     for platform in platforms:
-        credentials = get_user_service_credentials(user_id, platform)
+        credentials = await get_user_service_credentials(user_id, platform)
         status[platform] = {
             "connected": credentials is not None,
             "service_id": credentials.get('service_id') if credentials else None
@@ -1800,7 +1938,7 @@ class FacebookPublisher:
             return {"success": False, "error": "Facebook credentials not configured"}
 
         try:
-            async with httpx.AsyncClient() as client:
+            async with http_client("facebook") as client:
                 response = await client.post(
                     f"{self.base_url}/{self.page_id}/feed",
                     data={
@@ -1844,7 +1982,7 @@ class FacebookPublisher:
             return {"success": False, "error": "Facebook credentials not configured"}
 
         try:
-            async with httpx.AsyncClient() as client:
+            async with http_client("facebook") as client:
                 response = await client.post(
                     f"{self.base_url}/{self.page_id}/feed",
                     data={
@@ -1889,7 +2027,7 @@ class FacebookPublisher:
             return {"success": False, "error": "Facebook credentials not configured"}
 
         try:
-            async with httpx.AsyncClient(timeout=120.0) as client:
+            async with http_client("facebook", timeout=120.0) as client:
                 response = await client.post(
                     f"{self.base_url}/{self.page_id}/photos",
                     data={
@@ -1937,7 +2075,7 @@ class FacebookPublisher:
             return {"success": False, "error": "Facebook credentials not configured"}
 
         try:
-            async with httpx.AsyncClient(timeout=600.0) as client:  # 10 min timeout for large videos
+            async with http_client("facebook", timeout=600.0) as client:  # 10 min timeout for large videos
                 data = {
                     "file_url": video_url,
                     "description": description,
@@ -1995,7 +2133,7 @@ class FacebookPublisher:
             return {"success": False, "error": "Album cannot exceed 50 photos"}
 
         try:
-            async with httpx.AsyncClient(timeout=300.0) as client:
+            async with http_client("facebook", timeout=300.0) as client:
                 # Step 1: Upload all photos and collect photo IDs
                 photo_ids = []
 
@@ -2103,7 +2241,7 @@ class TikTokPublisher:
             }
 
         try:
-            async with httpx.AsyncClient(timeout=300.0) as client:  # 5 min timeout for video processing
+            async with http_client("tiktok", timeout=300.0) as client:  # 5 min timeout for video processing
                 # Step 1: Initialize video upload
                 logger.info(f"Initializing TikTok video upload from {video_url}")
 
@@ -2274,21 +2412,8 @@ class YouTubePublisher:
             }
 
         try:
-            async with httpx.AsyncClient(timeout=600.0) as client:
-                # Step 1: Download video from URL
-                logger.info(f"Downloading video from {video_url}")
-                video_response = await client.get(video_url)
-                if video_response.status_code != 200:
-                    return {
-                        "success": False,
-                        "error": f"Failed to fetch video: {video_response.status_code}"
-                    }
-
-                video_data = video_response.content
-                video_size = len(video_data)
-                logger.info(f"Video downloaded: {video_size} bytes")
-
-                # Step 2: Prepare metadata
+            async with http_client("youtube", timeout=600.0) as client:
+                # Step 1: Prepare metadata
                 metadata = {
                     "snippet": {
                         "title": title[:100],
@@ -2308,53 +2433,48 @@ class YouTubePublisher:
                     else:
                         metadata["snippet"]["description"] = "#Shorts"
 
-                # Step 3: Initialize resumable upload
-                init_response = await client.post(
-                    f"{self.upload_url}/videos",
-                    params={
-                        "part": "snippet,status",
-                        "uploadType": "resumable"
-                    },
-                    headers={
+                # Step 2: Initialize resumable upload once the source size is known
+                async def start_session(video_size):
+                    headers = {
                         "Authorization": f"Bearer {self.access_token}",
                         "Content-Type": "application/json",
-                        "X-Upload-Content-Length": str(video_size),
                         "X-Upload-Content-Type": "video/*"
-                    },
-                    json=metadata
-                )
-
-                if init_response.status_code != 200:
-                    logger.error(f"YouTube upload init failed: {init_response.status_code} - {init_response.text}")
-                    return {
-                        "success": False,
-                        "error": f"YouTube upload initialization failed: {init_response.status_code}"
                     }
+                    if video_size is not None:
+                        headers["X-Upload-Content-Length"] = str(video_size)
 
-                # Get resumable upload URL from Location header
-                upload_session_url = init_response.headers.get('Location')
-                if not upload_session_url:
-                    return {
-                        "success": False,
-                        "error": "Failed to get YouTube upload session URL"
-                    }
+                    init_response = await client.post(
+                        f"{self.upload_url}/videos",
+                        params={
+                            "part": "snippet,status",
+                            "uploadType": "resumable"
+                        },
+                        headers=headers,
+                        json=metadata
+                    )
 
-                logger.info(f"Upload session created: {upload_session_url}")
+                    if init_response.status_code != 200:
+                        logger.error(f"YouTube upload init failed: {init_response.status_code} - {init_response.text}")
+                        raise MediaUploadError(f"YouTube upload initialization failed: {init_response.status_code}")
 
-                # Step 4: Upload video binary using resumable upload
-                upload_response = await client.put(
-                    upload_session_url,
-                    content=video_data,
-                    headers={
-                        "Content-Type": "video/*"
-                    }
-                )
+                    # Get resumable upload URL from Location header
+                    upload_session_url = init_response.headers.get('Location')
+                    if not upload_session_url:
+                        raise MediaUploadError("Failed to get YouTube upload session URL")
 
-                if upload_response.status_code not in [200, 201]:
-                    logger.error(f"YouTube video upload failed: {upload_response.status_code} - {upload_response.text}")
+                    logger.info(f"Upload session created for {video_size or 'unknown'} bytes")
+                    return upload_session_url
+
+                # Step 3: Stream the video from its URL into the session in chunks
+                # (never holds more than one chunk in memory, resumes failed chunks)
+                logger.info(f"Relaying video from {video_url}")
+                try:
+                    upload_response = await relay_resumable_upload(client, video_url, start_session)
+                except MediaUploadError as e:
+                    logger.error(f"YouTube video upload failed: {e}")
                     return {
                         "success": False,
-                        "error": f"YouTube video upload failed: {upload_response.status_code}"
+                        "error": str(e)
                     }
 
                 video_response_data = upload_response.json()
@@ -2414,12 +2534,11 @@ class YouTubePublisher:
         if not self.access_token:
             return {"success": False, "error": "No access token"}
 
-        try:
-            should_close_client = False
-            if not client:
-                client = httpx.AsyncClient(timeout=60.0)
-                should_close_client = True
+        if client is None:
+            async with http_client("youtube", timeout=60.0) as shared:
+                return await self.upload_thumbnail(video_id, thumbnail_url, shared)
 
+        try:
             # Download thumbnail
             thumb_response = await client.get(thumbnail_url)
             if thumb_response.status_code != 200:
@@ -2441,9 +2560,6 @@ class YouTubePublisher:
                 content=thumbnail_data
             )
 
-            if should_close_client:
-                await client.aclose()
-
             if upload_response.status_code not in [200, 201]:
                 return {
                     "success": False,
@@ -2501,7 +2617,7 @@ class RedditPublisher:
                     "error": f"Reddit titles must be under 300 characters (current: {len(title)})"
                 }
 
-            async with httpx.AsyncClient(timeout=60.0) as client:
+            async with http_client("reddit", timeout=60.0) as client:
                 # Determine kind based on post_type
                 kind_map = {
                     "text": "self",
@@ -2611,7 +2727,7 @@ class TumblrPublisher:
             }
         
         try:
-            async with httpx.AsyncClient() as client:
+            async with http_client("tumblr") as client:
                 post_type = "photo" if image_url else "text"
                 
                 data = {
@@ -2685,7 +2801,7 @@ class WordPressPublisher:
     async def _publish_via_wpcom_api(self, title: str, content: str, status: str) -> dict:
         """Publish via WordPress.com REST API (OAuth)"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client("wordpress", timeout=30.0) as client:
                 response = await client.post(
                     f"https://public-api.wordpress.com/rest/v1.1/sites/{self.site_id}/posts/new",
                     headers={
@@ -2758,7 +2874,7 @@ class WordPressPublisher:
             credentials = f"{self.username}:{self.app_password}"
             token = base64.b64encode(credentials.encode()).decode()
 
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client("wordpress", timeout=30.0) as client:
                 response = await client.post(
                     f"{self.site_url}/wp-json/wp/v2/posts",
                     headers={
@@ -122,7 +122,7 @@ async def generate_caption(caption_request: CaptionRequest, request: Request):
 
         # Check and deduct credits BEFORE generating
         try:
-            deduct_credits(
+            await deduct_credits(
                 user_id=user_id,
                 operation_type="social_caption",
                 operation_details={
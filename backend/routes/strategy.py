@@ -160,7 +160,7 @@ async def analyze_brand_voice(include_competitors: bool = True, user_id: str = D
 
         # Check and deduct credits BEFORE generating strategy (10 credits)
         try:
-            deduct_credits(
+            await deduct_credits(
                 user_id=user_id,
                 operation_type="strategy_generation",
                 operation_details={
@@ -1,18 +1,47 @@
 """
 APScheduler configuration for background jobs
+
+Every web process calls start_scheduler(), but only the process holding the
+Postgres advisory lock (the leader) runs jobs. Jobs live in the
+apscheduler_jobs table, so a new leader picks up the same schedule.
+Scheduled posts are not polled: the leader's PostDispatcher publishes them
+when they fall due (workers/post_dispatcher.py).
 """
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
-from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.executors.pool import ThreadPoolExecutor
 import logging
+import os
+import socket
+import threading
+
+import psycopg2
+
+from scheduler_jobstore import PostgresJobStore
+from workers.post_dispatcher import PostDispatcher
+from workers import comment_monitor
 
 logger = logging.getLogger(__name__)
 
+# Leader election
+LEADER_LOCK_NAME = os.getenv("SCHEDULER_LEADER_LOCK", "orla3-background-scheduler")
+LEADER_RETRY_SECONDS = float(os.getenv("SCHEDULER_LEADER_RETRY_SECONDS", "5"))
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Keepalives for the leader's session, on both ends. Client-side ones only
+# let the leader notice a dead server; the server-side ones end the backend
+# (and release the advisory lock) when the leader host dies or is cut off,
+# instead of after the server's default ~2h TCP keepalive. A dead peer is
+# detected in about 5 + 2 * 2 = 9s, an unacknowledged write in 10s.
+SESSION_KEEPALIVE_IDLE = 5
+SESSION_KEEPALIVE_INTERVAL = 2
+SESSION_KEEPALIVE_COUNT = 2
+SESSION_TCP_USER_TIMEOUT_MS = 10000
+
 # Configure job stores and executors
 jobstores = {
-    'default': MemoryJobStore()
+    'default': PostgresJobStore()
 }
 
 executors = {
@@ -33,56 +62,236 @@ scheduler = BackgroundScheduler(
     timezone='UTC'
 )
 
+# Textual references so jobs can be stored before their modules are imported
+JOBS = [
+    {
+        'id': 'monitor_comments',
+        'func': 'workers.comment_monitor:monitor_and_reply_to_comments',
+        'trigger': IntervalTrigger(minutes=comment_monitor.MONITOR_INTERVAL_MINUTES),
+        'name': 'Monitor comments and auto-reply',
+    },
+]
 
-def start_scheduler():
-    """Start the background scheduler"""
-    if not scheduler.running:
+# Jobs replaced since they were first stored - removed from the job store on election
+RETIRED_JOB_IDS = [
+    'check_scheduled_posts',  # One-minute polling, replaced by PostDispatcher
+]
+
+
+class LeaderElection:
+    """
+    Session-level pg_try_advisory_lock on a dedicated connection
+
+    The lock lives as long as the session: if the leader process exits,
+    Postgres releases it at once. If the leader host dies or is cut off from
+    the network, the server-side keepalives set by _connect_dedicated_session()
+    end the session in about 10 seconds, and the next follower to retry
+    takes over within LEADER_RETRY_SECONDS of that. Connections that can't
+    set server options (e.g. through PgBouncer) fall back to the server's
+    own keepalive, which defaults to about two hours.
+
+    Args:
+        connect: Returns a new psycopg2 connection (not from a pool - the
+            lock must not outlive this elector)
+        lock_name: Hashed into the advisory lock key
+        on_elected: Called when this process becomes leader
+        on_demoted: Called when this process loses leadership
+        interval: Seconds between lock attempts / leader heartbeats
+    """
+
+    def __init__(self, connect, lock_name=LEADER_LOCK_NAME, on_elected=None,
+                 on_demoted=None, interval=LEADER_RETRY_SECONDS):
+        self.connect = connect
+        self.lock_name = lock_name
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.interval = interval
+        self.is_leader = False
+        self._conn = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="scheduler-leader-election", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop campaigning and release the lock (if held)"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
+
+        if self.is_leader:
+            try:
+                cursor = self._conn.cursor()
+                cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", (self.lock_name,))
+                cursor.close()
+            except Exception as e:
+                logger.warning(f"⚠️ Could not release scheduler leader lock: {e}")
+            self.is_leader = False
+
+        self._close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._tick()
+            self._stop.wait(self.interval)
+
+    def _tick(self):
+        """One election round: heartbeat as leader, try the lock as follower"""
         try:
-            # Import worker functions (avoid circular import)
-            from workers.post_scheduler import check_scheduled_posts
-            from workers.comment_monitor import monitor_and_reply_to_comments
-
-            # Add scheduled post checker (runs every minute)
-            scheduler.add_job(
-                func=check_scheduled_posts,
-                trigger=IntervalTrigger(minutes=1),
-                id='check_scheduled_posts',
-                name='Check and publish scheduled posts',
-                replace_existing=True
-            )
-
-            # Add comment monitor for auto-reply (runs every 15 minutes)
-            scheduler.add_job(
-                func=monitor_and_reply_to_comments,
-                trigger=IntervalTrigger(minutes=15),
-                id='monitor_comments',
-                name='Monitor comments and auto-reply',
-                replace_existing=True
-            )
-
-            scheduler.start()
-            logger.info("✅ APScheduler started successfully")
-            logger.info("📅 Scheduled post checker: Every 1 minute")
-            logger.info("💬 Comment monitor: Every 15 minutes")
+            if self._conn is None or self._conn.closed:
+                self._conn = self.connect()
+                self._conn.autocommit = True
+
+            cursor = self._conn.cursor()
+            try:
+                if self.is_leader:
+                    # Lock is tied to this session - if the session is alive we still hold it
+                    cursor.execute("SELECT 1")
+                    return
+
+                cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s))", (self.lock_name,))
+                acquired = cursor.fetchone()[0]
+            finally:
+                cursor.close()
 
         except Exception as e:
-            logger.error(f"❌ Failed to start scheduler: {e}")
-            raise
-    else:
+            if self.is_leader:
+                logger.error(f"❌ Lost scheduler leader session: {e}")
+                self._demote()
+            else:
+                logger.warning(f"⚠️ Scheduler leader election failed: {e}")
+            self._close()
+            return
+
+        if acquired:
+            self.is_leader = True
+            logger.info(f"👑 {INSTANCE_ID} elected scheduler leader")
+            if self.on_elected:
+                try:
+                    self.on_elected()
+                except Exception as e:
+                    # Don't hold the lock without running jobs - let another process try
+                    logger.error(f"❌ Scheduler leader failed to start jobs: {e}")
+                    self._demote()
+                    self._close()
+
+    def _demote(self):
+        self.is_leader = False
+        if self.on_demoted:
+            try:
+                self.on_demoted()
+            except Exception as e:
+                logger.error(f"❌ Error pausing scheduler on demotion: {e}")
+
+    def _close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+
+def _connect_dedicated_session():
+    """
+    Unpooled connection for session state (advisory lock, LISTEN)
+    Aggressive keepalives on both ends so a dead leader is noticed fast -
+    by this process and by the server holding its lock
+    """
+    server_keepalives = (
+        f"-c tcp_keepalives_idle={SESSION_KEEPALIVE_IDLE}"
+        f" -c tcp_keepalives_interval={SESSION_KEEPALIVE_INTERVAL}"
+        f" -c tcp_keepalives_count={SESSION_KEEPALIVE_COUNT}"
+        f" -c tcp_user_timeout={SESSION_TCP_USER_TIMEOUT_MS}"
+    )
+    return psycopg2.connect(
+        os.getenv("DATABASE_URL"),
+        application_name=f"orla3-scheduler {INSTANCE_ID}"[:63],
+        connect_timeout=5,
+        keepalives=1,
+        keepalives_idle=SESSION_KEEPALIVE_IDLE,
+        keepalives_interval=SESSION_KEEPALIVE_INTERVAL,
+        keepalives_count=SESSION_KEEPALIVE_COUNT,
+        tcp_user_timeout=SESSION_TCP_USER_TIMEOUT_MS,
+        options=server_keepalives,
+    )
+
+
+def _register_jobs():
+    """Add missing jobs; keep existing ones (and their next run time) unless the trigger changed"""
+    for job_id in RETIRED_JOB_IDS:
+        if scheduler.get_job(job_id) is not None:
+            scheduler.remove_job(job_id)
+
+    for definition in JOBS:
+        job = scheduler.get_job(definition['id'])
+        if job is not None and str(job.trigger) == str(definition['trigger']) and job.func_ref == definition['func']:
+            continue
+        scheduler.add_job(replace_existing=True, **definition)
+
+
+def _on_elected():
+    if not scheduler.running:
+        scheduler.start(paused=True)
+    _register_jobs()
+    scheduler.resume()
+    dispatcher.start()
+    logger.info("✅ APScheduler running on this instance")
+    logger.info("📅 Scheduled posts: published as they fall due")
+    logger.info("💬 Comment monitor: Every 15 minutes")
+
+
+def _on_demoted():
+    # In-flight jobs finish; scheduled posts are fenced by their publishing lease
+    dispatcher.stop(timeout=0)
+    if scheduler.running:
+        scheduler.pause()
+        logger.info("⏸️ APScheduler paused (no longer leader)")
+
+
+dispatcher = PostDispatcher(_connect_dedicated_session)
+elector = LeaderElection(_connect_dedicated_session, on_elected=_on_elected, on_demoted=_on_demoted)
+
+
+def start_scheduler():
+    """Start campaigning for scheduler leadership (jobs start once elected)"""
+    if elector.running:
         logger.info("⚠️ Scheduler already running")
+        return
+
+    if not os.getenv("DATABASE_URL"):
+        raise ValueError("DATABASE_URL environment variable not set")
+
+    elector.start()
+    logger.info(f"🗳️ Scheduler leader election started ({INSTANCE_ID})")
 
 
 def stop_scheduler():
-    """Stop the background scheduler"""
+    """Stop the background scheduler and hand leadership to another instance"""
+    dispatcher.stop()
     if scheduler.running:
         scheduler.shutdown()
         logger.info("🛑 APScheduler stopped")
+    # Release the lock only after our jobs have finished
+    elector.stop()
 
 
 def get_scheduler_status():
     """Get current scheduler status and jobs"""
     return {
         "running": scheduler.running,
+        "leader": elector.is_leader,
+        "instance_id": INSTANCE_ID,
+        "post_dispatcher": dispatcher.running,
+        "comment_monitor_last_run": comment_monitor.last_run or None,
         "jobs": [
             {
                 "id": job.id,
@@ -91,7 +300,7 @@ def get_scheduler_status():
                 "trigger": str(job.trigger)
             }
             for job in scheduler.get_jobs()
-        ]
+        ] if scheduler.running else []
     }
 
 
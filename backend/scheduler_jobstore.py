@@ -0,0 +1,139 @@
+"""
+Postgres job store for APScheduler
+Persists jobs (and their next run times) in the apscheduler_jobs table so
+schedules survive restarts and leader failover. Same table layout as
+APScheduler's SQLAlchemyJobStore, on the worker pool instead of SQLAlchemy.
+"""
+
+import pickle
+
+import psycopg2
+from psycopg2 import sql
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, ConflictingIdError, JobLookupError
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+
+from db_pool import get_worker_db_connection
+
+
+class PostgresJobStore(BaseJobStore):
+    """
+    APScheduler job store backed by Postgres
+
+    Args:
+        table: Table holding the pickled job state (created on start if missing)
+        pickle_protocol: Pickle protocol for job state
+    """
+
+    def __init__(self, table="apscheduler_jobs", pickle_protocol=pickle.HIGHEST_PROTOCOL):
+        super().__init__()
+        self.table = sql.Identifier(table)
+        self.pickle_protocol = pickle_protocol
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        self._execute(sql.SQL("""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id VARCHAR(191) PRIMARY KEY,
+                next_run_time DOUBLE PRECISION,
+                job_state BYTEA NOT NULL
+            )
+        """))
+
+    def lookup_job(self, job_id):
+        rows = self._execute(
+            sql.SQL("SELECT id, job_state FROM {table} WHERE id = %s"), (job_id,), fetch=True
+        )
+        return self._reconstitute_jobs(rows)[0] if rows else None
+
+    def get_due_jobs(self, now):
+        return self._get_jobs(
+            sql.SQL("WHERE next_run_time <= %s"), (datetime_to_utc_timestamp(now),)
+        )
+
+    def get_next_run_time(self):
+        rows = self._execute(sql.SQL("""
+            SELECT next_run_time FROM {table}
+            WHERE next_run_time IS NOT NULL
+            ORDER BY next_run_time
+            LIMIT 1
+        """), fetch=True)
+        return utc_timestamp_to_datetime(rows[0]["next_run_time"]) if rows else None
+
+    def get_all_jobs(self):
+        jobs = self._get_jobs()
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    def add_job(self, job):
+        try:
+            self._execute(
+                sql.SQL("INSERT INTO {table} (id, next_run_time, job_state) VALUES (%s, %s, %s)"),
+                (job.id, datetime_to_utc_timestamp(job.next_run_time), self._dump(job))
+            )
+        except psycopg2.IntegrityError:
+            raise ConflictingIdError(job.id)
+
+    def update_job(self, job):
+        updated = self._execute(
+            sql.SQL("UPDATE {table} SET next_run_time = %s, job_state = %s WHERE id = %s"),
+            (datetime_to_utc_timestamp(job.next_run_time), self._dump(job), job.id)
+        )
+        if updated == 0:
+            raise JobLookupError(job.id)
+
+    def remove_job(self, job_id):
+        deleted = self._execute(sql.SQL("DELETE FROM {table} WHERE id = %s"), (job_id,))
+        if deleted == 0:
+            raise JobLookupError(job_id)
+
+    def remove_all_jobs(self):
+        self._execute(sql.SQL("DELETE FROM {table}"))
+
+    def _get_jobs(self, where=None, params=()):
+        query = sql.SQL("SELECT id, job_state FROM {table} {where} ORDER BY next_run_time").format(
+            table=self.table, where=where or sql.SQL("")
+        )
+        return self._reconstitute_jobs(self._execute(query, params, fetch=True))
+
+    def _reconstitute_jobs(self, rows):
+        jobs, failed_job_ids = [], []
+        for row in rows:
+            try:
+                job_state = pickle.loads(bytes(row["job_state"]))
+                job_state["jobstore"] = self
+                job = Job.__new__(Job)
+                job.__setstate__(job_state)
+                job._scheduler = self._scheduler
+                job._jobstore_alias = self._alias
+                jobs.append(job)
+            except Exception:
+                self._logger.exception(f"Unable to restore job {row['id']} -- removing it")
+                failed_job_ids.append(row["id"])
+
+        # Jobs whose function no longer imports would fail on every wakeup
+        if failed_job_ids:
+            self._execute(sql.SQL("DELETE FROM {table} WHERE id = ANY(%s)"), (failed_job_ids,))
+
+        return jobs
+
+    def _dump(self, job):
+        return psycopg2.Binary(pickle.dumps(job.__getstate__(), self.pickle_protocol))
+
+    def _execute(self, query, params=None, fetch=False):
+        """Run one statement in its own transaction; returns rows or rowcount"""
+        if isinstance(query, sql.SQL):
+            query = query.format(table=self.table)
+
+        with get_worker_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query, params)
+                result = cursor.fetchall() if fetch else cursor.rowcount
+                conn.commit()
+                return result
+            finally:
+                cursor.close()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} (table={self.table.string})>"
@@ -115,9 +115,18 @@ CREATE TABLE content_calendar (
     title TEXT NOT NULL,
     content_type TEXT NOT NULL,
     scheduled_date TIMESTAMPTZ NOT NULL,
-    status TEXT DEFAULT 'scheduled' CHECK (status IN ('scheduled', 'published', 'cancelled', 'failed')),
+    status TEXT DEFAULT 'scheduled' CHECK (status IN ('draft', 'scheduled', 'publishing', 'retrying', 'published', 'cancelled', 'failed', 'dead_letter')),
     platform TEXT,
     notes TEXT,
+    -- Publishing lease (migration 017): the scheduler run that owns a
+    -- 'publishing' post, and when an unfinished claim is recovered
+    claimed_by TEXT,
+    lease_expires_at TIMESTAMPTZ,
+    -- Publish retries (migration 019): attempts started (reset when the user
+    -- reschedules), when a 'retrying' post is due again, and the latest error
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ,
+    last_error TEXT,
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW()
 );
@@ -125,6 +134,9 @@ CREATE TABLE content_calendar (
 CREATE INDEX idx_calendar_date ON content_calendar(scheduled_date);
 CREATE INDEX idx_calendar_status ON content_calendar(status);
 CREATE INDEX idx_calendar_content ON content_calendar(content_id) WHERE content_id IS NOT NULL;
+CREATE INDEX idx_content_calendar_due ON content_calendar(scheduled_date) WHERE status = 'scheduled';
+CREATE INDEX idx_content_calendar_lease ON content_calendar(lease_expires_at) WHERE status = 'publishing';
+CREATE INDEX idx_content_calendar_retry ON content_calendar(next_attempt_at) WHERE status = 'retrying';
 
 -- ============================================================================
 -- PUBLISHED POSTS (Track social media posts)
@@ -146,6 +158,58 @@ CREATE INDEX idx_posts_platform ON published_posts(platform);
 CREATE INDEX idx_posts_published ON published_posts(published_at DESC);
 CREATE INDEX idx_posts_content ON published_posts(content_id) WHERE content_id IS NOT NULL;
 
+-- ============================================================================
+-- SCHEDULER JOB STORE (scheduler_jobstore.PostgresJobStore, migration 018)
+-- ============================================================================
+CREATE TABLE apscheduler_jobs (
+    id VARCHAR(191) PRIMARY KEY,
+    next_run_time DOUBLE PRECISION,  -- UTC epoch seconds; NULL while paused
+    job_state BYTEA NOT NULL
+);
+
+CREATE INDEX idx_apscheduler_jobs_next_run_time ON apscheduler_jobs(next_run_time);
+
+-- ============================================================================
+-- COMMENT MONITOR SYNC STATE (workers/comment_monitor.py, migrations 020-021)
+-- user_id columns reference users(id), created by migration 001
+-- ============================================================================
+
+-- Newest comment timestamp fully handled per post (platform clock)
+CREATE TABLE comment_sync_cursors (
+    user_id UUID NOT NULL,
+    platform VARCHAR(50) NOT NULL,
+    post_id TEXT NOT NULL,
+    last_comment_at TIMESTAMPTZ NOT NULL,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (user_id, platform, post_id)
+);
+
+-- Comments already replied to or deliberately skipped
+CREATE TABLE seen_comments (
+    user_id UUID NOT NULL,
+    platform VARCHAR(50) NOT NULL,
+    comment_id TEXT NOT NULL,
+    replied BOOLEAN NOT NULL DEFAULT false,
+    handled_at TIMESTAMPTZ DEFAULT NOW(),
+    post_id TEXT,
+    comment_created_at TIMESTAMPTZ,
+    PRIMARY KEY (user_id, platform, comment_id)
+);
+
+-- Failed reply attempts for comments not yet in seen_comments
+CREATE TABLE comment_reply_attempts (
+    user_id UUID NOT NULL,
+    platform VARCHAR(50) NOT NULL,
+    comment_id TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (user_id, platform, comment_id)
+);
+
+CREATE INDEX idx_seen_comments_handled_at ON seen_comments(handled_at);
+CREATE INDEX idx_comment_sync_cursors_updated_at ON comment_sync_cursors(updated_at);
+CREATE INDEX idx_comment_reply_attempts_updated_at ON comment_reply_attempts(updated_at);
+
 -- ============================================================================
 -- TRIGGERS FOR UPDATED_AT
 -- ============================================================================
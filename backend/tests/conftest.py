@@ -7,9 +7,9 @@ import pytest
 import os
 import sys
 from typing import Generator, Dict, Any
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from datetime import datetime, timedelta
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
 
 # Add backend to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -71,11 +71,50 @@ class MockConnection:
         return False
 
 
+class AsyncMockCursor:
+    """Async view of the shared MockCursor (psycopg 3 AsyncCursor API)"""
+    def __init__(self, connection, async_connection=None):
+        self._connection = connection
+        self.connection = async_connection
+
+    async def execute(self, query, params=None, **kwargs):
+        self._connection._cursor.execute(query, params)
+
+    async def fetchone(self):
+        return self._connection._cursor.fetchone()
+
+    async def fetchall(self):
+        return self._connection._cursor.fetchall()
+
+    async def close(self):
+        pass
+
+
+class AsyncMockConnection:
+    """Mock async database connection sharing state with MockConnection"""
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self):
+        return AsyncMockCursor(self._connection, self)
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
 # Global mock connection for tests to configure
 _mock_connection = MockConnection()
+_mock_async_connection = AsyncMockConnection(_mock_connection)
 
 
-def _mock_get_db_connection():
+def _mock_get_db_connection(*args, **kwargs):
     """Mock get_db_connection that returns our mock connection"""
     @contextmanager
     def _inner():
@@ -83,6 +122,14 @@ def _mock_get_db_connection():
     return _inner()
 
 
+def _mock_get_async_db_connection(*args, **kwargs):
+    """Mock get_async_db_connection backed by the same mock cursor"""
+    @asynccontextmanager
+    async def _inner():
+        yield _mock_async_connection
+    return _inner()
+
+
 # ============================================================================
 # APP FIXTURES
 # ============================================================================
@@ -95,8 +142,12 @@ def app():
     """
     # Patch db_pool.get_db_connection BEFORE importing main
     with patch('db_pool.get_db_connection', _mock_get_db_connection), \
+         patch('db_pool.get_async_db_connection', _mock_get_async_db_connection), \
          patch('db_pool.init_connection_pool'), \
+         patch('db_pool.init_worker_pool'), \
+         patch('db_pool.init_async_connection_pool', new_callable=AsyncMock), \
          patch('db_pool.close_all_connections'), \
+         patch('db_pool.close_async_connections', new_callable=AsyncMock), \
          patch('scheduler.start_scheduler'), \
          patch('scheduler.stop_scheduler'):
         from main import app as fastapi_app
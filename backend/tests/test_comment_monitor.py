@@ -0,0 +1,447 @@
+"""
+Comment Monitor Tests
+Tests for concurrent per-user processing and tick reporting (no real database or APIs)
+"""
+
+import asyncio
+import json
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+from urllib.parse import parse_qs
+
+import httpx
+
+from workers import comment_monitor
+
+
+def make_settings(user_id, platforms=("instagram",)):
+    return {
+        "settings_id": f"settings-{user_id}",
+        "user_id": user_id,
+        "platforms": list(platforms),
+        "reply_to_questions": True,
+        "reply_to_mentions": False,
+        "reply_to_all_comments": False,
+        "reply_to_positive": True,
+        "reply_to_neutral": False,
+        "reply_to_negative": False,
+        "reply_tone": "friendly",
+        "reply_length": "short",
+        "custom_instructions": "",
+        "max_replies_per_hour": 10,
+        "min_reply_interval_minutes": 15,
+        "last_check_at": None,
+    }
+
+
+def make_comment(comment_id, hour, post_id="m1", text="Love it", sentiment="positive"):
+    return {
+        "id": comment_id,
+        "platform": "instagram",
+        "post_id": post_id,
+        "author": "fan",
+        "text": text,
+        "timestamp": f"2026-01-01T{hour:02d}:00:00+0000",
+        "sentiment": sentiment,
+    }
+
+
+async def thank_all(comments, settings):
+    return {comment["id"]: "Thanks!" for comment in comments}
+
+
+class TestConcurrentUsers:
+    """Test that users are processed concurrently on one event loop"""
+
+    def test_users_processed_concurrently_within_limit(self):
+        """Test that the semaphore caps how many users run at once"""
+        in_flight = {"now": 0, "peak": 0}
+
+        async def slow_user(user_settings):
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+            await asyncio.sleep(0.01)
+            in_flight["now"] -= 1
+            return 1
+
+        users = [make_settings(f"user-{i}") for i in range(12)]
+        with patch.object(comment_monitor, "process_user_auto_replies", slow_user):
+            results = asyncio.run(comment_monitor.process_all_users(users, concurrency=4))
+
+        assert results == [1] * 12
+        assert in_flight["peak"] == 4
+
+    def test_one_failing_user_does_not_stop_others(self):
+        """Test that an exception for one user is isolated"""
+        async def flaky_user(user_settings):
+            if user_settings["user_id"] == "user-1":
+                raise RuntimeError("token expired")
+            return 2
+
+        users = [make_settings(f"user-{i}") for i in range(3)]
+        with patch.object(comment_monitor, "process_user_auto_replies", flaky_user):
+            results = asyncio.run(comment_monitor.process_all_users(users))
+
+        assert results == [2, None, 2]
+
+    def test_tick_reports_duration_against_interval(self):
+        """Test that a tick runs one event loop and reports its timing"""
+        users = [make_settings(f"user-{i}") for i in range(3)]
+        run_loop = patch.object(comment_monitor.asyncio, "run", wraps=asyncio.run)
+
+        with patch.object(comment_monitor, "_prune_sync_state"), \
+             patch.object(comment_monitor, "_load_auto_reply_users", return_value=users), \
+             patch.object(comment_monitor, "process_user_auto_replies", AsyncMock(return_value=1)), \
+             run_loop as loop_runs:
+            summary = comment_monitor.monitor_and_reply_to_comments()
+
+        assert loop_runs.call_count == 1
+        assert summary["users"] == 3
+        assert summary["replies_sent"] == 3
+        assert summary["failed"] == 0
+        assert summary["interval_seconds"] == comment_monitor.MONITOR_INTERVAL_MINUTES * 60
+        assert comment_monitor.last_run["users"] == 3
+
+
+class TestUserProcessing:
+    """Test that per-user database work uses short pooled checkouts"""
+
+    def test_credentials_loaded_once_per_user(self):
+        """Test that fetching and replying share one credentials lookup"""
+        comments = [
+            make_comment("c1", 12, text="How much?", sentiment="question"),
+            make_comment("c2", 13),
+        ]
+        credentials = {"instagram": {"access_token": "token", "metadata": {}}}
+
+        with patch.object(comment_monitor, "_load_user_sync_state", return_value=(credentials, {})) as load, \
+             patch.object(comment_monitor, "_drop_seen_comments", side_effect=lambda user_id, c: list(c)), \
+             patch.object(comment_monitor, "_save_sync_state") as save, \
+             patch.object(comment_monitor, "fetch_instagram_comments", AsyncMock(return_value=comments)), \
+             patch.object(comment_monitor, "generate_ai_replies", AsyncMock(side_effect=thank_all)), \
+             patch.object(comment_monitor, "post_instagram_reply", AsyncMock(return_value=True)) as reply:
+            sent = asyncio.run(comment_monitor.process_user_auto_replies(make_settings("user-1")))
+
+        assert sent == 2
+        load.assert_called_once_with("user-1", ["instagram"])
+        save.assert_called_once()
+        assert all(call.args[2] == "token" for call in reply.call_args_list)
+
+
+class GraphAPIStub:
+    """Answers field-expanded media requests and batch calls from canned pages"""
+    def __init__(self, posts, extra_pages):
+        self.posts = posts
+        self.extra_pages = extra_pages
+        self.requests = []
+
+    def handler(self, request):
+        self.requests.append(request)
+        if request.method == "GET":
+            return httpx.Response(200, json={"data": self.posts})
+
+        batch = json.loads(parse_qs(request.content.decode())["batch"][0])
+        responses = []
+        for item in batch:
+            post_id = item["relative_url"].split("/")[0]
+            responses.append({"code": 200, "body": json.dumps(self.extra_pages[post_id])})
+        return httpx.Response(200, json=responses)
+
+    def client_factory(self):
+        real_client = httpx.AsyncClient
+        return lambda **kwargs: real_client(transport=httpx.MockTransport(self.handler))
+
+
+def ig_comment(comment_id, hour):
+    return {"id": comment_id, "username": "fan", "text": "Love it", "timestamp": f"2026-01-01T{hour:02d}:00:00+0000"}
+
+
+def page(comments, after=None):
+    result = {"data": comments}
+    if after:
+        result["paging"] = {"cursors": {"after": after}, "next": "https://graph.facebook.com/next"}
+    return result
+
+
+class TestGraphFetching:
+    """Test that fetchers use field expansion and batch paging instead of a request per post"""
+
+    def test_instagram_uses_one_request_plus_batched_pages(self):
+        """Test that 10 posts cost one GET, and extra comment pages share one batch call"""
+        posts = [{"id": f"m{i}", "comments": page([ig_comment(f"c{i}", 12)])} for i in range(10)]
+        posts[0]["comments"] = page([ig_comment("c0", 12)], after="cur-0")
+        posts[1]["comments"] = page([ig_comment("c1", 12)], after="cur-1")
+        stub = GraphAPIStub(posts, {
+            "m0": page([ig_comment("c0b", 13)]),
+            "m1": page([ig_comment("c1b", 8)]),  # older than `since`
+        })
+
+        with patch.object(comment_monitor.httpx, "AsyncClient", stub.client_factory()):
+            comments = asyncio.run(comment_monitor.fetch_instagram_comments(
+                "token", datetime(2026, 1, 1, 10, 0)
+            ))
+
+        assert len(stub.requests) == 2
+        assert "comments.limit(50)" in stub.requests[0].url.params["fields"]
+        assert sorted(c["id"] for c in comments) == sorted([f"c{i}" for i in range(10)] + ["c0b"])
+
+    def test_paging_cursor_is_escaped(self):
+        """Test that a base64 cursor with +, / and = reaches the Graph API intact"""
+        cursor = "QVFIUm+abc/def=="
+        posts = [{"id": "m0", "comments": page([ig_comment("c0", 12)], after=cursor)}]
+        stub = GraphAPIStub(posts, {"m0": page([ig_comment("c0b", 13)])})
+
+        with patch.object(comment_monitor.httpx, "AsyncClient", stub.client_factory()):
+            asyncio.run(comment_monitor.fetch_instagram_comments("token", datetime(2026, 1, 1, 10, 0)))
+
+        batch = json.loads(parse_qs(stub.requests[1].content.decode())["batch"][0])
+        query = parse_qs(batch[0]["relative_url"].split("?", 1)[1])
+        assert query["after"] == [cursor]
+        assert query["fields"] == ["id,username,text,timestamp"]
+
+    def test_facebook_stops_paging_at_old_comments(self):
+        """Test that newest-first comments stop paging once `since` is reached"""
+        def fb_comment(comment_id, hour):
+            return {"id": comment_id, "from": {"id": "1", "name": "Fan"}, "message": "Nice",
+                    "created_time": f"2026-01-01T{hour:02d}:00:00+0000"}
+
+        posts = [{"id": "p1", "comments": page([fb_comment("new", 12), fb_comment("old", 9)], after="cur")}]
+        stub = GraphAPIStub(posts, {})
+
+        with patch.object(comment_monitor.httpx, "AsyncClient", stub.client_factory()):
+            comments = asyncio.run(comment_monitor.fetch_facebook_comments(
+                "page-token", "page-1", datetime(2026, 1, 1, 10, 0, tzinfo=timezone.utc)
+            ))
+
+        assert [c["id"] for c in comments] == ["new"]
+        assert len(stub.requests) == 1
+        assert "comments.order(reverse_chronological)" in stub.requests[0].url.params["fields"]
+
+
+class TestIncrementalSync:
+    """Test cursors and the seen-comment index"""
+
+    def run_user(self, comments, seen=(), max_replies=10, reply_ok=True, cursors=None, attempts=None,
+                 last_check_at=None):
+        credentials = {"instagram": {"access_token": "token", "metadata": {}}}
+        settings = make_settings("user-1")
+        settings["max_replies_per_hour"] = max_replies
+        settings["last_check_at"] = last_check_at
+
+        def drop_seen(user_id, fetched):
+            new_comments = [c for c in fetched if c["id"] not in seen]
+            for c in new_comments:
+                c["reply_attempts"] = (attempts or {}).get(c["id"], 0)
+            return new_comments
+
+        with patch.object(comment_monitor, "_load_user_sync_state",
+                          return_value=(credentials, {"instagram": cursors or {}})), \
+             patch.object(comment_monitor, "_drop_seen_comments", side_effect=drop_seen), \
+             patch.object(comment_monitor, "_save_sync_state") as save, \
+             patch.object(comment_monitor, "fetch_instagram_comments", AsyncMock(return_value=comments)) as fetch, \
+             patch.object(comment_monitor, "generate_ai_replies", AsyncMock(side_effect=thank_all)), \
+             patch.object(comment_monitor, "post_instagram_reply", AsyncMock(return_value=reply_ok)) as reply:
+            asyncio.run(comment_monitor.process_user_auto_replies(settings))
+
+        _, marks, handled, self.failed = save.call_args.args
+        return fetch, reply, marks, handled
+
+    def test_seen_comments_are_not_answered_again(self):
+        """Test that a comment handled in an earlier run gets no second reply"""
+        comments = [make_comment("c1", 12), make_comment("c2", 13)]
+
+        _, reply, marks, handled = self.run_user(comments, seen={"c1"})
+
+        assert [call.args[0] for call in reply.call_args_list] == ["c2"]
+        assert [(c["id"], replied) for c, replied in handled] == [("c2", True)]
+        assert marks[("instagram", "m1")].hour == 13
+
+    def test_cursors_are_passed_to_fetcher(self):
+        """Test that each post's high-water mark replaces the clock-based `since`"""
+        mark = datetime(2026, 1, 1, 11, 0, tzinfo=timezone.utc)
+
+        fetch, _, _, _ = self.run_user([], cursors={"m1": mark})
+
+        assert fetch.call_args.args[2] == {"m1": mark}
+
+    def test_new_posts_start_from_the_platform_clock(self):
+        """Test that posts without a cursor start before the newest cursor, not at our last_check_at"""
+        mark = datetime(2026, 1, 1, 11, 0, tzinfo=timezone.utc)
+        # Our clock ran ahead of the platform's
+        last_check = datetime(2026, 1, 1, 13, 0, tzinfo=timezone.utc)
+
+        fetch, _, _, _ = self.run_user([], cursors={"m1": mark}, last_check_at=last_check)
+
+        lookback = timedelta(minutes=comment_monitor.NEW_POST_LOOKBACK_MINUTES)
+        assert fetch.call_args.args[1] == mark - lookback
+
+    def test_first_run_overlaps_the_last_check(self):
+        """Test that a platform with no cursors yet still looks back before last_check_at"""
+        last_check = datetime(2026, 1, 1, 13, 0, tzinfo=timezone.utc)
+
+        since = comment_monitor._new_post_since({}, last_check)
+
+        assert since == last_check - timedelta(minutes=comment_monitor.NEW_POST_LOOKBACK_MINUTES)
+
+    def test_rate_limited_comments_hold_the_cursor_back(self):
+        """Test that comments left unanswered are fetched again next run"""
+        comments = [make_comment("c3", 14), make_comment("c1", 12), make_comment("c2", 13)]
+
+        _, reply, marks, handled = self.run_user(comments, max_replies=1)
+
+        assert [call.args[0] for call in reply.call_args_list] == ["c1"]
+        assert [c["id"] for c, _ in handled] == ["c1"]
+        assert marks[("instagram", "m1")].hour == 13
+
+    def test_failed_reply_is_retried(self):
+        """Test that a reply the platform rejected is not marked as handled"""
+        _, _, marks, handled = self.run_user([make_comment("c1", 12)], reply_ok=False)
+
+        assert handled == []
+        assert marks[("instagram", "m1")].hour == 12
+        assert [(c["id"], c["reply_attempts"]) for c in self.failed] == [("c1", 1)]
+
+    def test_repeatedly_failing_reply_releases_the_cursor(self):
+        """Test that a comment at the attempt cap is given up on so the cursor moves past it"""
+        comments = [make_comment("stuck", 12), make_comment("c2", 13)]
+        attempts = {"stuck": comment_monitor.MAX_REPLY_ATTEMPTS - 1}
+
+        _, reply, marks, handled = self.run_user(comments, reply_ok=False, attempts=attempts)
+
+        assert reply.call_count == 2
+        assert [(c["id"], replied) for c, replied in handled] == [("stuck", False)]
+        assert [c["id"] for c in self.failed] == ["c2"]
+        # Held back only by c2, not pinned at the stuck comment
+        assert marks[("instagram", "m1")].hour == 13
+
+    def test_prune_keeps_seen_rows_at_or_after_the_cursor(self):
+        """Test that old seen rows a pinned cursor would refetch are not pruned"""
+        statements = []
+
+        class RecordingCursor:
+            def execute(self, query, params=None):
+                statements.append(query)
+
+            def close(self):
+                pass
+
+        class RecordingConnection:
+            def cursor(self):
+                return RecordingCursor()
+
+            def commit(self):
+                pass
+
+        @contextmanager
+        def connection():
+            yield RecordingConnection()
+
+        with patch.object(comment_monitor, "get_worker_db_connection", connection):
+            comment_monitor._prune_sync_state()
+
+        seen_delete = next(q for q in statements if "DELETE FROM seen_comments" in q)
+        assert "NOT EXISTS" in seen_delete
+        assert "sync.last_comment_at <= seen.comment_created_at" in seen_delete
+
+    def test_fetcher_returns_comments_at_the_cursor(self):
+        """Test that same-second comments at the mark are refetched (the seen index dedupes)"""
+        posts = [{"id": "m1", "comments": page([ig_comment("at-mark", 11), ig_comment("before", 10)])}]
+        stub = GraphAPIStub(posts, {})
+
+        with patch.object(comment_monitor.httpx, "AsyncClient", stub.client_factory()):
+            comments = asyncio.run(comment_monitor.fetch_instagram_comments(
+                "token", datetime(2026, 1, 1, 0, 0), {"m1": datetime(2026, 1, 1, 11, 0, tzinfo=timezone.utc)}
+            ))
+
+        assert [c["id"] for c in comments] == ["at-mark"]
+
+
+def openai_reply(content):
+    return {"choices": [{"message": {"content": content}}]}
+
+
+class TestBatchedReplies:
+    """Test batched reply generation and the near-duplicate cache"""
+
+    def setup_method(self):
+        comment_monitor._reply_cache.clear()
+
+    def run_replies(self, comments, batch_reply=None, single_reply="Single reply", user_id="user-1"):
+        batches = []
+
+        async def fake_batch(texts, settings):
+            batches.append(list(texts))
+            return batch_reply(texts) if batch_reply else [f"Re: {text}" for text in texts]
+
+        with patch.object(comment_monitor, "_generate_reply_batch", side_effect=fake_batch), \
+             patch.object(comment_monitor, "generate_ai_reply", AsyncMock(return_value=single_reply)) as single:
+            replies = asyncio.run(comment_monitor.generate_ai_replies(comments, make_settings(user_id)))
+        return replies, batches, single
+
+    def test_comments_share_batched_calls(self):
+        """Test that 25 distinct comments cost three calls with a batch size of 10"""
+        comments = [make_comment(f"c{i}", 12, text=f"Question number {i} about pricing?") for i in range(25)]
+
+        replies, batches, single = self.run_replies(comments)
+
+        assert [len(batch) for batch in batches] == [10, 10, 5]
+        assert replies["c7"] == "Re: Question number 7 about pricing?"
+        single.assert_not_called()
+
+    def test_near_duplicates_are_answered_once_and_cached(self):
+        """Test that "Love it!!" and "love it" share one generated reply, reused next run"""
+        comments = [make_comment("c1", 12, text="Love it!!"), make_comment("c2", 12, text="love   it"),
+                    make_comment("c3", 12, text="Where can I buy this?")]
+
+        replies, batches, _ = self.run_replies(comments)
+        again, later_batches, single = self.run_replies([make_comment("c4", 13, text="LOVE IT")])
+
+        assert batches == [["Love it!!", "Where can I buy this?"]]
+        assert replies["c1"] == replies["c2"] == "Re: Love it!!"
+        assert again == {"c4": "Re: Love it!!"}
+        assert later_batches == []
+        single.assert_not_called()
+
+    def test_cached_replies_are_not_shared_between_users(self):
+        """Test that a reply cached for one user is never posted for another user's comment"""
+        self.run_replies([make_comment("c1", 12, text="Love it!!")], single_reply="Thanks from user 1")
+        replies, _, single = self.run_replies([make_comment("c2", 12, text="love it")],
+                                              single_reply="Thanks from user 2", user_id="user-2")
+
+        assert replies == {"c2": "Thanks from user 2"}
+        single.assert_called_once()
+
+    def test_missing_batch_replies_fall_back_to_single_calls(self):
+        """Test that comments the batch skipped are generated one at a time"""
+        comments = [make_comment("c1", 12, text="Is this vegan?"), make_comment("c2", 12, text="Ships to Canada?")]
+
+        replies, _, single = self.run_replies(comments, batch_reply=lambda texts: ["Yes, fully vegan!", None])
+
+        assert replies == {"c1": "Yes, fully vegan!", "c2": "Single reply"}
+        single.assert_called_once()
+
+    def test_fallback_reply_is_not_cached(self):
+        """Test that a failed generation is retried next time instead of reused"""
+        comment = make_comment("c1", 12, text="Nice")
+
+        self.run_replies([comment], batch_reply=lambda texts: [None], single_reply=comment_monitor.FALLBACK_REPLY)
+
+        assert comment_monitor._reply_cache == {}
+
+    def test_batch_parses_structured_reply(self):
+        """Test that the JSON reply is mapped back to comments by id"""
+        content = json.dumps({"replies": [{"id": "1", "reply": "Second!"}, {"id": "0", "reply": "First!"}]})
+        requests = []
+
+        def handler(request):
+            requests.append(json.loads(request.content))
+            return httpx.Response(200, json=openai_reply(content))
+
+        real_client = httpx.AsyncClient
+        with patch.object(comment_monitor.httpx, "AsyncClient",
+                          lambda **kwargs: real_client(transport=httpx.MockTransport(handler))):
+            replies = asyncio.run(comment_monitor._generate_reply_batch(["a", "b", "c"], make_settings("user-1")))
+
+        assert replies == ["First!", "Second!", None]
+        assert requests[0]["response_format"] == {"type": "json_object"}
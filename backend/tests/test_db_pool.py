@@ -0,0 +1,588 @@
+"""
+Database Connection Pool Tests
+Tests for db_pool connection checkout and return behaviour (no real database)
+"""
+
+import asyncio
+import contextvars
+import pytest
+import threading
+import time
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+from psycopg.pq import TransactionStatus
+import psycopg2
+from psycopg2 import extensions
+
+import db_pool
+
+# Captured at import time - the app fixture patches these for route tests
+_get_db_connection = db_pool.get_db_connection
+_get_async_db_connection = db_pool.get_async_db_connection
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self._connection = connection
+
+    def execute(self, query, params=None):
+        if self._connection.server_gone:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+    def fetchone(self):
+        return {"lag_seconds": self._connection.replica_lag}
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Minimal stand-in for a psycopg2 connection"""
+    def __init__(self):
+        self.closed = False
+        self.autocommit = False
+        self.server_gone = False
+        self.replica_lag = 0
+        self.info = type("Info", (), {"transaction_status": extensions.TRANSACTION_STATUS_IDLE})()
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class FakeInstrumentedPool(db_pool.InstrumentedConnectionPool):
+    """InstrumentedConnectionPool that hands out fake connections"""
+    def _connect(self, key=None):
+        conn = FakeConnection()
+        if key is not None:
+            self._used[key] = conn
+            self._rused[id(conn)] = key
+        else:
+            self._pool.append(conn)
+        return conn
+
+
+class FakeAsyncConnection:
+    """Minimal stand-in for a psycopg 3 AsyncConnection"""
+    def __init__(self):
+        self.closed = False
+        self.rollbacks = 0
+        self.info = type("Info", (), {"transaction_status": TransactionStatus.INTRANS})()
+
+    async def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = TransactionStatus.IDLE
+
+
+class FakeAsyncPool:
+    """Minimal stand-in for psycopg_pool.AsyncConnectionPool"""
+    def __init__(self):
+        self.conn = FakeAsyncConnection()
+        self.returned = []
+
+    async def getconn(self):
+        return self.conn
+
+    async def putconn(self, conn):
+        self.returned.append(conn)
+
+
+class TestAsyncConnectionPool:
+    """Test get_async_db_connection() checkout semantics"""
+
+    async def test_requires_initialized_pool(self):
+        """Test that using the async pool before init raises a clear error"""
+        with patch.object(db_pool, "_async_connection_pool", None):
+            with pytest.raises(RuntimeError, match="not initialized"):
+                async with _get_async_db_connection():
+                    pass
+
+    async def test_connection_returned_and_open_transaction_discarded(self):
+        """Test that an uncommitted read is rolled back before the connection is returned"""
+        fake_pool = FakeAsyncPool()
+
+        with patch.object(db_pool, "_async_connection_pool", fake_pool):
+            async with _get_async_db_connection() as conn:
+                assert conn is fake_pool.conn
+
+        assert fake_pool.returned == [fake_pool.conn]
+        assert fake_pool.conn.rollbacks == 1
+
+    async def test_error_rolls_back_and_returns_connection(self):
+        """Test that an exception rolls back, returns the connection and propagates"""
+        fake_pool = FakeAsyncPool()
+
+        with patch.object(db_pool, "_async_connection_pool", fake_pool):
+            with pytest.raises(ValueError):
+                async with _get_async_db_connection():
+                    raise ValueError("boom")
+
+        assert fake_pool.returned == [fake_pool.conn]
+        assert fake_pool.conn.rollbacks == 1
+
+
+class TestInstrumentedConnectionPool:
+    """Test pool usage metrics and leak detection"""
+
+    def test_tracks_in_use_idle_and_call_sites(self):
+        """Test that checkouts are counted per call site and in-use/idle are reported"""
+        instrumented = FakeInstrumentedPool(1, 5)
+
+        conn = instrumented.getconn()
+        stats = instrumented.get_stats()
+
+        assert stats["in_use"] == 1
+        assert stats["checkouts"] == 1
+        assert sum(stats["wait_ms"]["histogram"].values()) == 1
+        call_site = next(iter(stats["top_call_sites"]))
+        assert call_site.startswith("test_db_pool.py:")
+        assert "test_tracks_in_use_idle_and_call_sites" in call_site
+
+        instrumented.putconn(conn)
+        stats = instrumented.get_stats()
+
+        assert stats["in_use"] == 0
+        assert stats["idle"] == 1
+
+    def test_reports_connections_held_past_threshold(self):
+        """Test that long-held connections are flagged with the acquiring stack"""
+        instrumented = FakeInstrumentedPool(1, 5, leak_threshold=0)
+
+        conn = instrumented.getconn()
+        leaks = instrumented.get_leaked_connections()
+
+        assert len(leaks) == 1
+        assert "test_reports_connections_held_past_threshold" in leaks[0]["stack"]
+
+        instrumented.putconn(conn)
+
+        assert instrumented.get_leaked_connections() == []
+        assert instrumented.get_stats()["long_holds"] == 1
+
+
+# Keep these requests out of the shared per-client rate limit budget
+RATE_LIMIT_CHECK = "middleware.rate_limit._rate_limit_store.check_rate_limit"
+
+
+class TestQueuedCheckout:
+    """Test blocking, FIFO, timeout-bounded checkout"""
+
+    def test_times_out_when_pool_stays_exhausted(self):
+        """Test that an exhausted pool raises PoolTimeoutError after the deadline"""
+        instrumented = FakeInstrumentedPool(0, 1)
+        instrumented.getconn()
+
+        started = time.monotonic()
+        with pytest.raises(db_pool.PoolTimeoutError):
+            instrumented.getconn(timeout=0.05)
+
+        assert time.monotonic() - started >= 0.05
+        assert instrumented.get_stats()["checkout_timeouts"] == 1
+
+    def test_waiters_are_served_in_arrival_order(self):
+        """Test that queued callers get connections first-come first-served"""
+        instrumented = FakeInstrumentedPool(0, 1)
+        held = instrumented.getconn()
+        served = []
+
+        def wait_for_connection(name):
+            conn = instrumented.getconn(timeout=5)
+            served.append(name)
+            instrumented.putconn(conn)
+
+        first = threading.Thread(target=wait_for_connection, args=("first",))
+        first.start()
+        while instrumented.get_stats()["waiting"] < 1:
+            time.sleep(0.001)
+        second = threading.Thread(target=wait_for_connection, args=("second",))
+        second.start()
+        while instrumented.get_stats()["waiting"] < 2:
+            time.sleep(0.001)
+
+        instrumented.putconn(held)
+        first.join(timeout=5)
+        second.join(timeout=5)
+
+        assert served == ["first", "second"]
+
+    async def test_timeout_returns_503_with_retry_after(self, app):
+        """Test that the main.py handler maps PoolTimeoutError to a retryable 503"""
+        from main import pool_timeout_handler
+
+        request = MagicMock()
+        request.method = "GET"
+        request.url.path = "/credits/balance"
+
+        response = await pool_timeout_handler(request, db_pool.PoolTimeoutError(2.5))
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "3"
+
+    def test_route_that_catches_the_timeout_still_returns_503(self, client, auth_headers):
+        """Test that a route re-raising PoolTimeoutError as a 500 reaches the client as 503"""
+        with patch("routes.credits.get_user_credits", side_effect=db_pool.PoolTimeoutError(2)), \
+             patch(RATE_LIMIT_CHECK, return_value=(True, 100, 0)):
+            response = client.get("/credits/balance", headers=auth_headers)
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "2"
+        assert response.json() == {"detail": "Server is busy, please retry shortly"}
+
+    def test_other_route_errors_stay_500(self, client, auth_headers):
+        """Test that a 500 unrelated to the pool is passed through unchanged"""
+        with patch("routes.credits.get_user_credits", side_effect=RuntimeError("boom")), \
+             patch(RATE_LIMIT_CHECK, return_value=(True, 100, 0)):
+            response = client.get("/credits/balance", headers=auth_headers)
+
+        assert response.status_code == 500
+        assert "Retry-After" not in response.headers
+
+
+class TestConnectionLifecycle:
+    """Test max-lifetime recycling and idle pre-ping"""
+
+    def test_expired_connection_is_not_returned_to_pool(self):
+        """Test that connections past max_lifetime are closed instead of pooled"""
+        instrumented = FakeInstrumentedPool(1, 2, max_lifetime=0)
+
+        first = instrumented.getconn()
+        time.sleep(0.001)
+        instrumented.putconn(first)
+        second = instrumented.getconn()
+
+        assert first.closed
+        assert second is not first
+
+    def test_idle_connection_failing_ping_is_replaced(self):
+        """Test that a dropped idle connection is discarded and a fresh one handed out"""
+        instrumented = FakeInstrumentedPool(1, 2, ping_after_idle=0)
+
+        first = instrumented.getconn()
+        instrumented.putconn(first)
+        first.server_gone = True
+        time.sleep(0.001)
+        second = instrumented.getconn()
+
+        assert second is not first
+        assert first.closed
+        assert not first.autocommit
+        assert instrumented.get_stats()["discarded"] == {"ping_failed": 1}
+
+
+class TestReadReplicaRouting:
+    """Test readonly=True routing between replica and primary"""
+
+    @pytest.fixture
+    def pools(self):
+        primary = FakeInstrumentedPool(1, 2)
+        replica = FakeInstrumentedPool(1, 2)
+        with patch.object(db_pool, "_connection_pool", primary), \
+             patch.object(db_pool, "_replica_pool", replica), \
+             patch.dict(db_pool._replica_lag, {"checked_at": None, "lag_seconds": None, "healthy": False}):
+            yield primary, replica
+
+    def test_readonly_uses_replica_when_caught_up(self, pools):
+        """Test that readonly checkouts go to a healthy replica"""
+        primary, replica = pools
+
+        with _get_db_connection(readonly=True):
+            assert replica.get_stats()["in_use"] == 1
+            assert primary.get_stats()["in_use"] == 0
+
+    def test_readonly_falls_back_to_primary_when_replica_lags(self, pools):
+        """Test that a replica past DB_REPLICA_MAX_LAG_SECONDS is skipped"""
+        primary, replica = pools
+        replica._pool[0].replica_lag = db_pool.REPLICA_MAX_LAG_SECONDS + 10
+
+        with _get_db_connection(readonly=True):
+            assert primary.get_stats()["in_use"] == 1
+
+        assert db_pool._replica_lag["healthy"] is False
+
+    def test_writes_and_missing_replica_use_primary(self, pools):
+        """Test that default checkouts, and readonly ones without a replica, use the primary"""
+        primary, _ = pools
+
+        with _get_db_connection():
+            assert primary.get_stats()["in_use"] == 1
+
+        with patch.object(db_pool, "_replica_pool", None):
+            with _get_db_connection(readonly=True):
+                assert primary.get_stats()["in_use"] == 1
+
+
+class RecordingAsyncCursor:
+    """Async cursor that records execute() calls"""
+    def __init__(self, connection):
+        self.connection = connection
+        self.calls = []
+
+    async def execute(self, query, params=None, **kwargs):
+        self.calls.append((query, params, kwargs.get("prepare")))
+
+
+class TestPreparedStatements:
+    """Test the prepared statement registry"""
+
+    @pytest.fixture
+    def registry(self):
+        with patch.dict(db_pool._prepared_statements, clear=True), \
+             patch.object(db_pool, "_prepared_on", db_pool.weakref.WeakKeyDictionary()), \
+             patch.object(db_pool, "_prepared_counts", db_pool.Counter()):
+            yield
+
+    async def test_prepares_once_per_connection(self, registry):
+        """Test that each connection prepares a statement once and then reuses it"""
+        name = db_pool.register_prepared_statement("users.by_id", "SELECT * FROM users WHERE id = %s")
+        first, second = FakeAsyncConnection(), FakeAsyncConnection()
+
+        for conn in (first, first, first, second):
+            cursor = RecordingAsyncCursor(conn)
+            await db_pool.execute_prepared(cursor, name, ("user-1",))
+            assert cursor.calls == [("SELECT * FROM users WHERE id = %s", ("user-1",), True)]
+
+        stats = db_pool.get_prepared_statement_stats()
+        assert stats["registered"] == ["users.by_id"]
+        assert stats["prepared"] == 2
+        assert stats["reused"] == 2
+
+    async def test_disabled_runs_unprepared(self, registry):
+        """Test that DB_PREPARED_STATEMENTS_ENABLED=false falls back to plain execute"""
+        name = db_pool.register_prepared_statement("users.by_id", "SELECT * FROM users WHERE id = %s")
+        cursor = RecordingAsyncCursor(FakeAsyncConnection())
+
+        with patch.object(db_pool, "PREPARED_STATEMENTS_ENABLED", False):
+            await db_pool.execute_prepared(cursor, name, ("user-1",))
+
+        assert cursor.calls == [("SELECT * FROM users WHERE id = %s", ("user-1",), None)]
+
+    def test_disabled_turns_off_automatic_prepares(self):
+        """Test that DB_PREPARED_STATEMENTS_ENABLED=false also stops psycopg preparing repeated queries"""
+        with patch.object(db_pool, "AsyncConnectionPool") as pool_class:
+            db_pool._create_async_connection_pool("postgresql://db", 1, 2)
+            with patch.object(db_pool, "PREPARED_STATEMENTS_ENABLED", False):
+                db_pool._create_async_connection_pool("postgresql://db", 1, 2)
+
+        enabled, disabled = (call.kwargs["kwargs"] for call in pool_class.call_args_list)
+        assert "prepare_threshold" not in enabled
+        assert disabled["prepare_threshold"] is None
+
+    def test_name_cannot_be_reused_for_different_sql(self, registry):
+        """Test that registering a name twice with different SQL is rejected"""
+        db_pool.register_prepared_statement("users.by_id", "SELECT * FROM users WHERE id = %s")
+        db_pool.register_prepared_statement("users.by_id", "SELECT * FROM users WHERE id = %s")
+
+        with pytest.raises(ValueError):
+            db_pool.register_prepared_statement("users.by_id", "SELECT id FROM users")
+
+
+class TestWorkerPool:
+    """Test the capped background worker partition"""
+
+    def test_worker_checkouts_are_capped_separately(self):
+        """Test that an exhausted worker pool times out without touching the API pool"""
+        primary = FakeInstrumentedPool(1, 2)
+        workers = FakeInstrumentedPool(0, 1)
+
+        with patch.object(db_pool, "_connection_pool", primary), \
+             patch.object(db_pool, "_worker_pool", workers):
+            with db_pool.get_worker_db_connection():
+                with pytest.raises(db_pool.PoolTimeoutError):
+                    with db_pool.get_worker_db_connection(timeout=0.05):
+                        pass
+
+                with _get_db_connection():
+                    assert primary.get_stats()["in_use"] == 1
+
+        assert workers.get_stats()["in_use"] == 0
+        assert primary.get_stats()["checkouts"] == 1
+
+    def test_worker_connection_reused_between_runs(self):
+        """Test that consecutive job runs share one connection instead of reconnecting"""
+        workers = FakeInstrumentedPool(1, 3)
+
+        with patch.object(db_pool, "_worker_pool", workers):
+            with db_pool.get_worker_db_connection() as first:
+                pass
+            with db_pool.get_worker_db_connection() as second:
+                pass
+
+        assert first is second
+        assert not first.closed
+
+    async def test_async_jobs_queue_for_worker_connections(self):
+        """Test that more concurrent jobs than worker connections queue instead of timing out"""
+        workers = FakeInstrumentedPool(0, db_pool.WORKER_POOL_MAX_CONNECTIONS)
+        peak = {"in_use": 0}
+
+        def short_query():
+            # A short deadline: jobs left waiting in the pool itself would time out
+            with db_pool.get_worker_db_connection(timeout=0.01):
+                peak["in_use"] = max(peak["in_use"], workers.get_stats()["in_use"])
+                time.sleep(0.05)
+
+        with patch.object(db_pool, "_worker_pool", workers):
+            await asyncio.gather(*(db_pool.run_in_worker_pool(short_query) for _ in range(30)))
+
+        assert workers.get_stats()["checkouts"] == 30
+        assert peak["in_use"] <= db_pool.WORKER_POOL_MAX_CONNECTIONS
+
+    def test_health_ignores_busy_workers(self, client):
+        """Test that /health probes the request pool, so busy workers can't fail it"""
+        with patch.object(db_pool, "get_worker_db_connection", side_effect=db_pool.PoolTimeoutError(2)), \
+             patch(RATE_LIMIT_CHECK, return_value=(True, 100, 0)):
+            response = client.get("/health")
+
+        assert response.json()["database"]["connected"] is True
+
+
+class TestNestedCheckouts:
+    """Test that nested checkouts join the outer connection"""
+
+    def test_nested_sync_checkout_reuses_outer_connection(self):
+        """Test that a helper called inside a connection block does not take a second connection"""
+        primary = FakeInstrumentedPool(1, 1)
+
+        with patch.object(db_pool, "_connection_pool", primary):
+            with _get_db_connection() as outer:
+                with _get_db_connection() as inner:
+                    with _get_db_connection(readonly=True) as read:
+                        assert inner is outer
+                        assert read is outer
+                assert primary.get_stats()["in_use"] == 1
+
+            assert primary.get_stats()["checkouts"] == 1
+            assert primary.get_stats()["in_use"] == 0
+
+            # Scope ends with the outermost block
+            with _get_db_connection():
+                pass
+            assert primary.get_stats()["checkouts"] == 2
+
+    def test_write_inside_replica_block_uses_primary(self):
+        """Test that a write nested in a readonly replica block is not sent to the replica"""
+        primary = FakeInstrumentedPool(1, 2)
+        replica = FakeInstrumentedPool(1, 2)
+
+        with patch.object(db_pool, "_connection_pool", primary), \
+             patch.object(db_pool, "_replica_pool", replica), \
+             patch.dict(db_pool._replica_lag, {"checked_at": None, "lag_seconds": None, "healthy": False}):
+            with _get_db_connection(readonly=True) as read:
+                with _get_db_connection() as write:
+                    assert write is not read
+                    assert primary.get_stats()["in_use"] == 1
+
+    async def test_nested_async_checkout_reuses_outer_connection(self):
+        """Test that nested async helpers join the outer transaction and only the outer block returns it"""
+        fake_pool = FakeAsyncPool()
+
+        with patch.object(db_pool, "_async_connection_pool", fake_pool):
+            async with _get_async_db_connection() as outer:
+                async with _get_async_db_connection() as inner:
+                    assert inner is outer
+                assert fake_pool.returned == []
+                assert fake_pool.conn.rollbacks == 0
+
+        assert fake_pool.returned == [fake_pool.conn]
+
+    def test_thread_started_inside_block_gets_its_own_connection(self):
+        """Test that a thread inheriting the context (asyncio.to_thread) does not share the connection"""
+        primary = FakeInstrumentedPool(1, 2)
+        seen = {}
+
+        def helper():
+            with _get_db_connection() as conn:
+                seen["thread"] = conn
+
+        with patch.object(db_pool, "_connection_pool", primary):
+            with _get_db_connection() as outer:
+                worker = threading.Thread(target=contextvars.copy_context().run, args=(helper,))
+                worker.start()
+                worker.join()
+
+        assert seen["thread"] is not outer
+        assert primary.get_stats()["checkouts"] == 2
+
+    async def test_task_created_inside_sync_block_gets_its_own_connection(self):
+        """Test that a task spawned in a sync block on the event loop does not reuse the outer connection"""
+        primary = FakeInstrumentedPool(1, 2)
+
+        def helper():
+            with _get_db_connection() as conn:
+                return conn
+
+        async def in_task():
+            return helper()
+
+        with patch.object(db_pool, "_connection_pool", primary):
+            with _get_db_connection() as outer:
+                task = asyncio.create_task(in_task())
+                joined = helper()
+            # The task runs after the outer block has returned its connection
+            await task
+
+        assert joined is outer
+        # Joining would reuse the returned connection without a checkout
+        assert primary.get_stats()["checkouts"] == 2
+        assert primary.get_stats()["in_use"] == 0
+
+    async def test_task_created_inside_block_gets_its_own_connection(self):
+        """Test that a task spawned in an async block does not reuse the outer connection"""
+        class FreshConnectionPool(FakeAsyncPool):
+            async def getconn(self):
+                return FakeAsyncConnection()
+
+        fake_pool = FreshConnectionPool()
+
+        async def helper():
+            async with _get_async_db_connection() as conn:
+                return conn
+
+        with patch.object(db_pool, "_async_connection_pool", fake_pool):
+            async with _get_async_db_connection() as outer:
+                in_task = await asyncio.create_task(helper())
+                joined = await helper()
+
+        assert in_task is not outer
+        assert joined is outer
+
+    async def test_joined_credit_deduction_uses_a_savepoint(self):
+        """Test that deduct_credits inside a caller's block never commits or rolls back the caller's work"""
+        from utils import credits
+
+        class TransactionConnection(FakeAsyncConnection):
+            def __init__(self):
+                super().__init__()
+                self.commits = 0
+                self.transactions = 0
+                self.cursor = MagicMock(return_value=MagicMock(
+                    execute=AsyncMock(), fetchone=AsyncMock(return_value={"transaction_id": "tx-1"}),
+                    close=AsyncMock()))
+
+            async def commit(self):
+                self.commits += 1
+
+            @asynccontextmanager
+            async def transaction(self):
+                self.transactions += 1
+                yield
+
+        fake_pool = FakeAsyncPool()
+        fake_pool.conn = TransactionConnection()
+
+        with patch.object(db_pool, "_async_connection_pool", fake_pool), \
+             patch.object(credits, "get_async_db_connection", _get_async_db_connection), \
+             patch.object(credits, "check_sufficient_credits", AsyncMock(return_value=True)), \
+             patch.object(credits, "get_user_credits", AsyncMock(return_value={"balance": 95})):
+            async with _get_async_db_connection():
+                result = await credits.deduct_credits("user-1", "social_caption", credits=5)
+                assert fake_pool.conn.commits == 0
+                assert fake_pool.conn.rollbacks == 0
+
+        assert result["balance_after"] == 95
+        assert fake_pool.conn.transactions == 1
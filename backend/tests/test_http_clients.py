@@ -0,0 +1,161 @@
+"""
+Shared HTTP Client Tests
+Tests for the app-lifetime client registry (no real network)
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import httpx
+
+import http_clients
+from http_clients import http_client, http_client_scope, TIMEOUTS
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Counts requests and remembers their timeouts"""
+    def __init__(self):
+        self.timeouts = []
+
+    async def handle_async_request(self, request):
+        self.timeouts.append(request.extensions.get("timeout"))
+        return httpx.Response(200, json={"ok": True})
+
+
+def mock_clients():
+    """Patch client creation; returns the list of created clients"""
+    created = []
+    real_client = httpx.AsyncClient
+
+    def create():
+        client = real_client(transport=RecordingTransport())
+        created.append(client)
+        return client
+    return patch.object(http_clients, "_create_client", create), created
+
+
+class TestClientRegistry:
+    """Test that platform calls reuse app-lifetime clients"""
+
+    def test_app_loop_reuses_one_client_per_platform(self):
+        """Test that repeated blocks on the app loop share a client, per platform name"""
+        creator, created = mock_clients()
+
+        async def app():
+            await http_clients.init_http_clients()
+            for _ in range(3):
+                async with http_client("instagram") as client:
+                    await client.get("https://graph.facebook.com/me")
+            async with http_client("linkedin") as client:
+                await client.get("https://api.linkedin.com/v2/me")
+            still_open = [not c.is_closed for c in created]
+            await http_clients.close_http_clients()
+            return still_open
+
+        with creator:
+            still_open = asyncio.run(app())
+
+        assert len(created) == 2
+        assert still_open == [True, True]
+        assert all(c.is_closed for c in created)
+
+    def test_other_loops_get_short_lived_clients(self):
+        """Test that clients are never shared with a loop other than the app's"""
+        creator, created = mock_clients()
+
+        async def worker():
+            async with http_client("instagram") as client:
+                await client.get("https://graph.facebook.com/me")
+
+        with creator:
+            asyncio.run(worker())
+            asyncio.run(worker())
+
+        assert len(created) == 2
+        assert all(c.is_closed for c in created)
+
+    def test_scope_shares_clients_for_a_batch(self):
+        """Test that a scheduler batch shares one client per platform and closes it after"""
+        creator, created = mock_clients()
+
+        async def batch():
+            async def publish():
+                async with http_client("facebook") as client:
+                    await client.post("https://graph.facebook.com/feed")
+
+            async with http_client_scope():
+                await asyncio.gather(*(publish() for _ in range(5)))
+
+        with creator:
+            asyncio.run(batch())
+
+        assert len(created) == 1
+        assert created[0].is_closed
+
+    def test_block_timeout_applies_per_request(self):
+        """Test that each block's timeout is sent with its requests, unless overridden"""
+        creator, created = mock_clients()
+
+        async def calls():
+            async with http_client_scope():
+                async with http_client("youtube", timeout="video") as client:
+                    await client.post("https://www.googleapis.com/upload")
+                    await client.get("https://www.googleapis.com/status", timeout=5.0)
+                async with http_client("youtube", timeout=60.0) as client:
+                    await client.get("https://www.googleapis.com/thumb")
+
+        with creator:
+            asyncio.run(calls())
+
+        timeouts = created[0]._transport.timeouts
+        assert timeouts[0]["read"] == TIMEOUTS["video"].read
+        assert timeouts[1]["read"] == 5.0
+        assert timeouts[2] == {"connect": 10.0, "read": 60.0, "write": 60.0, "pool": 60.0}
+
+
+class TestHttp2Detection:
+    """Test that HTTP/2 support is detected once, not per client"""
+
+    def test_missing_h2_is_checked_and_logged_once(self):
+        """Test that creating many clients without h2 imports and warns only once"""
+        http_clients._http2_available.cache_clear()
+        try:
+            with patch.object(http_clients, "HTTP2_ENABLED", True), \
+                 patch.dict("sys.modules", {"h2": None}), \
+                 patch.object(http_clients.logger, "warning") as warning, \
+                 patch.object(http_clients.httpx, "AsyncClient") as client_class:
+                for _ in range(3):
+                    http_clients._create_client()
+
+            warning.assert_called_once()
+            assert all(call.kwargs["http2"] is False for call in client_class.call_args_list)
+        finally:
+            http_clients._http2_available.cache_clear()
+
+
+class TestSharedClientIsolation:
+    """Test that shared clients carry no state between tenants"""
+
+    def test_set_cookie_is_not_sent_on_later_requests(self):
+        """Test that a cookie set for one user's call never reaches the next request"""
+        sent_cookies = []
+
+        def handler(request):
+            sent_cookies.append(request.headers.get("Cookie"))
+            return httpx.Response(200, headers={"Set-Cookie": "session=user-a; Path=/"})
+
+        real_client = httpx.AsyncClient
+
+        async def calls():
+            client = http_clients._create_client()
+            async with client:
+                await client.get("https://graph.facebook.com/me")
+                await client.get("https://graph.facebook.com/me")
+            return client
+
+        with patch.object(http_clients.httpx, "AsyncClient",
+                          lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs)):
+            client = asyncio.run(calls())
+
+        assert sent_cookies == [None, None]
+        assert len(client.cookies.jar) == 0
@@ -0,0 +1,179 @@
+"""
+Instagram Publisher Tests
+Tests for concurrent carousel containers and container readiness polling (no real network)
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import patch
+from urllib.parse import parse_qs
+
+import httpx
+
+from routes import publisher
+from routes.publisher import InstagramPublisher
+
+
+class FakeGraphAPI:
+    """Media container endpoints; each container reports IN_PROGRESS a few times before FINISHED"""
+
+    def __init__(self, polls_until_ready=0, fail_image=None, final_status="FINISHED",
+                 drop_image=None, status_error=None):
+        self.polls_until_ready = polls_until_ready
+        self.fail_image = fail_image
+        self.final_status = final_status
+        self.drop_image = drop_image
+        self.status_error = status_error
+        self.containers = {}
+        self.polls = {}
+        self.published = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def handler(self, request):
+        if request.method == "GET":
+            container_id = request.url.path.rsplit("/", 1)[1]
+            self.polls[container_id] = self.polls.get(container_id, 0) + 1
+            if self.status_error:
+                return httpx.Response(self.status_error, json={"error": {"message": "Invalid OAuth access token"}})
+            ready = self.polls[container_id] > self.polls_until_ready
+            return httpx.Response(200, json={
+                "id": container_id,
+                "status_code": self.final_status if ready else "IN_PROGRESS",
+                "status": "Error: media could not be fetched" if self.final_status == "ERROR" else ""
+            })
+
+        form = {k: v[0] for k, v in parse_qs((await request.aread()).decode()).items()}
+        if request.url.path.endswith("/media_publish"):
+            self.published.append(form["creation_id"])
+            return httpx.Response(200, json={"id": "post-1"})
+
+        if self.drop_image and form.get("image_url") == self.drop_image:
+            raise httpx.ConnectError("connection reset")
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+
+        if self.fail_image and form.get("image_url") == self.fail_image:
+            return httpx.Response(400, json={"error": {"message": "Invalid image"}})
+        container_id = f"container-{len(self.containers)}"
+        self.containers[container_id] = form
+        return httpx.Response(200, json={"id": container_id})
+
+
+def run_publish(api, method, *args):
+    sleeps = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(seconds):
+        # Skip poll backoff; keep the fake API's short yields
+        if seconds >= 1:
+            sleeps.append(seconds)
+        else:
+            await real_sleep(seconds)
+
+    @asynccontextmanager
+    async def fake_client(name="default", timeout=None):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(api.handler)) as client:
+            yield client
+
+    async def publish():
+        result = await getattr(ig, method)(*args)
+        # Anything still running here was orphaned by the publisher
+        orphans = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        assert orphans == []
+        return result
+
+    ig = InstagramPublisher(access_token="token", business_account_id="ig-1")
+    with patch.object(publisher, "http_client", fake_client), \
+         patch.object(publisher.asyncio, "sleep", fake_sleep):
+        result = asyncio.run(publish())
+    return result, sleeps
+
+
+class TestCarouselContainers:
+    """Test that carousel children are created concurrently and published only when ready"""
+
+    def test_children_created_concurrently_in_order(self):
+        """Test that 10 children overlap up to the limit and keep their order in the carousel"""
+        api = FakeGraphAPI()
+        urls = [f"https://cdn.example.com/{i}.jpg" for i in range(10)]
+
+        with patch.object(publisher, "INSTAGRAM_CONTAINER_CONCURRENCY", 4):
+            result, _ = run_publish(api, "publish_carousel", "Caption", urls)
+
+        assert result["success"] is True
+        assert api.peak_in_flight == 4
+        carousel = next(form for form in api.containers.values() if form.get("media_type") == "CAROUSEL")
+        child_urls = [api.containers[child]["image_url"] for child in carousel["children"].split(",")]
+        assert child_urls == urls
+
+    def test_publish_waits_for_finished_containers(self):
+        """Test that containers are polled with backoff until FINISHED before publishing"""
+        api = FakeGraphAPI(polls_until_ready=3)
+
+        result, sleeps = run_publish(api, "publish_carousel", "Caption", ["https://cdn.example.com/a.jpg"])
+
+        assert result["success"] is True
+        assert all(count == 4 for count in api.polls.values())
+        assert sleeps[:3] == [1.0, 2.0, 4.0]
+        assert len(api.published) == 1
+
+    def test_failed_child_stops_the_carousel(self):
+        """Test that one rejected image fails the post without publishing"""
+        api = FakeGraphAPI(fail_image="https://cdn.example.com/bad.jpg")
+        urls = ["https://cdn.example.com/a.jpg", "https://cdn.example.com/bad.jpg"]
+
+        result, _ = run_publish(api, "publish_carousel", "Caption", urls)
+
+        assert result["success"] is False
+        assert "Invalid image" in result["error"]
+        assert api.published == []
+
+    def test_network_error_cancels_sibling_children(self):
+        """Test that a transport error on one child stops the others instead of orphaning them"""
+        api = FakeGraphAPI(drop_image="https://cdn.example.com/bad.jpg")
+        urls = ["https://cdn.example.com/bad.jpg"] + [f"https://cdn.example.com/{i}.jpg" for i in range(4)]
+
+        result, _ = run_publish(api, "publish_carousel", "Caption", urls)
+
+        assert result["success"] is False
+        assert "connection reset" in result["error"]
+        assert api.published == []
+
+    def test_status_client_error_fails_fast(self):
+        """Test that a 4xx from the status check fails at once instead of polling to the timeout"""
+        api = FakeGraphAPI(status_error=400)
+
+        result, sleeps = run_publish(api, "publish_carousel", "Caption", ["https://cdn.example.com/a.jpg"])
+
+        assert result["success"] is False
+        assert "Invalid OAuth access token" in result["error"]
+        assert sleeps == []
+        assert api.polls == {"container-0": 1}
+
+
+class TestReelReadiness:
+    """Test that Reels use the same readiness poller"""
+
+    def test_reel_waits_until_processed(self):
+        """Test that a Reel is published only after its container is FINISHED"""
+        api = FakeGraphAPI(polls_until_ready=2)
+
+        result, _ = run_publish(api, "publish_reel", "Caption", "https://cdn.example.com/v.mp4")
+
+        assert result["success"] is True
+        assert api.polls == {"container-0": 3}
+        assert api.published == ["container-0"]
+
+    def test_reel_processing_error_is_reported(self):
+        """Test that an ERROR status fails the Reel instead of publishing it"""
+        api = FakeGraphAPI(final_status="ERROR")
+
+        result, _ = run_publish(api, "publish_reel", "Caption", "https://cdn.example.com/v.mp4")
+
+        assert result["success"] is False
+        assert "could not be fetched" in result["error"]
+        assert api.published == []
@@ -0,0 +1,155 @@
+"""
+Media Relay Tests
+Tests for streaming a source URL into a resumable upload (no real network)
+"""
+
+import asyncio
+import re
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from utils import media_upload
+from utils.media_upload import MediaUploadError, relay_resumable_upload
+
+SOURCE_URL = "https://cdn.example.com/video.mp4"
+SESSION_URL = "https://upload.example.com/session/1"
+CHUNK = 256 * 1024
+
+
+class ResumableServer:
+    """
+    Source CDN plus a resumable upload session (YouTube semantics: 308 with
+    Range for intermediate chunks, 200 when the last byte arrives)
+    """
+
+    def __init__(self, video, send_length=True, piece_size=64 * 1024, drop_source_at=None,
+                 fail_puts=(), partial_put=None):
+        self.video = video
+        self.send_length = send_length
+        self.piece_size = piece_size
+        self.drop_source_at = drop_source_at
+        self.fail_puts = set(fail_puts)
+        self.partial_put = partial_put
+        self.stored = bytearray()
+        self.put_sizes = []
+        self.source_ranges = []
+        self.puts = 0
+
+    def source_body(self, start):
+        async def pieces():
+            position = start
+            while position < len(self.video):
+                if self.drop_source_at is not None and position >= self.drop_source_at:
+                    self.drop_source_at = None
+                    raise httpx.ReadError("connection reset")
+                yield self.video[position:position + self.piece_size]
+                position += self.piece_size
+        return pieces()
+
+    def status(self):
+        headers = {"Range": f"bytes=0-{len(self.stored) - 1}"} if self.stored else {}
+        if len(self.stored) == len(self.video):
+            return httpx.Response(200, json={"id": "video-1"})
+        return httpx.Response(308, headers=headers)
+
+    async def handler(self, request):
+        if request.method == "GET":
+            match = re.match(r"bytes=(\d+)-", request.headers.get("Range", ""))
+            start = int(match.group(1)) if match else 0
+            self.source_ranges.append(start)
+            headers = {"Content-Length": str(len(self.video) - start)} if self.send_length else {}
+            return httpx.Response(206 if start else 200, headers=headers, content=self.source_body(start))
+
+        body = await request.aread()
+        self.puts += 1
+        content_range = request.headers["Content-Range"]
+        if content_range.startswith("bytes */"):
+            return self.status()
+
+        self.put_sizes.append(len(body))
+        if self.puts in self.fail_puts:
+            raise httpx.WriteError("broken pipe")
+
+        start = int(re.match(r"bytes (\d+)-", content_range).group(1))
+        assert start == len(self.stored), f"upload resumed at {start}, server has {len(self.stored)}"
+        if self.partial_put == self.puts:
+            # Session keeps only half the chunk before the connection dies
+            self.stored += body[:len(body) // 2]
+            raise httpx.WriteError("broken pipe")
+        self.stored += body
+        return self.status()
+
+
+def run_relay(server, **kwargs):
+    sessions = []
+
+    async def start_session(total):
+        sessions.append(total)
+        return SESSION_URL
+
+    async def relay():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(server.handler)) as client:
+            return await relay_resumable_upload(client, SOURCE_URL, start_session, chunk_size=CHUNK, **kwargs)
+
+    with patch.object(media_upload, "RELAY_RETRY_BASE_SECONDS", 0):
+        response = asyncio.run(relay())
+    return response, sessions
+
+
+class TestMediaRelay:
+    """Test that videos are relayed in bounded chunks and resume after failures"""
+
+    def test_relay_uploads_in_bounded_chunks(self):
+        """Test that the whole video arrives while no PUT exceeds one chunk"""
+        video = bytes(range(256)) * 4000  # ~1 MB
+        server = ResumableServer(video)
+        progress = []
+
+        response, sessions = run_relay(server, on_progress=lambda done, total: progress.append(done))
+
+        assert response.json() == {"id": "video-1"}
+        assert bytes(server.stored) == video
+        assert sessions == [len(video)]
+        assert max(server.put_sizes) <= CHUNK
+        assert progress[-1] == len(video)
+
+    def test_unknown_size_marks_total_on_last_chunk(self):
+        """Test that a source without Content-Length still completes the session"""
+        video = b"x" * (CHUNK * 2 + 100)
+        server = ResumableServer(video, send_length=False)
+
+        response, sessions = run_relay(server)
+
+        assert response.status_code == 200
+        assert sessions == [None]
+        assert bytes(server.stored) == video
+
+    def test_failed_chunk_resumes_from_committed_offset(self):
+        """Test that a chunk the session half-kept is finished instead of restarted"""
+        video = bytes(range(256)) * 3000
+        server = ResumableServer(video, partial_put=2, fail_puts={4})
+
+        response, _ = run_relay(server)
+
+        assert response.status_code == 200
+        assert bytes(server.stored) == video
+
+    def test_dropped_source_resumes_with_range(self):
+        """Test that an interrupted download reconnects from the last byte received"""
+        video = bytes(range(256)) * 3000
+        server = ResumableServer(video, drop_source_at=CHUNK + 64 * 1024)
+
+        run_relay(server)
+
+        assert server.source_ranges == [0, CHUNK + 64 * 1024]
+        assert bytes(server.stored) == video
+
+    def test_gives_up_after_max_retries(self):
+        """Test that a session that keeps failing raises MediaUploadError"""
+        video = b"x" * (CHUNK + 1)
+        server = ResumableServer(video, fail_puts=set(range(1, 50)))
+
+        with pytest.raises(MediaUploadError):
+            run_relay(server, max_retries=2)
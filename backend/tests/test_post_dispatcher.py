@@ -0,0 +1,297 @@
+"""
+Post Dispatcher Tests
+Tests for sleeping until the next scheduled post and waking on NOTIFY (no real database)
+"""
+
+import threading
+import time
+from concurrent import futures
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+from workers import post_dispatcher
+from workers.post_dispatcher import PostDispatcher, SCHEDULE_CHANNEL
+from workers.post_scheduler import CLAIM_LEASE_SECONDS, finish_post
+
+
+class FakeListenCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self._row = None
+
+    def execute(self, query, params=None):
+        self.conn.statements.append((query, params))
+        if "LEAST" in query:
+            self._row = (self.conn.next_due.pop(0),)
+
+    def fetchone(self):
+        return self._row
+
+    def close(self):
+        pass
+
+
+class FakeListenConnection:
+    def __init__(self, next_due):
+        self.next_due = list(next_due)
+        self.statements = []
+        self.notifies = []
+        self.closed = False
+        self.autocommit = False
+
+    def cursor(self):
+        return FakeListenCursor(self)
+
+    def poll(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def make_dispatcher(next_due, batch="batch", publish=None, max_batches=4):
+    conn = FakeListenConnection(next_due)
+    claim = MagicMock(return_value=batch)
+    dispatcher = PostDispatcher(lambda: conn, claim=claim, publish=publish or MagicMock(),
+                                max_sleep=3600, max_batches=max_batches)
+    dispatcher._wait = MagicMock(return_value=False)
+    return dispatcher, conn, claim
+
+
+class TestDispatchTiming:
+    """Test that the dispatcher publishes on time and sleeps otherwise"""
+
+    def test_due_post_is_dispatched_immediately(self):
+        """Test that a post already due is published without sleeping"""
+        dispatcher, conn, claim = make_dispatcher([-0.5])
+
+        dispatcher._step()
+        dispatcher.stop()
+
+        claim.assert_called_once()
+        dispatcher.publish.assert_called_once_with("batch")
+        dispatcher._wait.assert_not_called()
+        assert ("LISTEN " + SCHEDULE_CHANNEL, None) in conn.statements
+
+    def test_sleeps_until_next_slot(self):
+        """Test that the dispatcher sleeps until just after the earliest scheduled_date"""
+        dispatcher, _, claim = make_dispatcher([30.0])
+
+        dispatcher._step()
+
+        claim.assert_not_called()
+        timeout = dispatcher._wait.call_args[0][0]
+        assert 30.0 < timeout < 31.0
+
+    def test_idle_sleeps_for_max_sleep(self):
+        """Test that an empty calendar costs one query per max_sleep"""
+        dispatcher, conn, claim = make_dispatcher([None])
+
+        dispatcher._step()
+
+        claim.assert_not_called()
+        dispatcher._wait.assert_called_once_with(3600)
+        assert len([q for q, _ in conn.statements if "LEAST" in q]) == 1
+
+    def test_unclaimable_due_post_does_not_spin(self):
+        """Test that a due post that could not be claimed backs off before re-checking"""
+        dispatcher, _, claim = make_dispatcher([-1.0], batch=None)
+
+        with patch.object(dispatcher._stop, "wait") as wait:
+            dispatcher._step()
+
+        claim.assert_called_once()
+        dispatcher.publish.assert_not_called()
+        wait.assert_called_once_with(post_dispatcher.RETRY_DELAY_SECONDS)
+
+    def test_notify_wakes_dispatcher(self):
+        """Test that a NOTIFY ends the sleep early"""
+        conn = FakeListenConnection([])
+        conn.notifies.append(MagicMock(channel=SCHEDULE_CHANNEL))
+        dispatcher = PostDispatcher(lambda: conn, claim=MagicMock(), publish=MagicMock())
+        dispatcher._conn = conn
+
+        with patch.object(post_dispatcher.select, "select", return_value=([conn], [], [])):
+            woken = dispatcher._wait(3600)
+
+        assert woken is True
+        assert conn.notifies == []
+
+
+class FakeScheduleCursor:
+    """Runs the dispatcher's and finish_post()'s statements against one in-memory post"""
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = 0
+        self._row = None
+
+    def execute(self, query, params=None):
+        post = self.db.post
+        self.rowcount = 0
+        if "LEAST" in query:
+            due = {
+                "scheduled": post["scheduled_at"],
+                "publishing": post["lease_expires_at"],
+                "retrying": post["next_attempt_at"],
+            }.get(post["status"])
+            self._row = (None if due is None else due - self.db.now,)
+        elif "pg_notify" in query:
+            self.db.notifies.append(MagicMock(channel=params[0], payload=params[1]))
+        elif "claimed_by = NULL" in query:
+            status, error, retry_in, post_id, worker_id = params
+            if post["status"] == "publishing" and post["claimed_by"] == worker_id:
+                post.update(status=status, claimed_by=None, lease_expires_at=None,
+                            next_attempt_at=None if retry_in is None else self.db.now + retry_in)
+                self.rowcount = 1
+
+    def fetchone(self):
+        return self._row
+
+    def close(self):
+        pass
+
+
+class FakeScheduleDB:
+    """One calendar post plus a clock that only moves while the dispatcher sleeps"""
+    def __init__(self):
+        self.now = 0.0
+        self.post = {"id": "post-1", "status": "scheduled", "scheduled_at": 0.0,
+                     "claimed_by": None, "lease_expires_at": None, "next_attempt_at": None}
+        self.notifies = []
+        self.claimed_at = []
+        self.closed = False
+        self.autocommit = False
+
+    def cursor(self):
+        return FakeScheduleCursor(self)
+
+    def claim(self):
+        post = self.post
+        due = post["scheduled_at"] if post["status"] == "scheduled" else post["next_attempt_at"]
+        if post["status"] not in ("scheduled", "retrying") or due > self.now:
+            return None
+        post.update(status="publishing", claimed_by="worker-1",
+                    lease_expires_at=self.now + CLAIM_LEASE_SECONDS)
+        self.claimed_at.append(self.now)
+        return [post["id"]]
+
+    def close(self):
+        self.closed = True
+
+
+class TestRetryWakeup:
+    """Test that a failed publish is retried on its backoff, not when its lease expires"""
+
+    def test_failed_post_is_reclaimed_at_next_attempt(self):
+        """Test that moving a post to 'retrying' wakes a dispatcher sleeping on the lease"""
+        db = FakeScheduleDB()
+        release = threading.Event()
+
+        def publish(batch):
+            release.wait(5)
+            finish_post(db.cursor(), batch[0], "worker-1", "retrying", "Failed: HTTP 503", retry_in=60)
+
+        dispatcher = PostDispatcher(lambda: db, claim=db.claim, publish=publish)
+
+        def wait(timeout):
+            # The publish fails while the dispatcher sleeps on the claim's lease
+            release.set()
+            futures.wait(dispatcher._batches.copy(), timeout=5)
+            if db.notifies:
+                db.notifies.clear()
+                return True
+            db.now += timeout
+            return False
+
+        dispatcher._wait = wait
+        while len(db.claimed_at) < 2 and db.now < CLAIM_LEASE_SECONDS * 2:
+            dispatcher._step()
+        dispatcher.stop()
+
+        assert db.claimed_at[0] == 0.0
+        assert 60.0 <= db.claimed_at[1] < 61.0
+
+
+class TestBackgroundPublishing:
+    """Test that slow publish batches never hold up the LISTEN loop"""
+
+    def test_slow_batch_does_not_block_next_claim(self):
+        """Test that a post falling due during a slow upload is claimed right away"""
+        release = threading.Event()
+        dispatcher, _, claim = make_dispatcher([-1.0, -1.0], publish=lambda batch: release.wait(5))
+
+        started = time.monotonic()
+        dispatcher._step()
+        dispatcher._step()
+        elapsed = time.monotonic() - started
+
+        release.set()
+        dispatcher.stop()
+        assert claim.call_count == 2
+        assert elapsed < 1.0
+
+    def test_batches_in_flight_are_capped(self):
+        """Test that a due post waits for a free publish slot instead of piling up batches"""
+        release = threading.Event()
+        dispatcher, _, claim = make_dispatcher([-1.0, -1.0], publish=lambda batch: release.wait(5),
+                                               max_batches=1)
+        dispatcher._step()
+
+        second = threading.Thread(target=dispatcher._step)
+        second.start()
+        time.sleep(0.1)
+        assert claim.call_count == 1
+
+        release.set()
+        second.join(timeout=5)
+        dispatcher.stop()
+        assert claim.call_count == 2
+
+    def test_restart_does_not_wait_for_exiting_loop(self):
+        """Test that start() during a slow shutdown returns and the old loop hands over"""
+        dispatcher = PostDispatcher(lambda: None, claim=MagicMock(), publish=MagicMock())
+        exiting = threading.Event()
+        dispatcher._thread = threading.Thread(target=exiting.wait, args=(5,))
+        dispatcher._thread.start()
+        dispatcher._stop.set()
+
+        started = time.monotonic()
+        with patch.object(post_dispatcher, "START_JOIN_TIMEOUT_SECONDS", 0.05), \
+             patch.object(dispatcher, "_start_thread") as start_thread:
+            dispatcher.start()
+        exiting.set()
+
+        assert time.monotonic() - started < 1.0
+        start_thread.assert_not_called()
+        assert dispatcher._restart is True
+
+
+class TestCalendarNotify:
+    """Test that calendar writes wake the dispatcher"""
+
+    def test_create_event_notifies_in_transaction(self, mock_db_cursor):
+        """Test that creating an event sends NOTIFY before the commit"""
+        from routes import calendar
+
+        mock_db_cursor.fetchone_value = {"id": "event-1"}
+        events = []
+        conn = MagicMock()
+        conn.cursor.return_value = mock_db_cursor
+        conn.commit.side_effect = lambda: events.append("commit")
+        mock_db_cursor.execute = MagicMock(side_effect=lambda q, p=None: events.append(q))
+
+        @contextmanager
+        def fake_connection(*args, **kwargs):
+            yield conn
+
+        item = calendar.ContentItem(
+            title="Launch", content_type="social", scheduled_date="2026-01-01T09:00:00Z",
+            status="scheduled", platform="twitter", content="Hello"
+        )
+        with patch.object(calendar, "get_db_connection", fake_connection), \
+             patch.object(calendar, "get_user_id", return_value="user-1"):
+            result = calendar.create_event(item, MagicMock())
+
+        assert result["success"] is True
+        notify_index = next(i for i, e in enumerate(events) if "pg_notify" in e)
+        assert events.index("commit") > notify_index
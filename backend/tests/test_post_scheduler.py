@@ -0,0 +1,467 @@
+"""
+Post Scheduler Tests
+Tests for claiming, lease renewal and releasing scheduled posts (no real database)
+"""
+
+import asyncio
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from pydantic import ValidationError
+
+from workers import post_scheduler
+
+
+class FakeCalendarCursor:
+    """Answers the scheduler's statements from in-memory claimed posts"""
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = 0
+        self._result = []
+
+    def execute(self, query, params=None):
+        self.db.statements.append((query, params))
+        self._result = []
+        self.rowcount = 0
+
+        if "FOR UPDATE SKIP LOCKED" in query:
+            self.db.claimed_by = params[0]
+            self._result = list(self.db.due_posts)
+            self.rowcount = len(self._result)
+        elif "lease_expires_at < NOW()" in query:
+            self.rowcount = 0
+        elif "SET lease_expires_at" in query:
+            post_id, worker_id = params[1], params[2]
+            self.rowcount = int(post_id not in self.db.lost and worker_id == self.db.claimed_by)
+        elif "claimed_by = NULL" in query:
+            status, error, retry_in, post_id, worker_id = params
+            if self.db.failing_finishes:
+                self.db.failing_finishes -= 1
+                raise ConnectionError("server closed the connection unexpectedly")
+            if post_id in self.db.lost:
+                return
+            self.db.finished[post_id] = (status, error, worker_id)
+            self.db.retry_in[post_id] = retry_in
+            self.rowcount = 1
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+    def fetchall(self):
+        return self._result
+
+    def close(self):
+        pass
+
+
+class FakeCalendarDB:
+    def __init__(self, due_posts, lost=(), failing_finishes=0):
+        self.due_posts = due_posts
+        self.lost = set(lost)
+        self.failing_finishes = failing_finishes
+        self.claimed_by = None
+        self.finished = {}
+        self.retry_in = {}
+        self.statements = []
+
+    def cursor(self):
+        return FakeCalendarCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    @contextmanager
+    def connection(self):
+        yield self
+
+
+def make_post(post_id, minute, user_id="user-1", platform="twitter", attempts=1):
+    return {
+        "id": post_id,
+        "user_id": user_id,
+        "content_id": None,
+        "title": f"Post {post_id}",
+        "content_type": "social",
+        "platform": platform,
+        "service_type": platform,
+        "scheduled_date": datetime(2026, 1, 1, 9, minute, tzinfo=timezone.utc),
+        "notes": "Hello",
+        "attempts": attempts,
+        "library_content": None,
+        "has_credentials": True,
+        "access_token": f"token-{user_id}",
+        "refresh_token": None,
+        "token_expires_at": None,
+        "service_id": None,
+        "service_metadata": {},
+        "is_active": True,
+    }
+
+
+class TestClaimedPublishing:
+    """Test that only posts this run still owns get published"""
+
+    def run_scheduler(self, db, publish=None):
+        publish = publish or AsyncMock(return_value={"success": True})
+        with patch.object(post_scheduler, "get_worker_db_connection", db.connection), \
+             patch.object(post_scheduler, "publish_post", publish), \
+             patch.dict("os.environ", {"DATABASE_URL": "postgresql://test"}):
+            post_scheduler.check_scheduled_posts()
+        return publish
+
+    def test_claimed_posts_are_published_and_released(self):
+        """Test that claimed posts are published and released by the claiming worker"""
+        db = FakeCalendarDB([make_post("b", 5), make_post("a", 1)])
+
+        publish = self.run_scheduler(db)
+
+        assert publish.call_count == 2
+        assert db.finished == {
+            "a": ("published", None, db.claimed_by),
+            "b": ("published", None, db.claimed_by),
+        }
+        claim_sql = next(q for q, _ in db.statements if "SKIP LOCKED" in q)
+        assert "status = 'publishing'" in claim_sql
+
+    def test_post_with_lost_claim_is_not_published(self):
+        """Test that a post recovered by another worker after lease expiry is skipped"""
+        db = FakeCalendarDB([make_post("a", 1), make_post("b", 5)], lost={"b"})
+
+        publish = self.run_scheduler(db)
+
+        assert publish.call_count == 1
+        assert list(db.finished) == ["a"]
+
+
+class TestBatchPrefetch:
+    """Test that a batch is claimed and prefetched in one statement"""
+
+    def test_batch_costs_one_claim_statement(self):
+        """Test that no per-post content or credentials queries run before publishing"""
+        posts = [make_post(f"p-{i}", i) for i in range(20)]
+        db = FakeCalendarDB(posts)
+
+        TestClaimedPublishing().run_scheduler(db)
+
+        reads = [q for q, _ in db.statements if "SELECT" in q and "SKIP LOCKED" not in q]
+        assert reads == []
+
+    def test_jobs_share_credentials_per_account(self):
+        """Test content fallbacks and that credentials are deduplicated per (user, platform)"""
+        with_content = make_post("a", 1)
+        with_content.update(content_id="c-1", library_content={"text": "From library"})
+        missing_content = make_post("b", 2)
+        missing_content.update(content_id="c-2")
+        not_connected = make_post("c", 3, user_id="user-2")
+        not_connected.update(has_credentials=False, access_token=None)
+
+        jobs = post_scheduler.build_publish_jobs([with_content, missing_content, not_connected])
+
+        assert [job["content"] for job in jobs] == ["From library", "Hello", "Hello"]
+        assert jobs[0]["credentials"] is jobs[1]["credentials"]
+        assert jobs[0]["credentials"]["access_token"] == "token-user-1"
+        assert jobs[2]["credentials"] is None
+
+
+class TestConcurrentPublishing:
+    """Test per-platform and per-account concurrency caps"""
+
+    def test_publishes_concurrently_within_caps(self):
+        """Test that posts publish in parallel but never exceed platform or account limits"""
+        posts = [make_post(f"yt-{i}", i, user_id=f"user-{i}", platform="youtube") for i in range(4)]
+        posts += [make_post(f"tw-{i}", i, user_id="user-9", platform="twitter") for i in range(3)]
+        posts += [make_post(f"li-{i}", i, user_id=f"user-{i}", platform="linkedin") for i in range(3)]
+        db = FakeCalendarDB(posts)
+
+        in_flight = {"youtube": 0, "user-9": 0, "total": 0}
+        peak = {"youtube": 0, "user-9": 0, "total": 0}
+
+        async def slow_publish(user_id, platform, content, credentials):
+            keys = ["total"] + [k for k in (platform, user_id) if k in in_flight]
+            for key in keys:
+                in_flight[key] += 1
+                peak[key] = max(peak[key], in_flight[key])
+            await asyncio.sleep(0.02)
+            for key in keys:
+                in_flight[key] -= 1
+            return {"success": True}
+
+        TestClaimedPublishing().run_scheduler(db, publish=slow_publish)
+
+        assert len(db.finished) == 10
+        assert peak["youtube"] == post_scheduler.PLATFORM_CONCURRENCY["youtube"]
+        assert peak["user-9"] == post_scheduler.ACCOUNT_CONCURRENCY
+        assert peak["total"] > post_scheduler.PLATFORM_CONCURRENCY["youtube"]
+
+
+class TestRetries:
+    """Test backoff, error classification and dead-lettering of failed publishes"""
+
+    def test_transient_failure_is_retried_with_backoff(self):
+        """Test that a platform 5xx schedules a retry and leaves the post text alone"""
+        db = FakeCalendarDB([make_post("a", 1, attempts=2)])
+        publish = AsyncMock(return_value={"success": False, "error": "LinkedIn API error: 503"})
+
+        TestClaimedPublishing().run_scheduler(db, publish=publish)
+
+        status, error, _ = db.finished["a"]
+        assert status == "retrying"
+        assert error == "Failed: LinkedIn API error: 503"
+        # Second attempt: between half and all of base * 2
+        base = post_scheduler.RETRY_BASE_SECONDS
+        assert base <= db.retry_in["a"] <= base * 2
+        assert not any("notes" in q for q, _ in db.statements if "claimed_by = NULL" in q)
+
+    def test_permanent_failure_is_not_retried(self):
+        """Test that an error the user must fix fails the post immediately"""
+        error = "LinkedIn person URN not found. Please reconnect your LinkedIn account."
+        db = FakeCalendarDB([make_post("a", 1)])
+        publish = AsyncMock(return_value={"success": False, "error": error})
+
+        TestClaimedPublishing().run_scheduler(db, publish=publish)
+
+        assert db.finished["a"][0] == "failed"
+        assert db.retry_in["a"] is None
+
+    def test_exhausted_post_is_dead_lettered(self):
+        """Test that the last allowed attempt moves a post to dead_letter"""
+        attempts = post_scheduler.MAX_PUBLISH_ATTEMPTS
+        db = FakeCalendarDB([make_post("a", 1, attempts=attempts)])
+        publish = AsyncMock(side_effect=TimeoutError("read timed out"))
+
+        TestClaimedPublishing().run_scheduler(db, publish=publish)
+
+        assert db.finished["a"][0] == "dead_letter"
+        assert db.retry_in["a"] is None
+
+    def test_failed_published_update_is_retried_not_republished(self):
+        """Test that a database error after a successful publish only retries the update"""
+        db = FakeCalendarDB([make_post("a", 1)], failing_finishes=2)
+        publish = AsyncMock(return_value={"success": True})
+
+        with patch.object(post_scheduler, "FINISH_RETRY_BASE_SECONDS", 0):
+            TestClaimedPublishing().run_scheduler(db, publish=publish)
+
+        assert publish.call_count == 1
+        assert db.finished["a"][0] == "published"
+
+    def test_published_post_never_goes_to_retry(self):
+        """Test that a post whose 'published' update keeps failing is not scheduled again"""
+        db = FakeCalendarDB([make_post("a", 1)], failing_finishes=100)
+        publish = AsyncMock(return_value={"success": True})
+
+        with patch.object(post_scheduler, "FINISH_RETRY_BASE_SECONDS", 0):
+            TestClaimedPublishing().run_scheduler(db, publish=publish)
+
+        assert publish.call_count == 1
+        assert db.finished == {}
+        assert db.failing_finishes == 100 - (post_scheduler.FINISH_MAX_RETRIES + 1)
+
+    def test_lost_claim_is_not_logged_as_a_retry(self, caplog):
+        """Test that a failure is only reported as retrying once finish_post confirms the claim"""
+        db = FakeCalendarDB([], lost={"a"})
+        job = {"id": "a", "attempts": 1}
+
+        with patch.object(post_scheduler, "get_worker_db_connection", db.connection), \
+             caplog.at_level("WARNING", logger=post_scheduler.logger.name):
+            outcome = asyncio.run(post_scheduler._fail_post(job, "worker-1", "Failed: HTTP 503"))
+
+        assert outcome == "skipped"
+        assert db.finished == {}
+        assert "retrying in" not in caplog.text
+
+    def test_error_classification(self):
+        """Test transient vs permanent classification of publisher errors"""
+        assert post_scheduler.is_transient_error("Twitter error: 429 Too Many Requests")
+        assert post_scheduler.is_transient_error("Instagram error: Server disconnected")
+        assert post_scheduler.is_transient_error("LinkedIn error: 502 please reconnect later")
+        assert not post_scheduler.is_transient_error("LinkedIn API error: 401")
+        assert not post_scheduler.is_transient_error("TikTok requires a video URL")
+        assert not post_scheduler.is_transient_error("No OAuth token found")
+
+    def test_numbers_outside_a_status_field_are_ignored(self):
+        """Test that IDs and sizes in the error text don't look like status codes"""
+        assert not post_scheduler.is_transient_error("LinkedIn API error: 403 (retry after 500 ms)")
+        assert not post_scheduler.is_transient_error("TikTok requires a video URL (max 512 MB)")
+        assert post_scheduler.is_transient_error("Error: Server error '503 Service Unavailable' for url")
+        assert post_scheduler.is_transient_error("Chunk upload failed: HTTP 502")
+
+    def test_backoff_grows_and_is_capped(self):
+        """Test that the retry delay doubles per attempt and never exceeds the cap"""
+        base, cap = post_scheduler.RETRY_BASE_SECONDS, post_scheduler.RETRY_MAX_SECONDS
+
+        for attempts in range(1, 12):
+            window = min(cap, base * 2 ** (attempts - 1))
+            delay = post_scheduler.retry_delay(attempts)
+            assert window / 2 <= delay <= window
+
+
+# Keep route requests out of the shared per-client rate limit budget
+RATE_LIMIT_CHECK = "middleware.rate_limit._rate_limit_store.check_rate_limit"
+
+
+class TestCalendarUpdates:
+    """Test that calendar edits can't re-queue a post a worker is publishing"""
+
+    def update(self, rows):
+        from fastapi import HTTPException
+        from routes import calendar
+
+        cursor = MagicMock()
+        cursor.fetchone.side_effect = rows
+        conn = MagicMock()
+        conn.cursor.return_value = cursor
+
+        @contextmanager
+        def fake_connection(*args, **kwargs):
+            yield conn
+
+        item = calendar.ContentItem(
+            title="Launch", content_type="social", scheduled_date="2026-01-01T09:00:00Z",
+            status="scheduled", platform="twitter", content="Hello"
+        )
+        with patch.object(calendar, "get_db_connection", fake_connection), \
+             patch.object(calendar, "get_user_id", return_value="user-1"):
+            try:
+                return calendar.update_event("event-1", item, MagicMock()), cursor, conn
+            except HTTPException as e:
+                return e, cursor, conn
+
+    def test_update_is_rejected_while_claim_is_live(self):
+        """Test that rescheduling a post mid-publish returns 409 and changes nothing"""
+        result, cursor, conn = self.update([None, {"exists": 1}])
+
+        assert result.status_code == 409
+        update_sql = cursor.execute.call_args_list[0].args[0]
+        assert "NOT (status = 'publishing' AND lease_expires_at > NOW())" in update_sql
+        conn.commit.assert_not_called()
+
+    def test_missing_event_is_still_404(self):
+        """Test that an event the user doesn't own is reported as not found"""
+        result, _, _ = self.update([None, None])
+
+        assert result.status_code == 404
+
+    def test_reschedule_clears_retry_state(self):
+        """Test that rescheduling resets attempts, the retry time and the last error"""
+        result, cursor, _ = self.update([{"id": "event-1"}])
+
+        assert result["success"] is True
+        update_sql = cursor.execute.call_args_list[0].args[0]
+        assert "next_attempt_at = NULL" in update_sql
+        assert "last_error = CASE WHEN %s = 'scheduled' THEN NULL" in update_sql
+
+    def test_clients_cannot_set_scheduler_statuses(self):
+        """Test that the scheduler-owned statuses are rejected and the others accepted"""
+        from routes import calendar
+
+        for status in ("publishing", "retrying", "dead_letter"):
+            with pytest.raises(ValidationError):
+                calendar.ContentItem(title="Launch", content_type="social",
+                                     scheduled_date="2026-01-01T09:00:00Z", status=status)
+
+        for status in ("draft", "scheduled", "published", "cancelled", "failed"):
+            assert calendar.ContentItem(title="Launch", content_type="social",
+                                        scheduled_date="2026-01-01T09:00:00Z", status=status).status == status
+
+    def test_editing_a_published_event_is_accepted(self, client, auth_headers, mock_db_cursor):
+        """Test that a PUT sending back an event's 'published' status is not a 422"""
+        mock_db_cursor.fetchone_value = {"id": "event-1", "status": "published"}
+        conn = MagicMock()
+        conn.cursor.return_value = mock_db_cursor
+
+        @contextmanager
+        def fake_connection(*args, **kwargs):
+            yield conn
+
+        with patch("routes.calendar.get_db_connection", fake_connection), \
+             patch(RATE_LIMIT_CHECK, return_value=(True, 100, 0)):
+            response = client.put("/calendar/events/event-1", headers=auth_headers, json={
+                "title": "Launch", "content_type": "social", "scheduled_date": "2026-01-01T09:00:00Z",
+                "status": "published", "platform": "twitter", "content": "Hello",
+            })
+
+        assert response.status_code == 200
+        assert response.json()["success"] is True
+        update_params = next(p for q, p in mock_db_cursor._execute_calls if "UPDATE content_calendar" in q)
+        assert update_params[3] == "published"
+        conn.commit.assert_called_once()
+
+
+class TestManualPublish:
+    """Test that "publish now" claims the post like the scheduler does"""
+
+    def publish(self, rows, result=None):
+        from fastapi import HTTPException
+        from routes import calendar
+
+        cursor = MagicMock()
+        cursor.fetchone.side_effect = rows
+        cursor.rowcount = 1
+        conn = MagicMock()
+        conn.cursor.return_value = cursor
+
+        @contextmanager
+        def fake_connection(*args, **kwargs):
+            yield conn
+
+        send = AsyncMock(return_value=result or {"success": True, "post_url": "https://x.com/1"})
+        with patch.object(calendar, "get_db_connection", fake_connection), \
+             patch.object(calendar, "get_user_id", return_value="user-1"), \
+             patch.object(calendar, "_publish_claimed_event", send):
+            try:
+                outcome = asyncio.run(calendar.publish_event_now("event-1", MagicMock()))
+            except HTTPException as e:
+                outcome = e
+        return outcome, cursor, send
+
+    def test_post_held_by_scheduler_is_not_published(self):
+        """Test that a post another worker has claimed returns 409 without publishing"""
+        result, cursor, send = self.publish([None, {"status": "publishing"}])
+
+        assert result.status_code == 409
+        assert result.detail == "Post can't be published while it is publishing"
+        claim_sql = cursor.execute.call_args_list[0].args[0]
+        assert "status IN ('draft', 'scheduled', 'retrying', 'failed', 'dead_letter')" in claim_sql
+        send.assert_not_awaited()
+
+    def test_conflict_names_the_actual_status(self):
+        """Test that a cancelled post is not reported as published or being published"""
+        result, _, send = self.publish([None, {"status": "cancelled"}])
+
+        assert result.status_code == 409
+        assert "cancelled" in result.detail
+        send.assert_not_awaited()
+
+    def test_dead_lettered_post_starts_a_fresh_attempt_count(self):
+        """Test that republishing a dead-lettered post by hand resets its attempts"""
+        event = {"id": "event-1", "title": "Launch", "content_type": "social", "platform": "twitter",
+                 "content": "Hello", "media_url": None, "notes": None}
+
+        result, cursor, _ = self.publish([event])
+
+        assert result["status"] == "published"
+        claim_sql = cursor.execute.call_args_list[0].args[0]
+        assert "attempts = CASE WHEN status = 'dead_letter' THEN 1 ELSE attempts + 1 END" in claim_sql
+
+    def test_claimed_post_is_released_by_its_lease_holder(self):
+        """Test that the outcome is written through finish_post under the same claim"""
+        event = {"id": "event-1", "title": "Launch", "content_type": "social", "platform": "twitter",
+                 "content": "Hello", "media_url": None, "notes": None}
+
+        result, cursor, send = self.publish([event])
+
+        assert result["status"] == "published"
+        send.assert_awaited_once()
+        claim_params = cursor.execute.call_args_list[0].args[1]
+        finish_sql, finish_params = cursor.execute.call_args_list[1].args
+        assert "AND claimed_by = %s" in finish_sql
+        assert finish_params[0] == "published"
+        assert finish_params[-1] == claim_params[0]
+        # A published post never changes when the dispatcher next wakes
+        assert not any("pg_notify" in c.args[0] for c in cursor.execute.call_args_list)
@@ -0,0 +1,159 @@
+"""
+Fan-out Publishing Tests
+Tests for concurrent multi-platform publishing and the shared media download cache (no real network)
+"""
+
+import asyncio
+import json
+import os
+import time
+from unittest.mock import AsyncMock, patch
+
+import httpx
+
+from routes import publisher
+from routes.publisher import FanoutPublishRequest, PublishResponse
+from utils import media_upload
+from utils.media_upload import download_url_to_file, media_download_cache
+
+
+def make_fanout(platforms):
+    return FanoutPublishRequest(
+        platforms=platforms, content_type="image", caption="Launch day",
+        image_urls=["https://cdn.example.com/launch.jpg"]
+    )
+
+
+def run_fanout(fanout_request, delays, credentials=None, failing=(), cancelled=()):
+    """Run the endpoint with fake per-platform publish times; returns (lines, elapsed, calls)"""
+    calls = []
+
+    async def fake_publish(publish_request, platform_credentials, user_id=None):
+        calls.append((publish_request.platform, platform_credentials))
+        await asyncio.sleep(delays[publish_request.platform])
+        if publish_request.platform in failing:
+            raise RuntimeError("token revoked")
+        if publish_request.platform in cancelled:
+            raise asyncio.CancelledError()
+        return PublishResponse(success=True, platform=publish_request.platform,
+                               post_id=f"{publish_request.platform}-1", published_at="2026-01-01T00:00:00")
+
+    async def consume():
+        started = time.monotonic()
+        response = await publisher.publish_fanout(fanout_request, "user-1")
+        lines = [json.loads(line) async for line in response.body_iterator]
+        return lines, time.monotonic() - started
+
+    with patch.object(publisher, "get_user_services_credentials",
+                      AsyncMock(return_value=credentials or {})), \
+         patch.object(publisher, "publish_with_credentials", fake_publish):
+        lines, elapsed = asyncio.run(consume())
+    return lines, elapsed, calls
+
+
+class TestFanoutPublish:
+    """Test that one request publishes to every platform concurrently and streams results"""
+
+    def test_results_stream_in_finish_order(self):
+        """Test that each platform's result arrives as it finishes, then a summary"""
+        delays = {"instagram": 0.3, "linkedin": 0.1, "facebook": 0.2}
+
+        lines, elapsed, _ = run_fanout(make_fanout(["instagram", "linkedin", "facebook"]), delays)
+
+        assert [line["platform"] for line in lines[:3]] == ["linkedin", "facebook", "instagram"]
+        assert lines[-1]["done"] is True
+        assert lines[-1]["succeeded"] == 3
+        # Slowest platform, not the sum (0.6s)
+        assert elapsed < 0.5
+
+    def test_failed_platform_does_not_stop_others(self):
+        """Test that one platform raising still yields a line for it and the rest"""
+        delays = {"twitter": 0.0, "linkedin": 0.1}
+
+        lines, _, _ = run_fanout(make_fanout(["twitter", "linkedin"]), delays, failing={"twitter"})
+
+        results = {line["platform"]: line for line in lines[:2]}
+        assert results["twitter"]["success"] is False
+        assert results["twitter"]["error"] == "token revoked"
+        assert results["linkedin"]["success"] is True
+        assert lines[-1]["failed"] == 1
+
+    def test_cancelled_run_still_completes_the_stream(self):
+        """Test that a run ending in CancelledError reports every platform instead of hanging"""
+        delays = {"linkedin": 0.0, "facebook": 0.1}
+
+        lines, _, _ = run_fanout(make_fanout(["linkedin", "facebook"]), delays, cancelled={"linkedin"})
+
+        assert {line["platform"] for line in lines[:2]} == {"linkedin", "facebook"}
+        assert all(line["success"] is False for line in lines[:2])
+        assert lines[-1]["done"] is True
+
+    def test_disconnected_client_does_not_cancel_the_run(self, caplog):
+        """Test that publishes finish and are logged after the client stops reading the stream"""
+        published = []
+
+        async def fake_publish(publish_request, platform_credentials, user_id=None):
+            await asyncio.sleep({"linkedin": 0.0, "facebook": 0.1}[publish_request.platform])
+            published.append(publish_request.platform)
+            return PublishResponse(success=True, platform=publish_request.platform,
+                                   post_id=f"{publish_request.platform}-1", published_at="2026-01-01T00:00:00")
+
+        async def disconnect_after_first_line():
+            response = await publisher.publish_fanout(make_fanout(["linkedin", "facebook"]), "user-1")
+            stream = response.body_iterator
+            first = json.loads(await stream.__anext__())
+            await stream.aclose()
+            await asyncio.gather(*publisher._fanout_runs)
+            return first
+
+        with patch.object(publisher, "get_user_services_credentials", AsyncMock(return_value={})), \
+             patch.object(publisher, "publish_with_credentials", fake_publish), \
+             caplog.at_level("INFO", logger=publisher.logger.name):
+            first = asyncio.run(disconnect_after_first_line())
+
+        assert first["platform"] == "linkedin"
+        assert sorted(published) == ["facebook", "linkedin"]
+        assert "Fan-out publish to facebook for user user-1: facebook-1" in caplog.text
+        assert "finished: 2/2 published" in caplog.text
+
+    def test_x_alias_and_credentials_loaded_once(self):
+        """Test that x and twitter publish once, with credentials from the bulk lookup"""
+        credentials = {"twitter": {"access_token": "t"}, "linkedin": {"access_token": "l"}}
+        delays = {"x": 0.1, "linkedin": 0.1}
+
+        lines, _, calls = run_fanout(make_fanout(["x", "twitter", "linkedin"]), delays, credentials)
+
+        assert sorted(calls, key=lambda c: c[0]) == [("linkedin", {"access_token": "l"}), ("x", {"access_token": "t"})]
+        assert lines[-1]["platforms"] == 2
+
+
+class TestSharedMediaDownload:
+    """Test that media is downloaded once per URL during a fan-out"""
+
+    def test_same_url_downloaded_once(self, tmp_path):
+        """Test that concurrent downloads of one URL share a single request and temp file"""
+        requests = []
+
+        async def handler(request):
+            requests.append(str(request.url))
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, content=b"jpeg-bytes")
+
+        real_client = httpx.AsyncClient
+        outputs = [str(tmp_path / f"out-{i}.jpg") for i in range(3)]
+
+        async def fan_out():
+            async with media_download_cache():
+                cache_dir = media_upload._download_cache.get()["dir"]
+                await asyncio.gather(*(download_url_to_file("https://cdn.example.com/a.jpg", path) for path in outputs))
+                os.unlink(outputs[0])
+                await download_url_to_file("https://cdn.example.com/a.jpg", outputs[0])
+            return cache_dir
+
+        with patch.object(media_upload.httpx, "AsyncClient",
+                          lambda **kwargs: real_client(transport=httpx.MockTransport(handler))):
+            cache_dir = asyncio.run(fan_out())
+
+        assert requests == ["https://cdn.example.com/a.jpg"]
+        assert all(open(path, "rb").read() == b"jpeg-bytes" for path in outputs)
+        assert not os.path.exists(cache_dir)
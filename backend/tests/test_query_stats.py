@@ -0,0 +1,93 @@
+"""
+Query Statistics Tests
+Tests for SQL fingerprinting, per-fingerprint aggregation and the slow-query log
+"""
+
+from unittest.mock import patch
+
+import query_stats
+from query_stats import QueryStats, fingerprint, current_route
+
+
+class TestFingerprint:
+    """Test SQL normalisation"""
+
+    def test_values_and_parameters_are_replaced(self):
+        """Test that literals and placeholders collapse to the same fingerprint"""
+        assert fingerprint("SELECT * FROM users WHERE id = %s") == \
+            fingerprint("SELECT * FROM users WHERE id = 42")
+        assert fingerprint("SELECT * FROM users WHERE email = 'a@b.com'") == \
+            "SELECT * FROM users WHERE email = ?"
+        assert fingerprint("UPDATE users SET credits = %(credits)s WHERE id = %(id)s") == \
+            "UPDATE users SET credits = ? WHERE id = ?"
+
+    def test_in_lists_and_whitespace_are_collapsed(self):
+        """Test that IN lists of any length and reformatted SQL share a fingerprint"""
+        short = fingerprint("SELECT id FROM posts WHERE status IN ('draft', 'scheduled')")
+        long = fingerprint("""
+            SELECT id
+            FROM posts
+            WHERE status IN (%s, %s, %s)
+        """)
+
+        assert short == long == "SELECT id FROM posts WHERE status IN (...)"
+
+
+class TestQueryStats:
+    """Test aggregation and the top-N report"""
+
+    def test_aggregates_per_fingerprint(self):
+        """Test count, timings, percentiles and rows per fingerprint"""
+        stats = QueryStats()
+        for duration in range(1, 101):
+            stats.record(f"SELECT * FROM users WHERE id = {duration}", float(duration), 1)
+        stats.record("SELECT COUNT(*) FROM content_library", 500.0, 1)
+
+        report = stats.report(top=10, sort="total_ms")
+        users = report["queries"][0]
+
+        assert report["fingerprints"] == 2
+        assert report["total_queries"] == 101
+        assert users["fingerprint"] == "SELECT * FROM users WHERE id = ?"
+        assert users["count"] == 100
+        assert users["total_ms"] == 5050
+        assert users["p50_ms"] == 50
+        assert users["p95_ms"] == 95
+        assert users["max_ms"] == 100
+        assert users["rows"] == 100
+
+        assert stats.report(sort="max_ms")["queries"][0]["fingerprint"] == \
+            "SELECT COUNT(*) FROM content_library"
+        assert len(stats.report(top=1)["queries"]) == 1
+
+    def test_fingerprints_beyond_cap_fold_into_overflow(self):
+        """Test that unbounded distinct SQL cannot grow the table without limit"""
+        stats = QueryStats()
+        with patch.object(query_stats, "MAX_FINGERPRINTS", 2):
+            stats.record("SELECT a FROM t", 1.0, 0)
+            stats.record("SELECT b FROM t", 1.0, 0)
+            stats.record("SELECT c FROM t", 1.0, 0)
+            stats.record("SELECT d FROM t", 1.0, 0)
+
+        report = stats.report()
+        overflow = [q for q in report["queries"] if q["fingerprint"] == query_stats.OVERFLOW_FINGERPRINT]
+
+        assert report["fingerprints"] == 3
+        assert overflow[0]["count"] == 2
+
+    def test_slow_queries_are_logged_with_route(self):
+        """Test that statements over the threshold are logged with the current route"""
+        stats = QueryStats()
+        token = current_route.set("GET /library/content")
+        try:
+            with patch.object(query_stats, "SLOW_QUERY_MS", 100), \
+                 patch.object(query_stats.logger, "warning") as warning:
+                stats.record("SELECT * FROM content_library WHERE user_id = %s", 50.0, 10)
+                stats.record("SELECT * FROM content_library WHERE user_id = %s", 250.0, 10)
+        finally:
+            current_route.reset(token)
+
+        warning.assert_called_once()
+        message = warning.call_args[0][0]
+        assert "GET /library/content" in message
+        assert "user_id = ?" in message
@@ -0,0 +1,187 @@
+"""
+Scheduler Tests
+Tests for advisory-lock leader election and the Postgres job store (no real database)
+"""
+
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+from apscheduler.job import Job
+from apscheduler.triggers.interval import IntervalTrigger
+
+from scheduler import LeaderElection, scheduler as app_scheduler
+from scheduler_jobstore import PostgresJobStore
+
+
+class FakeLockServer:
+    """Session-level advisory lock shared by several fake connections"""
+    def __init__(self):
+        self.holder = None
+
+
+class FakeSession:
+    def __init__(self, server):
+        self.server = server
+        self.closed = False
+        self.dead = False
+        self.autocommit = False
+
+    def cursor(self):
+        return FakeSessionCursor(self)
+
+    def close(self):
+        # Postgres releases session-level advisory locks when the session ends
+        if self.server.holder is self:
+            self.server.holder = None
+        self.closed = True
+
+
+class FakeSessionCursor:
+    def __init__(self, session):
+        self.session = session
+        self._row = None
+
+    def execute(self, query, params=None):
+        if self.session.dead:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        server = self.session.server
+        if "pg_try_advisory_lock" in query:
+            acquired = server.holder in (None, self.session)
+            if acquired:
+                server.holder = self.session
+            self._row = (acquired,)
+        elif "pg_advisory_unlock" in query:
+            self._row = (server.holder is self.session,)
+            if server.holder is self.session:
+                server.holder = None
+        else:
+            self._row = (1,)
+
+    def fetchone(self):
+        return self._row
+
+    def close(self):
+        pass
+
+
+def make_elector(server, sessions):
+    def connect():
+        session = FakeSession(server)
+        sessions.append(session)
+        return session
+    return LeaderElection(connect, on_elected=MagicMock(), on_demoted=MagicMock(), interval=0.01)
+
+
+class TestLeaderElection:
+    """Test that exactly one process leads and a follower takes over"""
+
+    def test_only_one_leader(self):
+        """Test that the second process stays a follower while the lock is held"""
+        server = FakeLockServer()
+        a = make_elector(server, [])
+        b = make_elector(server, [])
+
+        a._tick()
+        b._tick()
+        a._tick()
+
+        assert a.is_leader and not b.is_leader
+        a.on_elected.assert_called_once()
+        b.on_elected.assert_not_called()
+
+    def test_follower_takes_over_when_leader_session_dies(self):
+        """Test that a lost leader session demotes the leader and frees the lock"""
+        server = FakeLockServer()
+        a_sessions = []
+        a = make_elector(server, a_sessions)
+        b = make_elector(server, [])
+        a._tick()
+        b._tick()
+
+        a_sessions[0].dead = True
+        a._tick()
+        b._tick()
+
+        assert not a.is_leader
+        a.on_demoted.assert_called_once()
+        assert b.is_leader
+        b.on_elected.assert_called_once()
+
+    def test_stop_releases_lock(self):
+        """Test that a leader shutting down hands the lock to the next process"""
+        server = FakeLockServer()
+        a = make_elector(server, [])
+        b = make_elector(server, [])
+        a._tick()
+
+        a.stop()
+        b._tick()
+
+        assert server.holder is not None and b.is_leader
+
+    def test_failed_start_gives_up_leadership(self):
+        """Test that a leader that cannot start its jobs releases the lock"""
+        server = FakeLockServer()
+        a = make_elector(server, [])
+        a.on_elected.side_effect = RuntimeError("job store unavailable")
+
+        a._tick()
+
+        assert not a.is_leader
+        assert server.holder is None
+
+    def test_server_drops_a_dead_leaders_session(self):
+        """Test that the lock session asks the server for keepalives, not just the client"""
+        import scheduler
+
+        with patch.object(scheduler.psycopg2, "connect") as connect:
+            scheduler._connect_dedicated_session()
+
+        options = connect.call_args.kwargs["options"]
+        assert "-c tcp_keepalives_idle=5" in options
+        assert "-c tcp_keepalives_count=2" in options
+        assert "-c tcp_user_timeout=10000" in options
+
+
+class TestPostgresJobStore:
+    """Test that jobs survive a round trip through the job store"""
+
+    def test_job_round_trip(self):
+        """Test that a stored job is restored with its trigger, func and next run time"""
+        rows = {}
+
+        def fake_execute(query, params=None, fetch=False):
+            if params and len(params) == 3:
+                job_id, _, state = params
+                rows[job_id] = bytes(state.adapted)
+                return 1
+            if fetch:
+                return [{"id": job_id, "job_state": state} for job_id, state in rows.items()]
+            return 0
+
+        store = PostgresJobStore()
+        store._scheduler = app_scheduler
+        store._alias = "default"
+        job = Job(
+            app_scheduler,
+            id="check_scheduled_posts",
+            func="workers.post_scheduler:check_scheduled_posts",
+            trigger=IntervalTrigger(minutes=1),
+            executor="default",
+            args=(),
+            kwargs={},
+            name="Check and publish scheduled posts",
+            misfire_grace_time=60,
+            coalesce=True,
+            max_instances=1,
+            next_run_time=datetime(2026, 1, 1, 9, 0, tzinfo=timezone.utc),
+        )
+
+        with patch.object(store, "_execute", side_effect=fake_execute):
+            store.add_job(job)
+            restored = store.lookup_job("check_scheduled_posts")
+
+        assert restored.func_ref == "workers.post_scheduler:check_scheduled_posts"
+        assert str(restored.trigger) == str(job.trigger)
+        assert restored.next_run_time == job.next_run_time
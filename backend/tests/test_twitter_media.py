@@ -0,0 +1,160 @@
+"""
+Twitter Media Upload Tests
+Tests for async OAuth 1.0a signing and the chunked video upload (no real network)
+"""
+
+import asyncio
+import time
+from unittest.mock import patch
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from utils import twitter_media
+from utils.media_upload import MediaUploadError
+from utils.twitter_media import OAuth1Auth, upload_video, UPLOAD_URL
+
+SEGMENT = 256 * 1024
+
+
+def make_auth():
+    return OAuth1Auth("consumer-key", "consumer-secret", "access-token", "access-secret")
+
+
+class FakeUploadAPI:
+    """Chunked media upload endpoint that records APPENDs and reports processing"""
+
+    def __init__(self, processing_states=("succeeded",), fail_append_once=None):
+        self.processing_states = list(processing_states)
+        self.fail_append_once = fail_append_once
+        self.segments = {}
+        self.commands = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.authorizations = []
+
+    async def handler(self, request):
+        self.authorizations.append(request.headers.get("Authorization", ""))
+        if request.method == "GET":
+            command = request.url.params["command"]
+        elif request.headers["Content-Type"].startswith("multipart/form-data"):
+            command = "APPEND"
+        else:
+            form = parse_qs((await request.aread()).decode())
+            command = form["command"][0]
+        self.commands.append(command)
+
+        if command == "INIT":
+            return httpx.Response(202, json={"media_id_string": "media-1"})
+
+        if command == "APPEND":
+            body = await request.aread()
+            index = int(body.split(b'name="segment_index"\r\n\r\n')[1].split(b"\r\n")[0])
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            if self.fail_append_once == index:
+                self.fail_append_once = None
+                return httpx.Response(503)
+            self.segments[index] = len(body)
+            return httpx.Response(204)
+
+        state = self.processing_states.pop(0)
+        info = {"state": state, "check_after_secs": 1}
+        if state == "failed":
+            info["error"] = {"message": "InvalidMedia"}
+        return httpx.Response(200, json={"media_id_string": "media-1", "processing_info": info})
+
+
+def run_upload(api, tmp_path, size, **kwargs):
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(b"v" * size)
+    sleeps = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(seconds):
+        # Skip retry/processing waits; keep the fake server's short yields
+        if seconds >= 1:
+            sleeps.append(seconds)
+        else:
+            await real_sleep(seconds)
+
+    async def upload():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(api.handler)) as client:
+            return await upload_video(client, make_auth(), str(video), segment_size=SEGMENT, **kwargs)
+
+    with patch.object(twitter_media.asyncio, "sleep", fake_sleep):
+        media_id = asyncio.run(upload())
+    return media_id, sleeps
+
+
+class TestOAuth1Signing:
+    """Test that requests are signed without blocking or reading upload bodies"""
+
+    def test_form_request_is_signed(self):
+        """Test that a form-encoded request gets an OAuth 1.0a header"""
+        request = httpx.Request("POST", UPLOAD_URL, data={"command": "INIT"})
+
+        signed = next(make_auth().auth_flow(request))
+
+        header = signed.headers["Authorization"]
+        assert header.startswith("OAuth ")
+        assert 'oauth_consumer_key="consumer-key"' in header
+        assert 'oauth_token="access-token"' in header
+
+    def test_form_body_changes_the_signature(self):
+        """Test that form parameters are covered by the signature"""
+        auth = make_auth()
+        signatures = set()
+        for command in ("INIT", "FINALIZE"):
+            with patch("oauthlib.oauth1.rfc5849.generate_nonce", return_value="nonce"), \
+                 patch("oauthlib.oauth1.rfc5849.generate_timestamp", return_value="1700000000"):
+                request = httpx.Request("POST", UPLOAD_URL, data={"command": command})
+                header = next(auth.auth_flow(request)).headers["Authorization"]
+            signatures.add(header.split('oauth_signature="')[1].split('"')[0])
+
+        assert len(signatures) == 2
+
+
+class TestVideoUpload:
+    """Test the async INIT/APPEND/FINALIZE/STATUS flow"""
+
+    def test_segments_upload_concurrently_within_limit(self, tmp_path):
+        """Test that APPENDs overlap up to the concurrency limit and cover the file"""
+        api = FakeUploadAPI()
+
+        media_id, _ = run_upload(api, tmp_path, SEGMENT * 6 + 10, concurrency=3)
+
+        assert media_id == "media-1"
+        assert sorted(api.segments) == list(range(7))
+        assert api.peak_in_flight == 3
+        assert api.commands[0] == "INIT" and api.commands[-1] == "FINALIZE"
+        assert all(auth.startswith("OAuth ") for auth in api.authorizations)
+
+    def test_failed_segment_is_retried(self, tmp_path):
+        """Test that a 503 on one APPEND is retried instead of failing the upload"""
+        api = FakeUploadAPI(fail_append_once=1)
+
+        run_upload(api, tmp_path, SEGMENT * 3)
+
+        assert sorted(api.segments) == [0, 1, 2]
+        assert api.commands.count("APPEND") == 4
+
+    def test_processing_is_polled_with_asyncio_sleep(self, tmp_path):
+        """Test that STATUS polling awaits instead of blocking the event loop"""
+        api = FakeUploadAPI(processing_states=("pending", "in_progress", "succeeded"))
+
+        with patch.object(time, "sleep", side_effect=AssertionError("blocking sleep")):
+            _, sleeps = run_upload(api, tmp_path, SEGMENT)
+
+        assert api.commands.count("STATUS") == 2
+        assert sleeps == [1, 1]
+
+    def test_processing_failure_raises(self, tmp_path):
+        """Test that a failed processing state surfaces as MediaUploadError"""
+        api = FakeUploadAPI(processing_states=("pending", "failed"))
+
+        with pytest.raises(MediaUploadError, match="InvalidMedia"):
+            run_upload(api, tmp_path, SEGMENT)
@@ -11,9 +11,21 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.auth import decode_token
+from db_pool import register_prepared_statement, execute_prepared
 
 security = HTTPBearer(auto_error=False)
 
+# Runs on every organization-scoped request - prepared once per pooled connection
+GET_USER_CONTEXT = register_prepared_statement("auth.get_user_context", """
+    SELECT
+        u.current_organization_id,
+        om.role
+    FROM users u
+    LEFT JOIN organization_members om ON om.user_id = u.id
+        AND om.organization_id = u.current_organization_id
+    WHERE u.id = %s
+""")
+
 
 def get_token_from_request(request: Request, credentials: Optional[HTTPAuthorizationCredentials]) -> Optional[str]:
     """
@@ -195,23 +207,15 @@ async def get_user_context(
     Raises:
         HTTPException: If user has no organization or invalid state
     """
-    from db_pool import get_db_connection
+    from db_pool import get_async_db_connection
 
-    with get_db_connection() as conn:
+    async with get_async_db_connection() as conn:
         cursor = conn.cursor()
         try:
             # Get user's current organization and role
-            cursor.execute("""
-                SELECT
-                    u.current_organization_id,
-                    om.role
-                FROM users u
-                LEFT JOIN organization_members om ON om.user_id = u.id
-                    AND om.organization_id = u.current_organization_id
-                WHERE u.id = %s
-            """, (user_id,))
+            await execute_prepared(cursor, GET_USER_CONTEXT, (user_id,))
 
-            result = cursor.fetchone()
+            result = await cursor.fetchone()
 
             # Allow legacy users without organizations (for backwards compatibility)
             if not result:
@@ -231,7 +235,7 @@ async def get_user_context(
             }
 
         finally:
-            cursor.close()
+            await cursor.close()
 
 
 async def verify_super_admin(user_id: str = Depends(get_current_user_id)) -> str:
@@ -1,6 +1,9 @@
 """
 Credit Management Utility
 Handles credit deduction, checking, and tracking
+
+All helpers are async and run on the async connection pool, so credit
+checks inside async routes never block the event loop.
 """
 
 from typing import Dict, Optional
@@ -13,7 +16,19 @@ parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
-from db_pool import get_db_connection
+from db_pool import get_async_db_connection, register_prepared_statement, execute_prepared
+
+# Runs on most AI requests - prepared once per pooled connection
+GET_USER_CREDITS = register_prepared_statement("credits.get_user_credits", """
+    SELECT
+        credit_balance as balance,
+        monthly_credit_allocation as monthly_allocation,
+        total_credits_used as total_used,
+        total_credits_purchased as total_purchased,
+        last_credit_reset_at as last_reset
+    FROM users
+    WHERE id = %s
+""")
 
 # Credit costs for different operations
 CREDIT_COSTS = {
@@ -41,7 +56,7 @@ def get_credit_cost(operation_type: str) -> int:
     return CREDIT_COSTS.get(operation_type, 0)
 
 
-def get_user_credits(user_id: str) -> Dict:
+async def get_user_credits(user_id: str) -> Dict:
     """
     Get user's current credit balance and allocation
 
@@ -54,43 +69,34 @@ def get_user_credits(user_id: str) -> Dict:
             "last_reset": "2024-01-15T10:00:00"
         }
     """
-    with get_db_connection() as conn:
+    async with get_async_db_connection() as conn:
         cur = conn.cursor()
         try:
-            cur.execute("""
-                SELECT
-                    credit_balance as balance,
-                    monthly_credit_allocation as monthly_allocation,
-                    total_credits_used as total_used,
-                    total_credits_purchased as total_purchased,
-                    last_credit_reset_at as last_reset
-                FROM users
-                WHERE id = %s
-            """, (user_id,))
+            await execute_prepared(cur, GET_USER_CREDITS, (user_id,))
 
-            result = cur.fetchone()
+            result = await cur.fetchone()
 
             if not result:
                 raise ValueError(f"User not found: {user_id}")
 
             return dict(result)
         finally:
-            cur.close()
+            await cur.close()
 
 
-def check_sufficient_credits(user_id: str, required_credits: int) -> bool:
+async def check_sufficient_credits(user_id: str, required_credits: int) -> bool:
     """Check if user has enough credits"""
-    with get_db_connection() as conn:
+    async with get_async_db_connection() as conn:
         cur = conn.cursor()
         try:
-            cur.execute("SELECT has_sufficient_credits(%s, %s) as has_credits", (user_id, required_credits))
-            result = cur.fetchone()
+            await cur.execute("SELECT has_sufficient_credits(%s, %s) as has_credits", (user_id, required_credits))
+            result = await cur.fetchone()
             return result['has_credits'] if result else False
         finally:
-            cur.close()
+            await cur.close()
 
 
-def deduct_credits(
+async def deduct_credits(
     user_id: str,
     operation_type: str,
     credits: Optional[int] = None,
@@ -124,37 +130,39 @@ def deduct_credits(
     if credits == 0:
         raise ValueError(f"Invalid operation type: {operation_type}")
 
-    with get_db_connection() as conn:
+    async with get_async_db_connection() as conn:
         cur = conn.cursor()
         try:
-            # Check if user has enough credits
-            if not check_sufficient_credits(user_id, credits):
-                credit_info = get_user_credits(user_id)
-                raise InsufficientCreditsError(credits, credit_info['balance'])
+            # Commits on its own, or is a savepoint inside a caller's transaction
+            # (never commits or rolls back the caller's work)
+            async with conn.transaction():
+                # Check if user has enough credits
+                if not await check_sufficient_credits(user_id, credits):
+                    credit_info = await get_user_credits(user_id)
+                    raise InsufficientCreditsError(credits, credit_info['balance'])
+
+                # Deduct credits using database function
+                await cur.execute("""
+                    SELECT record_credit_transaction(
+                        %s::uuid,
+                        'spent'::varchar,
+                        %s::integer,
+                        %s::varchar,
+                        %s::jsonb,
+                        %s::text
+                    ) as transaction_id
+                """, (
+                    user_id,
+                    -credits,  # Negative for deduction
+                    operation_type,
+                    json.dumps(operation_details) if operation_details else None,
+                    description or f"Used {credits} credits for {operation_type}"
+                ))
 
-            # Deduct credits using database function
-            cur.execute("""
-                SELECT record_credit_transaction(
-                    %s::uuid,
-                    'spent'::varchar,
-                    %s::integer,
-                    %s::varchar,
-                    %s::jsonb,
-                    %s::text
-                ) as transaction_id
-            """, (
-                user_id,
-                -credits,  # Negative for deduction
-                operation_type,
-                json.dumps(operation_details) if operation_details else None,
-                description or f"Used {credits} credits for {operation_type}"
-            ))
-
-            transaction_id = cur.fetchone()['transaction_id']
-            conn.commit()
+                transaction_id = (await cur.fetchone())['transaction_id']
 
             # Get updated balance
-            credit_info = get_user_credits(user_id)
+            credit_info = await get_user_credits(user_id)
 
             return {
                 "transaction_id": str(transaction_id),
@@ -164,17 +172,16 @@ def deduct_credits(
             }
 
         except Exception as e:
-            conn.rollback()
             # Check if it's an insufficient credits error from the database
             if "Insufficient credits" in str(e):
-                credit_info = get_user_credits(user_id)
+                credit_info = await get_user_credits(user_id)
                 raise InsufficientCreditsError(credits, credit_info['balance'])
             raise
         finally:
-            cur.close()
+            await cur.close()
 
 
-def add_credits(
+async def add_credits(
     user_id: str,
     credits: int,
     transaction_type: str = "purchased",
@@ -189,30 +196,31 @@ def add_credits(
     - Refunds
     - Manual adjustments
     """
-    with get_db_connection() as conn:
+    async with get_async_db_connection() as conn:
         cur = conn.cursor()
         try:
-            cur.execute("""
-                SELECT record_credit_transaction(
-                    %s::uuid,
-                    %s::varchar,
-                    %s::integer,
-                    NULL,
-                    %s::jsonb,
-                    %s::text
-                ) as transaction_id
-            """, (
-                user_id,
-                transaction_type,
-                credits,
-                json.dumps({"stripe_payment_intent_id": stripe_payment_intent_id}) if stripe_payment_intent_id else None,
-                description or f"Added {credits} credits"
-            ))
-
-            transaction_id = cur.fetchone()['transaction_id']
-            conn.commit()
-
-            credit_info = get_user_credits(user_id)
+            # Savepoint when called inside a caller's transaction (see deduct_credits)
+            async with conn.transaction():
+                await cur.execute("""
+                    SELECT record_credit_transaction(
+                        %s::uuid,
+                        %s::varchar,
+                        %s::integer,
+                        NULL,
+                        %s::jsonb,
+                        %s::text
+                    ) as transaction_id
+                """, (
+                    user_id,
+                    transaction_type,
+                    credits,
+                    json.dumps({"stripe_payment_intent_id": stripe_payment_intent_id}) if stripe_payment_intent_id else None,
+                    description or f"Added {credits} credits"
+                ))
+
+                transaction_id = (await cur.fetchone())['transaction_id']
+
+            credit_info = await get_user_credits(user_id)
 
             return {
                 "transaction_id": str(transaction_id),
@@ -221,15 +229,15 @@ def add_credits(
                 "transaction_type": transaction_type
             }
         finally:
-            cur.close()
+            await cur.close()
 
 
-def get_credit_history(user_id: str, limit: int = 50) -> list:
+async def get_credit_history(user_id: str, limit: int = 50) -> list:
     """Get user's credit transaction history"""
-    with get_db_connection() as conn:
+    async with get_async_db_connection(readonly=True) as conn:
         cur = conn.cursor()
         try:
-            cur.execute("""
+            await cur.execute("""
                 SELECT
                     id,
                     transaction_type,
@@ -245,7 +253,7 @@ def get_credit_history(user_id: str, limit: int = 50) -> list:
                 LIMIT %s
             """, (user_id, limit))
 
-            transactions = cur.fetchall()
+            transactions = await cur.fetchall()
             return [dict(tx) for tx in transactions]
         finally:
-            cur.close()
+            await cur.close()
@@ -8,10 +8,25 @@ from typing import Optional, Dict, BinaryIO
 import logging
 import os
 import mimetypes
+import shutil
+import tempfile
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Streaming relay (source URL -> resumable upload): bytes held in memory per
+# upload. YouTube needs chunks in multiples of 256 KiB, so keep this in whole MB.
+RELAY_CHUNK_SIZE = int(os.getenv("MEDIA_RELAY_CHUNK_MB", "8")) * 1024 * 1024
+
+# Retries per chunk (upload) or per reconnect (source download) before giving up
+RELAY_MAX_RETRIES = int(os.getenv("MEDIA_RELAY_MAX_RETRIES", "5"))
+RELAY_RETRY_BASE_SECONDS = 1.0
+
+# Read size for streaming local files / downloads
+FILE_CHUNK_SIZE = 1024 * 1024
+
 
 class MediaUploadError(Exception):
     """Custom exception for media upload errors"""
@@ -246,10 +261,50 @@ async def upload_linkedin_image(file_path: str, access_token: str, person_urn: s
         return asset_urn
 
 
+# Set by media_download_cache(): {"dir": temp dir, "files": url -> download task}
+_download_cache = ContextVar("media_download_cache", default=None)
+
+
+@asynccontextmanager
+async def media_download_cache():
+    """
+    Download each URL once for every download_url_to_file() call in this block
+    Used when one post is published to several platforms at once. Files are
+    removed when the block exits.
+    """
+    if _download_cache.get() is not None:
+        yield
+        return
+
+    cache_dir = tempfile.mkdtemp(prefix="orla3-media-")
+    files = {}
+    token = _download_cache.set({"dir": cache_dir, "files": files})
+    try:
+        yield
+    finally:
+        _download_cache.reset(token)
+        for download in files.values():
+            download.cancel()
+        await asyncio.gather(*files.values(), return_exceptions=True)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def _link_or_copy(source: str, destination: str):
+    # Hard link when possible (no copy); callers unlinking their path leave the cache intact
+    staging = f"{destination}.link"
+    try:
+        os.link(source, staging)
+        os.replace(staging, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
 async def download_url_to_file(url: str, output_path: str) -> str:
     """
     Download file from URL to local path
-    Used when media is hosted remotely
+    Used when media is hosted remotely. Streams to disk, so memory use
+    doesn't grow with the file size. Inside media_download_cache(), each
+    URL is downloaded only once.
 
     Args:
         url: Source URL
@@ -258,18 +313,241 @@ async def download_url_to_file(url: str, output_path: str) -> str:
     Returns:
         str: output_path
     """
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.get(url)
+    cache = _download_cache.get()
+    if cache is None:
+        return await _download(url, output_path)
+
+    download = cache["files"].get(url)
+    if download is None:
+        cached_path = os.path.join(cache["dir"], f"{len(cache['files'])}{Path(output_path).suffix}")
+        download = cache["files"][url] = asyncio.create_task(_download(url, cached_path))
+    else:
+        logger.info(f"Reusing downloaded media for {url}")
+
+    # Shielded: one caller giving up must not cancel the download for the others
+    cached_path = await asyncio.shield(download)
+    await asyncio.to_thread(_link_or_copy, cached_path, output_path)
+    return output_path
 
-        if response.status_code != 200:
-            raise MediaUploadError(f"Failed to download {url}: {response.status_code}")
 
-        with open(output_path, 'wb') as f:
-            f.write(response.content)
+async def _download(url: str, output_path: str) -> str:
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        async with client.stream("GET", url) as response:
+            if response.status_code != 200:
+                raise MediaUploadError(f"Failed to download {url}: {response.status_code}")
+
+            with open(output_path, 'wb') as f:
+                async for piece in response.aiter_bytes(FILE_CHUNK_SIZE):
+                    f.write(piece)
 
         return output_path
 
 
+async def aiter_file(file_path: str, chunk_size: int = FILE_CHUNK_SIZE):
+    """Read a local file in chunks - pass as httpx content= to upload without loading it into memory"""
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = await asyncio.to_thread(f.read, chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+class _SourceStream:
+    """
+    Streaming GET of the source media that reconnects with a Range request
+    (from the last byte received) if the download drops
+    """
+
+    def __init__(self, client, url: str, max_retries: int):
+        self.client = client
+        self.url = url
+        self.max_retries = max_retries
+        self.total = None
+        self.received = 0
+        self._response = None
+
+    async def open(self):
+        headers = {"Range": f"bytes={self.received}-"} if self.received else {}
+        response = await self.client.send(self.client.build_request("GET", self.url, headers=headers), stream=True)
+
+        expected = 206 if self.received else 200
+        if response.status_code != expected:
+            await response.aclose()
+            if self.received:
+                raise MediaUploadError(f"Source download dropped and the server does not support resume ({response.status_code})")
+            raise MediaUploadError(f"Failed to fetch video: {response.status_code}")
+
+        # Size is only known up front if the body isn't re-encoded in transit
+        if self.total is None and response.headers.get("Content-Length") and "Content-Encoding" not in response.headers:
+            self.total = int(response.headers["Content-Length"])
+        self._response = response
+
+    async def pieces(self):
+        failures = 0
+        while True:
+            try:
+                if self._response is None:
+                    await self.open()
+                async for piece in self._response.aiter_bytes():
+                    self.received += len(piece)
+                    yield piece
+                await self.close()
+                return
+            except httpx.TransportError as e:
+                await self.close()
+                failures += 1
+                if failures > self.max_retries:
+                    raise MediaUploadError(f"Source download failed after {self.max_retries} retries: {e}")
+                logger.warning(f"Source download interrupted at {self.received} bytes ({e}) - resuming")
+                await asyncio.sleep(RELAY_RETRY_BASE_SECONDS * 2 ** (failures - 1))
+
+    async def close(self):
+        if self._response is not None:
+            await self._response.aclose()
+            self._response = None
+
+
+def _committed_offset(response: httpx.Response) -> int:
+    """Next byte the upload session expects, from a 308's Range header (bytes=0-N)"""
+    received = response.headers.get("Range")
+    if not received:
+        return 0
+    return int(received.rsplit("-", 1)[1]) + 1
+
+
+async def _upload_chunk(client, session_url: str, chunk: bytearray, offset: int,
+                        total: Optional[int], final: bool, max_retries: int) -> httpx.Response:
+    """
+    PUT one chunk of a resumable upload, resuming from the committed offset on failure
+
+    Returns:
+        308 response for intermediate chunks, 200/201 with the created resource for the last one
+    """
+    end = offset + len(chunk)
+    total_label = str(total) if total is not None else (str(end) if final else "*")
+    position = offset
+    failures = 0
+
+    while True:
+        data = bytes(chunk[position - offset:])
+        try:
+            if data:
+                response = await client.put(session_url, content=data, headers={
+                    "Content-Range": f"bytes {position}-{end - 1}/{total_label}",
+                    "Content-Length": str(len(data)),
+                })
+            else:
+                # Whole chunk already committed before the failure - ask for the status
+                response = await client.put(session_url, headers={
+                    "Content-Range": f"bytes */{total_label}",
+                    "Content-Length": "0",
+                })
+
+            if response.status_code in (200, 201):
+                return response
+            if response.status_code == 308:
+                committed = _committed_offset(response)
+                if committed < offset:
+                    raise MediaUploadError(f"Upload session lost committed bytes (at {committed}, expected {offset})")
+                if committed >= end and not final:
+                    return response
+                if committed > position:
+                    # Partially committed - send the rest of the chunk
+                    position = committed
+                    continue
+                error = "no bytes accepted"
+            elif response.status_code in (404, 410):
+                raise MediaUploadError(f"Upload session expired ({response.status_code})")
+            elif response.status_code != 429 and response.status_code < 500:
+                raise MediaUploadError(f"Chunk upload failed: {response.status_code} - {response.text}")
+            else:
+                error = f"HTTP {response.status_code}"
+        except httpx.TransportError as e:
+            error = str(e) or type(e).__name__
+
+        failures += 1
+        if failures > max_retries:
+            raise MediaUploadError(f"Chunk upload failed after {max_retries} retries: {error}")
+        logger.warning(f"Chunk at byte {position} failed ({error}) - resuming")
+        await asyncio.sleep(RELAY_RETRY_BASE_SECONDS * 2 ** (failures - 1))
+
+        # Ask the session how much it kept, then resend from there
+        try:
+            status = await client.put(session_url, headers={
+                "Content-Range": f"bytes */{total_label}",
+                "Content-Length": "0",
+            })
+        except httpx.TransportError:
+            continue
+        if status.status_code in (200, 201):
+            return status
+        if status.status_code == 308:
+            position = max(_committed_offset(status), offset)
+
+
+def _log_progress(uploaded: int, total: Optional[int]):
+    if total:
+        logger.info(f"Uploaded {uploaded}/{total} bytes ({(uploaded/total)*100:.1f}%)")
+    else:
+        logger.info(f"Uploaded {uploaded} bytes")
+
+
+async def relay_resumable_upload(
+    client,
+    source_url: str,
+    start_session,
+    chunk_size: int = RELAY_CHUNK_SIZE,
+    max_retries: int = RELAY_MAX_RETRIES,
+    on_progress=_log_progress
+) -> httpx.Response:
+    """
+    Stream media from a URL into a resumable upload session without buffering the file
+    Used for YouTube videos. Memory use is about one chunk, whatever the file size.
+
+    Args:
+        client: httpx client (shared client from http_clients works)
+        source_url: Public URL of the media
+        start_session: async callable(total_size or None) -> upload session URL
+        chunk_size: Bytes per PUT (multiple of 256 KiB for YouTube)
+        max_retries: Retries per chunk / source reconnect
+        on_progress: Called with (bytes_uploaded, total_size or None) after each chunk
+
+    Returns:
+        httpx.Response: Final response (the created resource)
+
+    Raises:
+        MediaUploadError: If the source or the upload fails past its retries
+    """
+    source = _SourceStream(client, source_url, max_retries)
+    try:
+        await source.open()
+        session_url = await start_session(source.total)
+
+        offset = 0
+        pending = bytearray()
+        async for piece in source.pieces():
+            pending += piece
+            # Keep at least one byte back so the last chunk is known to be last
+            while len(pending) > chunk_size:
+                chunk = pending[:chunk_size]
+                await _upload_chunk(client, session_url, chunk, offset, source.total, False, max_retries)
+                del pending[:chunk_size]
+                offset += len(chunk)
+                if on_progress:
+                    on_progress(offset, source.total)
+
+        if source.total is not None and offset + len(pending) != source.total:
+            raise MediaUploadError(f"Source ended at {offset + len(pending)} of {source.total} bytes")
+
+        response = await _upload_chunk(client, session_url, pending, offset, offset + len(pending), True, max_retries)
+        if on_progress:
+            on_progress(offset + len(pending), offset + len(pending))
+        return response
+    finally:
+        await source.close()
+
+
 def get_mime_type(file_path: str) -> str:
     """Get MIME type from file path"""
     mime_type, _ = mimetypes.guess_type(file_path)
@@ -0,0 +1,21 @@
+"""
+Platform names vs connected account types
+"""
+
+# Platform names that publish through another platform's connected account
+PLATFORM_ALIASES = {
+    "x": "twitter",
+}
+
+
+def service_type_for(platform: str) -> str:
+    """
+    connected_services.service_type that publishes to a platform
+
+    Args:
+        platform: Platform name from a request or calendar event (e.g. "x")
+
+    Returns:
+        str: Service type (e.g. "twitter")
+    """
+    return PLATFORM_ALIASES.get(platform, platform)
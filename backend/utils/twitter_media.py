@@ -0,0 +1,205 @@
+"""
+Async Twitter/X media uploads
+OAuth 1.0a signing for httpx plus the chunked INIT/APPEND/FINALIZE/STATUS
+flow, so uploads and processing waits never block the event loop
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+
+import httpx
+from oauthlib.oauth1 import Client as OAuth1Client
+
+from utils.media_upload import MediaUploadError, validate_media_file
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_URL = "https://upload.twitter.com/1.1/media/upload.json"
+
+# APPEND segments: Twitter accepts up to 5 MB each, uploaded in parallel
+SEGMENT_SIZE = 4 * 1024 * 1024
+APPEND_CONCURRENCY = int(os.getenv("TWITTER_APPEND_CONCURRENCY", "3"))
+APPEND_MAX_RETRIES = 3
+APPEND_RETRY_BASE_SECONDS = 1.0
+
+# Stop waiting for Twitter's video processing after this long
+PROCESSING_TIMEOUT_SECONDS = float(os.getenv("TWITTER_PROCESSING_TIMEOUT_SECONDS", "600"))
+
+
+class OAuth1Auth(httpx.Auth):
+    """
+    OAuth 1.0a user-context signing for httpx requests
+
+    Form-encoded bodies are part of the signature; multipart bodies (media
+    uploads) are not, so they are never read here and can stream.
+    """
+
+    def __init__(self, api_key: str, api_secret: str, access_token: str, access_token_secret: str):
+        self._client = OAuth1Client(
+            api_key,
+            client_secret=api_secret,
+            resource_owner_key=access_token,
+            resource_owner_secret=access_token_secret
+        )
+
+    def auth_flow(self, request):
+        body = None
+        headers = {}
+        content_type = request.headers.get("Content-Type", "")
+        if content_type.startswith("application/x-www-form-urlencoded"):
+            body = request.content.decode()
+            headers["Content-Type"] = content_type
+
+        _, signed_headers, _ = self._client.sign(
+            str(request.url), http_method=request.method, body=body, headers=headers
+        )
+        request.headers["Authorization"] = signed_headers["Authorization"]
+        yield request
+
+
+def _check(response: httpx.Response, step: str, ok=(200, 201, 202, 204)):
+    if response.status_code not in ok:
+        raise MediaUploadError(f"Twitter media {step} failed: {response.status_code} - {response.text}")
+    return response
+
+
+async def upload_image(client, auth: OAuth1Auth, file_path: str) -> str:
+    """
+    Simple (single request) image upload
+
+    Returns:
+        str: media_id_string
+    """
+    validate_media_file(file_path, "twitter", "image")
+
+    with open(file_path, 'rb') as f:
+        response = await client.post(UPLOAD_URL, files={'media': f}, auth=auth)
+    return _check(response, "upload", ok=(200,)).json()['media_id_string']
+
+
+async def _append_segment(client, auth: OAuth1Auth, media_id: str, file_path: str,
+                          segment_index: int, segment_size: int):
+    def read_segment():
+        with open(file_path, 'rb') as f:
+            f.seek(segment_index * segment_size)
+            return f.read(segment_size)
+
+    segment = await asyncio.to_thread(read_segment)
+
+    for attempt in range(APPEND_MAX_RETRIES + 1):
+        try:
+            response = await client.post(
+                UPLOAD_URL,
+                data={'command': 'APPEND', 'media_id': media_id, 'segment_index': str(segment_index)},
+                files={'media': segment},
+                auth=auth
+            )
+            if response.status_code < 500 and response.status_code != 429:
+                _check(response, f"APPEND (segment {segment_index})")
+                return
+            error = f"HTTP {response.status_code}"
+        except httpx.TransportError as e:
+            error = str(e) or type(e).__name__
+
+        if attempt < APPEND_MAX_RETRIES:
+            logger.warning(f"Twitter APPEND segment {segment_index} failed ({error}) - retrying")
+            await asyncio.sleep(APPEND_RETRY_BASE_SECONDS * 2 ** attempt)
+
+    raise MediaUploadError(f"Twitter media APPEND (segment {segment_index}) failed after {APPEND_MAX_RETRIES} retries: {error}")
+
+
+async def wait_for_processing(client, auth: OAuth1Auth, media_id: str, processing_info: dict,
+                              timeout: float = PROCESSING_TIMEOUT_SECONDS):
+    """
+    Poll STATUS until Twitter has processed the media (asyncio.sleep between polls)
+
+    Raises:
+        MediaUploadError: If processing fails or takes longer than timeout
+    """
+    deadline = time.monotonic() + timeout
+    state = (processing_info or {}).get('state')
+
+    while state in ('pending', 'in_progress'):
+        wait = processing_info.get('check_after_secs', 5)
+        if time.monotonic() + wait > deadline:
+            raise MediaUploadError(f"Twitter media processing timed out after {timeout:g}s")
+        await asyncio.sleep(wait)
+
+        response = await client.get(UPLOAD_URL, params={'command': 'STATUS', 'media_id': media_id}, auth=auth)
+        processing_info = _check(response, "STATUS", ok=(200,)).json().get('processing_info', {})
+        state = processing_info.get('state')
+        logger.info(f"Twitter media {media_id} processing: {state} ({processing_info.get('progress_percent', 0)}%)")
+
+    if state == 'failed':
+        error = processing_info.get('error', {}).get('message', 'unknown error')
+        raise MediaUploadError(f"Twitter video processing failed: {error}")
+
+
+async def upload_video(
+    client,
+    auth: OAuth1Auth,
+    file_path: str,
+    media_type: str = "video/mp4",
+    media_category: str = "tweet_video",
+    segment_size: int = SEGMENT_SIZE,
+    concurrency: int = APPEND_CONCURRENCY
+) -> str:
+    """
+    Chunked video upload: INIT, parallel APPENDs, FINALIZE, then wait for processing
+
+    Memory use is about concurrency x segment_size whatever the file size.
+
+    Args:
+        client: httpx client (shared client from http_clients works)
+        auth: OAuth1Auth for the posting account
+        file_path: Local video file
+        media_type: MIME type
+        media_category: Twitter media category
+        segment_size: Bytes per APPEND (max 5 MB)
+        concurrency: APPENDs in flight at once
+
+    Returns:
+        str: media_id_string, ready to attach to a tweet
+
+    Raises:
+        MediaUploadError: If any step fails
+    """
+    validate_media_file(file_path, "twitter", "video")
+    file_size = os.path.getsize(file_path)
+
+    # INIT
+    response = await client.post(UPLOAD_URL, data={
+        'command': 'INIT',
+        'media_type': media_type,
+        'total_bytes': str(file_size),
+        'media_category': media_category
+    }, auth=auth)
+    media_id = _check(response, "INIT").json()['media_id_string']
+
+    # APPEND
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def append(segment_index):
+        async with semaphore:
+            await _append_segment(client, auth, media_id, file_path, segment_index, segment_size)
+
+    tasks = [asyncio.create_task(append(i)) for i in range(math.ceil(file_size / segment_size))]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # One segment failed for good - don't keep uploading the rest
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    logger.info(f"Twitter media {media_id}: {len(tasks)} segment(s) uploaded ({file_size} bytes)")
+
+    # FINALIZE
+    response = await client.post(UPLOAD_URL, data={'command': 'FINALIZE', 'media_id': media_id}, auth=auth)
+    finalize_data = _check(response, "FINALIZE", ok=(200, 201)).json()
+
+    # STATUS
+    await wait_for_processing(client, auth, media_id, finalize_data.get('processing_info'))
+    return media_id
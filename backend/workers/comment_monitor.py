@@ -4,17 +4,62 @@ Polls social media comments and automatically replies based on user settings
 Runs every 15 minutes via APScheduler
 """
 import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
 import httpx
 import asyncio
-from datetime import datetime, timedelta
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 import logging
 from typing import List, Dict, Optional
+from urllib.parse import urlencode
 import json
+from psycopg2.extras import execute_values
+from db_pool import get_worker_db_connection, run_in_worker_pool
 
 logger = logging.getLogger(__name__)
 
+# APScheduler interval for monitor_and_reply_to_comments (see scheduler.JOBS)
+MONITOR_INTERVAL_MINUTES = 15
+
+# Users processed at once - each holds HTTP connections to Meta/OpenAI,
+# but a pooled DB connection only for the few milliseconds of its queries
+COMMENT_MONITOR_CONCURRENCY = int(os.getenv("COMMENT_MONITOR_CONCURRENCY", "10"))
+
+# Outcome of the most recent tick (shown in /scheduler/status)
+last_run = {}
+
+# Graph API (Instagram + Facebook)
+GRAPH_API_URL = "https://graph.facebook.com/v18.0"
+GRAPH_BATCH_LIMIT = 50  # Requests per batch call (Graph API maximum)
+RECENT_POSTS_PER_USER = 10
+COMMENTS_PAGE_SIZE = 50
+MAX_COMMENT_PAGES = 5  # Per post per tick, including the embedded first page
+
+# Reply generation: up to REPLY_BATCH_SIZE comments per OpenAI call,
+# REPLY_BATCH_CONCURRENCY calls in flight per user
+REPLY_BATCH_SIZE = int(os.getenv("COMMENT_MONITOR_REPLY_BATCH_SIZE", "10"))
+REPLY_BATCH_CONCURRENCY = int(os.getenv("COMMENT_MONITOR_REPLY_BATCH_CONCURRENCY", "3"))
+
+# Near-duplicate short comments ("love this!", "Love this!!") reuse a reply
+REPLY_CACHE_SIZE = 1000
+REPLY_CACHE_TTL_SECONDS = 6 * 60 * 60
+REPLY_CACHE_MAX_WORDS = 6
+
+FALLBACK_REPLY = "Thanks for your comment!"
+
+# Handled comment IDs only need to cover the overlap at each post's cursor
+SEEN_COMMENT_RETENTION_DAYS = int(os.getenv("COMMENT_MONITOR_SEEN_RETENTION_DAYS", "14"))
+
+# A comment whose reply keeps failing is given up on (handled, not replied)
+# so it stops holding its post's cursor back
+MAX_REPLY_ATTEMPTS = int(os.getenv("COMMENT_MONITOR_MAX_REPLY_ATTEMPTS", "3"))
+
+# Posts without a cursor yet start this far before the newest cursor on the
+# platform (platform clock), so comments that landed during the previous run
+# or were indexed late are still fetched - seen_comments drops the overlap
+NEW_POST_LOOKBACK_MINUTES = int(os.getenv("COMMENT_MONITOR_NEW_POST_LOOKBACK_MINUTES", "60"))
+
 
 # ============================================================================
 # SENTIMENT ANALYSIS (Simple keyword-based)
@@ -52,24 +97,8 @@ def analyze_sentiment(text: str) -> str:
 # AI REPLY GENERATION
 # ============================================================================
 
-async def generate_ai_reply(comment_text: str, settings: Dict, context: Optional[str] = None) -> str:
-    """
-    Generate AI reply using OpenAI based on user settings
-
-    Args:
-        comment_text: The comment to reply to
-        settings: User's auto-reply settings (tone, length, custom_instructions)
-        context: Optional post context
-
-    Returns:
-        Generated reply text
-    """
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-    if not OPENAI_API_KEY:
-        logger.error("OPENAI_API_KEY not set")
-        return "Thanks for your comment!"
-
-    # Build prompt based on settings
+def _reply_system_prompt(settings: Dict) -> str:
+    """System prompt from the user's tone, length and custom instructions"""
     tone = settings.get('reply_tone', 'friendly')
     length = settings.get('reply_length', 'short')
     custom_instructions = settings.get('custom_instructions', '')
@@ -80,7 +109,7 @@ async def generate_ai_reply(comment_text: str, settings: Dict, context: Optional
         'long': 'Provide a detailed response (3-5 sentences)'
     }
 
-    system_prompt = f"""You are a helpful social media manager replying to comments.
+    return f"""You are a helpful social media manager replying to comments.
 Tone: {tone}
 Length: {length_guidelines.get(length, length_guidelines['short'])}
 
@@ -94,9 +123,13 @@ Rules:
 - Keep it conversational and natural
 """
 
-    user_prompt = f"Reply to this comment: \"{comment_text}\""
-    if context:
-        user_prompt += f"\n\nPost context: {context}"
+
+async def _chat_completion(payload: Dict) -> Optional[str]:
+    """POST to OpenAI chat completions; returns the message content or None"""
+    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    if not OPENAI_API_KEY:
+        logger.error("OPENAI_API_KEY not set")
+        return None
 
     try:
         async with httpx.AsyncClient(timeout=30.0) as client:
@@ -106,88 +139,360 @@ Rules:
                     "Authorization": f"Bearer {OPENAI_API_KEY}",
                     "Content-Type": "application/json"
                 },
-                json={
-                    "model": "gpt-4o-mini",
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    "temperature": 0.8,
-                    "max_tokens": 150
-                }
+                json={"model": "gpt-4o-mini", "temperature": 0.8, **payload}
             )
 
             if response.status_code == 200:
                 data = response.json()
-                reply = data['choices'][0]['message']['content'].strip()
-                return reply
-            else:
-                logger.error(f"OpenAI API error: {response.status_code} - {response.text}")
-                return "Thanks for your comment!"
+                return data['choices'][0]['message']['content'].strip()
+
+            logger.error(f"OpenAI API error: {response.status_code} - {response.text}")
+            return None
 
     except Exception as e:
         logger.error(f"Error generating AI reply: {e}")
-        return "Thanks for your comment!"
+        return None
+
+
+async def generate_ai_reply(comment_text: str, settings: Dict, context: Optional[str] = None) -> str:
+    """
+    Generate AI reply using OpenAI based on user settings
+
+    Args:
+        comment_text: The comment to reply to
+        settings: User's auto-reply settings (tone, length, custom_instructions)
+        context: Optional post context
+
+    Returns:
+        Generated reply text (FALLBACK_REPLY if generation failed)
+    """
+    user_prompt = f"Reply to this comment: \"{comment_text}\""
+    if context:
+        user_prompt += f"\n\nPost context: {context}"
+
+    reply = await _chat_completion({
+        "messages": [
+            {"role": "system", "content": _reply_system_prompt(settings)},
+            {"role": "user", "content": user_prompt}
+        ],
+        "max_tokens": 150
+    })
+    return reply or FALLBACK_REPLY
+
+
+async def _generate_reply_batch(texts: List[str], settings: Dict) -> List[Optional[str]]:
+    """
+    One structured OpenAI call for several comments
+
+    Returns:
+        A reply per text, in order (None where the model skipped one or the call failed)
+    """
+    system_prompt = _reply_system_prompt(settings) + """
+You will receive a JSON object {"comments": [{"id": ..., "text": ...}]}.
+Write one independent reply per comment and answer ONLY with JSON:
+{"replies": [{"id": <same id>, "reply": <reply text>}]}
+"""
+    content = await _chat_completion({
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": json.dumps({
+                "comments": [{"id": str(i), "text": text} for i, text in enumerate(texts)]
+            })}
+        ],
+        "response_format": {"type": "json_object"},
+        "max_tokens": 150 * len(texts)
+    })
+    if not content:
+        return [None] * len(texts)
+
+    try:
+        replies = {
+            str(item['id']): item['reply'].strip()
+            for item in json.loads(content).get('replies', [])
+            if isinstance(item, dict) and item.get('reply')
+        }
+    except (json.JSONDecodeError, ValueError, TypeError, AttributeError) as e:
+        logger.error(f"Unparseable batch reply from OpenAI: {e}")
+        return [None] * len(texts)
+
+    return [replies.get(str(i)) for i in range(len(texts))]
+
+
+_reply_cache = OrderedDict()
+
+
+def _reply_cache_key(text: str, settings: Dict) -> Optional[tuple]:
+    """
+    Key for near-duplicate comments, or None if the comment is too long to share a reply
+
+    Case, punctuation and repeated whitespace are ignored, so "Love this!!"
+    and "love this" share a reply. Emoji-only comments key on the emoji.
+    Replies are only shared within one user's account, never across tenants.
+    """
+    normalized = " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split()) or text.strip()
+    if not normalized or len(normalized.split()) > REPLY_CACHE_MAX_WORDS:
+        return None
+    return (
+        settings['user_id'],
+        settings.get('reply_tone'),
+        settings.get('reply_length'),
+        settings.get('custom_instructions'),
+        normalized,
+    )
+
+
+def _cached_reply(key) -> Optional[str]:
+    entry = _reply_cache.get(key)
+    if entry is None:
+        return None
+    reply, stored_at = entry
+    if time.monotonic() - stored_at > REPLY_CACHE_TTL_SECONDS:
+        del _reply_cache[key]
+        return None
+    _reply_cache.move_to_end(key)
+    return reply
+
+
+def _cache_reply(key, reply: str):
+    _reply_cache[key] = (reply, time.monotonic())
+    _reply_cache.move_to_end(key)
+    while len(_reply_cache) > REPLY_CACHE_SIZE:
+        _reply_cache.popitem(last=False)
+
+
+async def generate_ai_replies(comments: List[Dict], settings: Dict) -> Dict[str, str]:
+    """
+    Replies for several comments at once
+
+    Near-duplicates are answered once (and cached across runs), the rest go
+    out in concurrent batches of REPLY_BATCH_SIZE. Comments a batch leaves
+    unanswered fall back to generate_ai_reply() one at a time.
+
+    Returns:
+        comment id -> reply text
+    """
+    replies = {}
+    # Distinct texts still needing a reply -> comments sharing it
+    pending = OrderedDict()
+
+    for comment in comments:
+        key = _reply_cache_key(comment['text'], settings) or ("unique", comment['id'])
+        cached = _cached_reply(key)
+        if cached:
+            replies[comment['id']] = cached
+        else:
+            pending.setdefault(key, {'text': comment['text'], 'ids': []})['ids'].append(comment['id'])
+
+    if not pending:
+        return replies
+
+    keys = list(pending)
+    semaphore = asyncio.Semaphore(REPLY_BATCH_CONCURRENCY)
+
+    async def run_batch(batch_keys):
+        async with semaphore:
+            texts = [pending[key]['text'] for key in batch_keys]
+            if len(texts) == 1:
+                return [await generate_ai_reply(texts[0], settings)]
+            return await _generate_reply_batch(texts, settings)
+
+    batches = [keys[i:i + REPLY_BATCH_SIZE] for i in range(0, len(keys), REPLY_BATCH_SIZE)]
+    results = await asyncio.gather(*(run_batch(batch) for batch in batches))
+
+    generated = dict(zip(keys, (reply for batch in results for reply in batch)))
+
+    async def single(key):
+        async with semaphore:
+            generated[key] = await generate_ai_reply(pending[key]['text'], settings)
+
+    missing = [key for key, reply in generated.items() if not reply]
+    if missing:
+        logger.warning(f"⚠️ {len(missing)} comment(s) missing from batched replies - generating one by one")
+        await asyncio.gather(*(single(key) for key in missing))
+
+    for key, reply in generated.items():
+        if key[0] != "unique" and reply != FALLBACK_REPLY:
+            _cache_reply(key, reply)
+        for comment_id in pending[key]['ids']:
+            replies[comment_id] = reply
+
+    return replies
 
 
 # ============================================================================
 # COMMENT FETCHING
 # ============================================================================
 
-async def fetch_instagram_comments(access_token: str, since: datetime) -> List[Dict]:
-    """Fetch recent Instagram comments"""
+def _as_utc(value: datetime) -> datetime:
+    """Graph API timestamps are tz-aware; last_check_at / utcnow() may not be"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _parse_graph_time(value: str) -> datetime:
+    # Instagram: 2024-01-01T12:00:00+0000, Facebook: same - fromisoformat needs +00:00
+    value = value.replace('Z', '+00:00')
+    if len(value) > 5 and value[-5] in '+-' and value[-3] != ':':
+        value = f"{value[:-2]}:{value[-2:]}"
+    return datetime.fromisoformat(value)
+
+
+async def _graph_batch(client: httpx.AsyncClient, access_token: str, relative_urls: List[str]) -> List[Optional[Dict]]:
+    """
+    Run GET requests as Graph API batch calls (GRAPH_BATCH_LIMIT per HTTP request)
+
+    Returns:
+        Parsed response bodies in request order (None for failed requests)
+    """
+    results = []
+    for start in range(0, len(relative_urls), GRAPH_BATCH_LIMIT):
+        chunk = relative_urls[start:start + GRAPH_BATCH_LIMIT]
+        response = await client.post(
+            GRAPH_API_URL,
+            data={
+                "access_token": access_token,
+                "include_headers": "false",
+                "batch": json.dumps([{"method": "GET", "relative_url": url} for url in chunk])
+            }
+        )
+
+        if response.status_code != 200:
+            logger.error(f"Graph API batch error: {response.status_code} - {response.text}")
+            results.extend([None] * len(chunk))
+            continue
+
+        for item in response.json():
+            if item and item.get('code') == 200:
+                results.append(json.loads(item['body']))
+            else:
+                results.append(None)
+
+    return results
+
+
+async def _fetch_recent_comments(
+    client: httpx.AsyncClient,
+    access_token: str,
+    root_path: str,
+    item_fields: str,
+    comment_fields: str,
+    since: datetime,
+    parse_comment,
+    comment_order: Optional[str] = None,
+    cursors: Optional[Dict[str, datetime]] = None,
+) -> List[Dict]:
+    """
+    Comments on the latest posts via nested field expansion
+
+    One request returns the last RECENT_POSTS_PER_USER posts with their first
+    COMMENTS_PAGE_SIZE comments embedded. Posts with more comments are paged
+    together in Graph API batch requests, up to MAX_COMMENT_PAGES pages each.
+
+    Args:
+        root_path: Edge listing the posts (e.g. "me/media", "{page_id}/feed")
+        item_fields / comment_fields: Fields requested for posts / comments
+        parse_comment: (comment, post_id) -> comment dict for the monitor
+        since: Start for posts with no cursor yet (see _new_post_since())
+        comment_order: Comments edge order; with "reverse_chronological" paging
+            stops at the first comment older than `since`
+        cursors: post_id -> high-water mark; replaces `since` for posts seen
+            before. Comments AT the mark (or at `since`) are returned again
+            (seen_comments filters the ones already handled), so same-second
+            comments are never lost.
+    """
+    since = _as_utc(since)
+    cursors = cursors or {}
+    newest_first = comment_order == "reverse_chronological"
+    order_modifier = f".order({comment_order})" if comment_order else ""
+    # Later pages: the `after` cursor is opaque base64 (+, /, =) and must be escaped
+    page_params = {"fields": comment_fields, "limit": COMMENTS_PAGE_SIZE}
+    if comment_order:
+        page_params["order"] = comment_order
     comments = []
+
+    response = await client.get(
+        f"{GRAPH_API_URL}/{root_path}",
+        params={
+            "access_token": access_token,
+            "fields": f"{item_fields},comments{order_modifier}.limit({COMMENTS_PAGE_SIZE}){{{comment_fields}}}",
+            "limit": RECENT_POSTS_PER_USER
+        }
+    )
+
+    if response.status_code != 200:
+        logger.error(f"Graph API error for {root_path}: {response.status_code} - {response.text}")
+        return comments
+
+    def collect(post_id, page) -> Optional[str]:
+        """Keep new comments from one page; returns the cursor of the next page worth fetching"""
+        reached_old = False
+        cursor = cursors.get(post_id)
+        for comment in page.get('data', []):
+            created = _parse_graph_time(comment.get('timestamp') or comment['created_time'])
+            is_new = created >= (cursor or since)
+            if is_new:
+                comments.append(parse_comment(comment, post_id))
+            elif newest_first:
+                reached_old = True
+
+        paging = page.get('paging', {})
+        if reached_old or not paging.get('next'):
+            return None
+        return paging.get('cursors', {}).get('after')
+
+    # post_id -> cursor for its next page of comments
+    pending = {}
+    for post in response.json().get('data', []):
+        after = collect(post['id'], post.get('comments', {}))
+        if after:
+            pending[post['id']] = after
+
+    for _ in range(MAX_COMMENT_PAGES - 1):
+        if not pending:
+            break
+
+        post_ids = list(pending)
+        pages = await _graph_batch(client, access_token, [
+            f"{post_id}/comments?{urlencode({**page_params, 'after': pending[post_id]}, safe=',')}"
+            for post_id in post_ids
+        ])
+
+        pending = {}
+        for post_id, page in zip(post_ids, pages):
+            after = collect(post_id, page) if page else None
+            if after:
+                pending[post_id] = after
+
+    return comments
+
+
+async def fetch_instagram_comments(access_token: str, since: datetime,
+                                   cursors: Optional[Dict[str, datetime]] = None) -> List[Dict]:
+    """Fetch recent Instagram comments (one request for the last 10 posts and their comments)"""
+    def parse(comment, media_id):
+        return {
+            'id': comment['id'],
+            'platform': 'instagram',
+            'post_id': media_id,
+            'author': comment.get('username', 'Unknown'),
+            'text': comment.get('text', ''),
+            'timestamp': comment['timestamp'],
+            'sentiment': analyze_sentiment(comment.get('text', ''))
+        }
+
     try:
         async with httpx.AsyncClient(timeout=30.0) as client:
-            # Get recent media
-            media_response = await client.get(
-                f"https://graph.facebook.com/v18.0/me/media",
-                params={
-                    "access_token": access_token,
-                    "fields": "id,caption,timestamp",
-                    "limit": 10  # Last 10 posts
-                }
+            return await _fetch_recent_comments(
+                client, access_token, "me/media",
+                item_fields="id,caption,timestamp",
+                comment_fields="id,username,text,timestamp",
+                since=since,
+                parse_comment=parse,
+                cursors=cursors,
             )
 
-            if media_response.status_code != 200:
-                return comments
-
-            media_data = media_response.json()
-
-            for media in media_data.get('data', []):
-                media_id = media['id']
-
-                # Get comments for this media
-                comments_response = await client.get(
-                    f"https://graph.facebook.com/v18.0/{media_id}/comments",
-                    params={
-                        "access_token": access_token,
-                        "fields": "id,username,text,timestamp",
-                        "limit": 50
-                    }
-                )
-
-                if comments_response.status_code == 200:
-                    comment_data = comments_response.json()
-
-                    for comment in comment_data.get('data', []):
-                        comment_time = datetime.fromisoformat(comment['timestamp'].replace('Z', '+00:00'))
-
-                        if comment_time > since:
-                            comments.append({
-                                'id': comment['id'],
-                                'platform': 'instagram',
-                                'post_id': media_id,
-                                'author': comment.get('username', 'Unknown'),
-                                'text': comment.get('text', ''),
-                                'timestamp': comment['timestamp'],
-                                'sentiment': analyze_sentiment(comment.get('text', ''))
-                            })
-
     except Exception as e:
         logger.error(f"Error fetching Instagram comments: {e}")
-
-    return comments
+        return []
 
 
 async def fetch_twitter_mentions(access_token: str, api_key: str, api_secret: str, access_token_secret: str, since: datetime) -> List[Dict]:
@@ -197,61 +502,36 @@ async def fetch_twitter_mentions(access_token: str, api_key: str, api_secret: st
     return []
 
 
-async def fetch_facebook_comments(page_access_token: str, page_id: str, since: datetime) -> List[Dict]:
-    """Fetch recent Facebook Page comments"""
-    comments = []
+async def fetch_facebook_comments(page_access_token: str, page_id: str, since: datetime,
+                                  cursors: Optional[Dict[str, datetime]] = None) -> List[Dict]:
+    """Fetch recent Facebook Page comments (one request for the last 10 posts and their comments)"""
+    def parse(comment, post_id):
+        return {
+            'id': comment['id'],
+            'platform': 'facebook',
+            'post_id': post_id,
+            'author': comment.get('from', {}).get('name', 'Unknown'),
+            'author_id': comment.get('from', {}).get('id', ''),
+            'text': comment.get('message', ''),
+            'timestamp': comment['created_time'],
+            'sentiment': analyze_sentiment(comment.get('message', ''))
+        }
+
     try:
         async with httpx.AsyncClient(timeout=30.0) as client:
-            # Get recent posts
-            posts_response = await client.get(
-                f"https://graph.facebook.com/v18.0/{page_id}/feed",
-                params={
-                    "access_token": page_access_token,
-                    "fields": "id,message,created_time",
-                    "limit": 10
-                }
+            return await _fetch_recent_comments(
+                client, page_access_token, f"{page_id}/feed",
+                item_fields="id,message,created_time",
+                comment_fields="id,from,message,created_time",
+                since=since,
+                parse_comment=parse,
+                comment_order="reverse_chronological",
+                cursors=cursors,
             )
 
-            if posts_response.status_code != 200:
-                return comments
-
-            posts_data = posts_response.json()
-
-            for post in posts_data.get('data', []):
-                post_id = post['id']
-
-                # Get comments for this post
-                comments_response = await client.get(
-                    f"https://graph.facebook.com/v18.0/{post_id}/comments",
-                    params={
-                        "access_token": page_access_token,
-                        "fields": "id,from,message,created_time",
-                        "limit": 50
-                    }
-                )
-
-                if comments_response.status_code == 200:
-                    comment_data = comments_response.json()
-
-                    for comment in comment_data.get('data', []):
-                        comment_time = datetime.fromisoformat(comment['created_time'].replace('Z', '+00:00'))
-
-                        if comment_time > since:
-                            comments.append({
-                                'id': comment['id'],
-                                'platform': 'facebook',
-                                'post_id': post_id,
-                                'author': comment.get('from', {}).get('name', 'Unknown'),
-                                'author_id': comment.get('from', {}).get('id', ''),
-                                'text': comment.get('message', ''),
-                                'timestamp': comment['created_time'],
-                                'sentiment': analyze_sentiment(comment.get('message', ''))
-                            })
-
     except Exception as e:
         logger.error(f"Error fetching Facebook comments: {e}")
-
-    return comments
+        return []
 
 
 # ============================================================================
@@ -307,26 +587,12 @@ async def post_facebook_reply(comment_id: str, reply_text: str, page_access_toke
 
 
 # ============================================================================
-# MAIN MONITOR FUNCTION
+# DATABASE (short worker-pool checkouts, run off the event loop)
 # ============================================================================
 
-def monitor_and_reply_to_comments():
-    """
-    Main function called by APScheduler every 15 minutes
-    Checks for new comments and auto-replies based on user settings
-    """
-    DATABASE_URL = os.getenv("DATABASE_URL")
-    if not DATABASE_URL:
-        logger.error("DATABASE_URL not set")
-        return
-
-    logger.info("🔍 Starting comment monitor check...")
-
-    try:
-        conn = psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
+def _load_auto_reply_users() -> List[Dict]:
+    with get_worker_db_connection() as conn:
         cursor = conn.cursor()
-
-        # Get all users with auto-reply enabled
         cursor.execute("""
             SELECT
                 ars.id as settings_id,
@@ -347,24 +613,298 @@ def monitor_and_reply_to_comments():
             FROM auto_reply_settings ars
             WHERE ars.enabled = true
         """)
+        users = cursor.fetchall()
+        cursor.close()
+        return users
+
+
+def _load_user_sync_state(user_id, platforms: List[str]):
+    """
+    Credentials and comment cursors for one user, in one checkout
+
+    Returns:
+        (credentials, cursors): credentials[platform] = {'access_token', 'metadata'},
+        cursors[platform][post_id] = last_comment_at
+    """
+    with get_worker_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT DISTINCT ON (service_type) service_type, access_token, service_metadata
+            FROM connected_services
+            WHERE user_id = %s AND service_type = ANY(%s) AND is_active = true
+            ORDER BY service_type, connected_at DESC
+        """, (user_id, list(platforms)))
+        rows = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT platform, post_id, last_comment_at
+            FROM comment_sync_cursors
+            WHERE user_id = %s AND platform = ANY(%s)
+        """, (user_id, list(platforms)))
+        cursor_rows = cursor.fetchall()
+        cursor.close()
+
+    credentials = {}
+    for row in rows:
+        metadata = row.get('service_metadata') or {}
+        if isinstance(metadata, str):
+            try:
+                metadata = json.loads(metadata)
+            except (json.JSONDecodeError, ValueError, TypeError):
+                metadata = {}
+        credentials[row['service_type']] = {'access_token': row['access_token'], 'metadata': metadata}
+
+    cursors = {}
+    for row in cursor_rows:
+        cursors.setdefault(row['platform'], {})[row['post_id']] = row['last_comment_at']
+
+    return credentials, cursors
+
+
+def _drop_seen_comments(user_id, comments: List[Dict]) -> List[Dict]:
+    """
+    Comments not yet handled by an earlier run (indexed lookups, no API calls)
+
+    Each returned comment gets 'reply_attempts': replies that already failed.
+    """
+    if not comments:
+        return []
+
+    comment_ids = [comment['id'] for comment in comments]
+    with get_worker_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT platform, comment_id
+            FROM seen_comments
+            WHERE user_id = %s AND comment_id = ANY(%s)
+        """, (user_id, comment_ids))
+        seen = {(row['platform'], row['comment_id']) for row in cursor.fetchall()}
+
+        cursor.execute("""
+            SELECT platform, comment_id, attempts
+            FROM comment_reply_attempts
+            WHERE user_id = %s AND comment_id = ANY(%s)
+        """, (user_id, comment_ids))
+        attempts = {(row['platform'], row['comment_id']): row['attempts'] for row in cursor.fetchall()}
+        cursor.close()
+
+    new_comments = []
+    for comment in comments:
+        key = (comment['platform'], comment['id'])
+        if key not in seen:
+            comment['reply_attempts'] = attempts.get(key, 0)
+            new_comments.append(comment)
+    return new_comments
+
+
+def _new_post_since(platform_cursors: Dict[str, datetime], first_run_since: datetime) -> datetime:
+    """
+    Where to start on posts that have no cursor yet
+
+    Anchored to the newest cursor on the platform - a comment timestamp from
+    the platform's own clock - minus NEW_POST_LOOKBACK_MINUTES, so comments
+    posted while the previous run was going, or indexed late, are not
+    skipped. `first_run_since` (our clock) is only used before the user has
+    any cursor on the platform.
+    """
+    baseline = max(platform_cursors.values()) if platform_cursors else first_run_since
+    return _as_utc(baseline) - timedelta(minutes=NEW_POST_LOOKBACK_MINUTES)
+
+
+def advance_cursors(fetched: List[Dict], unhandled: List[Dict]) -> Dict[tuple, datetime]:
+    """
+    New high-water mark per (platform, post_id)
+
+    The newest fetched comment, unless a comment on that post is still
+    unanswered (rate limit, failed reply) - then the mark stays at the oldest
+    unanswered one so the next run fetches it again.
+    """
+    marks = {}
+    for comment in fetched:
+        key = (comment['platform'], comment['post_id'])
+        created = _parse_graph_time(comment['timestamp'])
+        marks[key] = max(marks.get(key, created), created)
+
+    held_back = {}
+    for comment in unhandled:
+        key = (comment['platform'], comment['post_id'])
+        created = _parse_graph_time(comment['timestamp'])
+        held_back[key] = min(held_back.get(key, created), created)
+
+    marks.update(held_back)
+    return marks
+
+
+def _save_sync_state(user_id, marks: Dict[tuple, datetime], handled: List[tuple], failed: List[Dict] = ()):
+    """
+    Persist cursors, handled comment IDs, failed attempts and last_check_at in one transaction
+
+    Args:
+        marks: advance_cursors() output
+        handled: (comment, replied) for every comment this run finished with
+        failed: Comments whose reply failed and will be retried
+    """
+    with get_worker_db_connection() as conn:
+        cursor = conn.cursor()
+
+        if marks:
+            execute_values(cursor, """
+                INSERT INTO comment_sync_cursors (user_id, platform, post_id, last_comment_at)
+                VALUES %s
+                ON CONFLICT (user_id, platform, post_id)
+                DO UPDATE SET last_comment_at = EXCLUDED.last_comment_at, updated_at = NOW()
+            """, [(user_id, platform, post_id, mark) for (platform, post_id), mark in marks.items()])
+
+        if handled:
+            execute_values(cursor, """
+                INSERT INTO seen_comments (user_id, platform, comment_id, replied, post_id, comment_created_at)
+                VALUES %s
+                ON CONFLICT (user_id, platform, comment_id) DO NOTHING
+            """, [
+                (user_id, comment['platform'], comment['id'], replied,
+                 comment['post_id'], _parse_graph_time(comment['timestamp']))
+                for comment, replied in handled
+            ])
+
+            retried = [comment['id'] for comment, _ in handled if comment.get('reply_attempts')]
+            if retried:
+                cursor.execute("""
+                    DELETE FROM comment_reply_attempts
+                    WHERE user_id = %s AND comment_id = ANY(%s)
+                """, (user_id, retried))
+
+        if failed:
+            execute_values(cursor, """
+                INSERT INTO comment_reply_attempts (user_id, platform, comment_id, attempts)
+                VALUES %s
+                ON CONFLICT (user_id, platform, comment_id)
+                DO UPDATE SET attempts = EXCLUDED.attempts, updated_at = NOW()
+            """, [(user_id, comment['platform'], comment['id'], comment['reply_attempts']) for comment in failed])
+
+        cursor.execute("""
+            UPDATE auto_reply_settings
+            SET last_check_at = NOW()
+            WHERE user_id = %s
+        """, (user_id,))
+        conn.commit()
+        cursor.close()
 
-        users_with_auto_reply = cursor.fetchall()
-        logger.info(f"Found {len(users_with_auto_reply)} users with auto-reply enabled")
 
-        for user_settings in users_with_auto_reply:
-            asyncio.run(process_user_auto_replies(user_settings, cursor, conn))
+def _prune_sync_state():
+    """
+    Drop seen IDs, attempt counts and cursors (posts that left the recent window) past retention
 
+    A seen row at or after its post's cursor is kept however old it is: the
+    next fetch returns that comment again and only the row stops a second reply.
+    """
+    with get_worker_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            DELETE FROM seen_comments seen
+            WHERE seen.handled_at < NOW() - make_interval(days => %s)
+            AND NOT EXISTS (
+                SELECT 1 FROM comment_sync_cursors sync
+                WHERE sync.user_id = seen.user_id
+                AND sync.platform = seen.platform
+                AND sync.post_id = seen.post_id
+                AND sync.last_comment_at <= seen.comment_created_at
+            )
+        """, (SEEN_COMMENT_RETENTION_DAYS,))
+        cursor.execute(
+            "DELETE FROM comment_reply_attempts WHERE updated_at < NOW() - make_interval(days => %s)",
+            (SEEN_COMMENT_RETENTION_DAYS,)
+        )
+        cursor.execute(
+            "DELETE FROM comment_sync_cursors WHERE updated_at < NOW() - make_interval(days => %s)",
+            (SEEN_COMMENT_RETENTION_DAYS,)
+        )
+        conn.commit()
         cursor.close()
-        conn.close()
 
-        logger.info("✅ Comment monitor check complete")
+
+# ============================================================================
+# MAIN MONITOR FUNCTION
+# ============================================================================
+
+def monitor_and_reply_to_comments():
+    """
+    Main function called by APScheduler every 15 minutes
+    Checks for new comments and auto-replies based on user settings
+
+    All users are processed on one event loop, COMMENT_MONITOR_CONCURRENCY
+    at a time, and the tick's duration is reported against its interval.
+
+    Returns:
+        dict: users, failed, replies_sent, elapsed_seconds, interval_seconds
+    """
+    if not os.getenv("DATABASE_URL"):
+        logger.error("DATABASE_URL not set")
+        return
+
+    logger.info("🔍 Starting comment monitor check...")
+    started = time.monotonic()
+    interval_seconds = MONITOR_INTERVAL_MINUTES * 60
+
+    try:
+        _prune_sync_state()
+        users_with_auto_reply = _load_auto_reply_users()
+        logger.info(f"Found {len(users_with_auto_reply)} users with auto-reply enabled")
+
+        results = asyncio.run(process_all_users(users_with_auto_reply))
+
+        elapsed = time.monotonic() - started
+        summary = {
+            'users': len(results),
+            'failed': sum(1 for replies in results if replies is None),
+            'replies_sent': sum(replies for replies in results if replies),
+            'elapsed_seconds': round(elapsed, 1),
+            'interval_seconds': interval_seconds,
+            'finished_at': datetime.utcnow().isoformat(),
+        }
+        last_run.clear()
+        last_run.update(summary)
+
+        usage = f"{elapsed:.1f}s of its {interval_seconds}s interval ({elapsed / interval_seconds:.0%})"
+        if elapsed > interval_seconds:
+            logger.warning(f"⚠️ Comment monitor overran: {usage} - raise COMMENT_MONITOR_CONCURRENCY")
+        logger.info(
+            f"✅ Comment monitor check complete: {summary['users']} users, "
+            f"{summary['replies_sent']} replies, {summary['failed']} failed, {usage}"
+        )
+        return summary
 
     except Exception as e:
         logger.error(f"Error in comment monitor: {e}")
 
 
-async def process_user_auto_replies(user_settings: Dict, cursor, conn):
-    """Process auto-replies for a single user"""
+async def process_all_users(users: List[Dict], concurrency: int = COMMENT_MONITOR_CONCURRENCY) -> List[Optional[int]]:
+    """
+    Process every user concurrently, at most `concurrency` at a time
+
+    Returns:
+        Replies sent per user (None where that user's run failed)
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def process_one(user_settings):
+        async with semaphore:
+            try:
+                return await process_user_auto_replies(user_settings)
+            except Exception as e:
+                # One user's bad token or data must not stop everyone else's replies
+                logger.error(f"Error processing auto-replies for user {user_settings['user_id']}: {e}")
+                return None
+
+    return await asyncio.gather(*(process_one(user_settings) for user_settings in users))
+
+
+async def process_user_auto_replies(user_settings: Dict) -> int:
+    """
+    Process auto-replies for a single user
+
+    Returns:
+        Number of replies sent
+    """
     user_id = user_settings['user_id']
     platforms = user_settings.get('platforms', [])
 
@@ -377,59 +917,60 @@ async def process_user_auto_replies(user_settings: Dict, cursor, conn):
 
     logger.info(f"Processing auto-replies for user {user_id}, platforms: {platforms}")
 
-    # Determine since when to check for comments
+    # Start for a platform's new posts until it has cursors (see _new_post_since)
     last_check = user_settings.get('last_check_at')
     if last_check:
-        since = last_check
+        first_run_since = last_check
     else:
-        since = datetime.utcnow() - timedelta(minutes=user_settings['min_reply_interval_minutes'])
+        first_run_since = datetime.utcnow() - timedelta(minutes=user_settings['min_reply_interval_minutes'])
+
+    # One lookup for every platform, reused for fetching and replying
+    credentials_by_platform, cursors = await run_in_worker_pool(_load_user_sync_state, user_id, platforms or [])
 
     all_comments = []
 
     # Fetch comments from each enabled platform
     for platform in platforms:
-        # Get user's OAuth credentials for this platform
-        cursor.execute("""
-            SELECT access_token, service_metadata
-            FROM connected_services
-            WHERE user_id = %s AND service_type = %s AND is_active = true
-            LIMIT 1
-        """, (user_id, platform))
-
-        credentials = cursor.fetchone()
+        credentials = credentials_by_platform.get(platform)
 
         if not credentials:
             logger.warning(f"No credentials for {platform} for user {user_id}")
             continue
 
         access_token = credentials['access_token']
-        metadata = credentials.get('service_metadata', {})
-        if isinstance(metadata, str):
-            try:
-                metadata = json.loads(metadata)
-            except (json.JSONDecodeError, ValueError, TypeError):
-                metadata = {}
+        metadata = credentials['metadata']
+        platform_cursors = cursors.get(platform) or {}
+        since = _new_post_since(platform_cursors, first_run_since)
 
         # Fetch comments based on platform
         if platform == 'instagram':
-            comments = await fetch_instagram_comments(access_token, since)
+            comments = await fetch_instagram_comments(access_token, since, platform_cursors)
             all_comments.extend(comments)
 
         elif platform == 'facebook':
             page_access_token = metadata.get('page_access_token')
             page_id = metadata.get('selected_page_id')
             if page_access_token and page_id:
-                comments = await fetch_facebook_comments(page_access_token, page_id, since)
+                comments = await fetch_facebook_comments(page_access_token, page_id, since, platform_cursors)
                 all_comments.extend(comments)
 
         # Note: Twitter/other platforms can be added here
 
-    logger.info(f"Found {len(all_comments)} new comments for user {user_id}")
+    # Oldest first, so a run cut short by the rate limit leaves a clean cursor
+    new_comments = await run_in_worker_pool(_drop_seen_comments, user_id, all_comments)
+    new_comments.sort(key=lambda comment: _parse_graph_time(comment['timestamp']))
+
+    logger.info(f"Found {len(new_comments)} new comments for user {user_id}")
 
     # Filter comments based on user settings and generate replies
     replies_sent = 0
+    handled = []    # (comment, replied) - never looked at again
+    unhandled = []  # picked up again next run
+    failed = []     # reply failed - attempt counted, retried next run
 
-    for comment in all_comments:
+    to_reply = []
+
+    for index, comment in enumerate(new_comments):
         sentiment = comment['sentiment']
 
         # Check if we should reply based on sentiment filters
@@ -448,60 +989,58 @@ async def process_user_auto_replies(user_settings: Dict, cursor, conn):
             should_reply = True
 
         if not should_reply:
+            handled.append((comment, False))
             continue
 
         # Check rate limit
-        if replies_sent >= user_settings['max_replies_per_hour']:
+        if len(to_reply) >= user_settings['max_replies_per_hour']:
             logger.info(f"Rate limit reached for user {user_id}")
+            unhandled.extend(new_comments[index:])
             break
 
-        # Generate AI reply
-        reply_text = await generate_ai_reply(
-            comment['text'],
-            {
-                'reply_tone': user_settings['reply_tone'],
-                'reply_length': user_settings['reply_length'],
-                'custom_instructions': user_settings['custom_instructions']
-            }
-        )
+        to_reply.append(comment)
+
+    # Generate AI replies (batched, near-duplicates answered once)
+    reply_texts = await generate_ai_replies(to_reply, {
+        'user_id': user_id,
+        'reply_tone': user_settings['reply_tone'],
+        'reply_length': user_settings['reply_length'],
+        'custom_instructions': user_settings['custom_instructions']
+    })
+
+    for comment in to_reply:
+        reply_text = reply_texts[comment['id']]
 
         # Post reply
         success = False
-        if comment['platform'] == 'instagram':
-            cursor.execute("""
-                SELECT access_token
-                FROM connected_services
-                WHERE user_id = %s AND service_type = 'instagram' AND is_active = true
-                LIMIT 1
-            """, (user_id,))
-            creds = cursor.fetchone()
-            if creds:
-                success = await post_instagram_reply(comment['id'], reply_text, creds['access_token'])
-
-        elif comment['platform'] == 'facebook':
-            cursor.execute("""
-                SELECT service_metadata
-                FROM connected_services
-                WHERE user_id = %s AND service_type = 'facebook' AND is_active = true
-                LIMIT 1
-            """, (user_id,))
-            creds = cursor.fetchone()
-            if creds:
-                metadata = json.loads(creds['service_metadata']) if isinstance(creds['service_metadata'], str) else creds['service_metadata']
-                page_token = metadata.get('page_access_token')
-                if page_token:
-                    success = await post_facebook_reply(comment['id'], reply_text, page_token)
+        creds = credentials_by_platform.get(comment['platform'])
+        if comment['platform'] == 'instagram' and creds:
+            success = await post_instagram_reply(comment['id'], reply_text, creds['access_token'])
+
+        elif comment['platform'] == 'facebook' and creds:
+            page_token = creds['metadata'].get('page_access_token')
+            if page_token:
+                success = await post_facebook_reply(comment['id'], reply_text, page_token)
 
         if success:
             replies_sent += 1
+            handled.append((comment, True))
             logger.info(f"✅ Auto-replied to {comment['platform']} comment by {comment['author']}")
+            continue
+
+        comment['reply_attempts'] = comment.get('reply_attempts', 0) + 1
+        if comment['reply_attempts'] >= MAX_REPLY_ATTEMPTS:
+            logger.warning(
+                f"⚠️ Giving up on {comment['platform']} comment {comment['id']} "
+                f"after {comment['reply_attempts']} failed replies"
+            )
+            handled.append((comment, False))
+        else:
+            failed.append(comment)
+            unhandled.append(comment)
 
-    # Update last_check_at
-    cursor.execute("""
-        UPDATE auto_reply_settings
-        SET last_check_at = NOW()
-        WHERE user_id = %s
-    """, (user_id,))
-    conn.commit()
+    # Cursors, handled IDs, failed attempts and last_check_at
+    await run_in_worker_pool(_save_sync_state, user_id, advance_cursors(all_comments, unhandled), handled, failed)
 
     logger.info(f"Sent {replies_sent} auto-replies for user {user_id}")
+    return replies_sent
@@ -0,0 +1,266 @@
+"""
+Scheduled post dispatcher - publishes posts the moment they fall due
+
+Instead of polling every minute, sleeps until the earliest scheduled_date,
+retry or expiring publishing lease, and wakes early when a calendar write
+sends a NOTIFY. Runs on the scheduler leader only.
+"""
+import logging
+import os
+import select
+from concurrent import futures
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Calendar writes NOTIFY this channel (see notify_schedule_changed)
+SCHEDULE_CHANNEL = "content_calendar_schedule"
+
+# Safety net: re-check at least this often even if no NOTIFY arrives
+MAX_SLEEP_SECONDS = float(os.getenv("SCHEDULER_DISPATCH_MAX_SLEEP_SECONDS", "3600"))
+
+# Pause before re-checking when a due post could not be claimed, or after an error
+RETRY_DELAY_SECONDS = 1.0
+ERROR_BACKOFF_SECONDS = 5.0
+
+# Claimed batches publishing at once (each on its own worker thread)
+MAX_CONCURRENT_BATCHES = int(os.getenv("SCHEDULER_DISPATCH_CONCURRENCY", "4"))
+
+# How long start() waits for a stopping loop before handing it the restart
+START_JOIN_TIMEOUT_SECONDS = 5.0
+
+# Wake slightly after the slot so scheduled_date <= NOW() holds for the claim
+WAKE_SLACK_SECONDS = 0.05
+
+
+def notify_schedule_changed(cursor, event_id=None):
+    """
+    Wake the dispatcher after a calendar write
+
+    Call inside the writing transaction: Postgres delivers the NOTIFY on
+    commit (and drops it on rollback), so the dispatcher never wakes before
+    the change is visible.
+    """
+    cursor.execute("SELECT pg_notify(%s, %s)", (SCHEDULE_CHANNEL, str(event_id or "")))
+
+
+def seconds_until_next_due(cursor):
+    """
+    Seconds until the next scheduled post, retry or expiring publishing lease
+
+    Returns:
+        Float (<= 0 if something is due now) or None when nothing is pending
+    """
+    cursor.execute("""
+        SELECT EXTRACT(EPOCH FROM LEAST(
+            (SELECT MIN(scheduled_date) FROM content_calendar WHERE status = 'scheduled'),
+            (SELECT MIN(lease_expires_at) FROM content_calendar WHERE status = 'publishing'),
+            (SELECT MIN(next_attempt_at) FROM content_calendar WHERE status = 'retrying')
+        ) - NOW())
+    """)
+    row = cursor.fetchone()
+    return float(row[0]) if row and row[0] is not None else None
+
+
+class PostDispatcher:
+    """
+    Background thread that claims scheduled posts exactly when they fall due
+
+    The LISTEN thread only claims; each claimed batch is published on a
+    worker thread, so a slow upload never delays the next due post.
+
+    Args:
+        connect: Returns a new psycopg2 connection (dedicated - LISTEN is
+            session state, so it cannot come from a pool)
+        claim: Claims due posts, returning a batch or None when nothing was
+            claimed (default: workers.post_scheduler.claim_scheduled_posts)
+        publish: Publishes a claimed batch
+            (default: workers.post_scheduler.publish_scheduled_batch)
+        max_sleep: Longest sleep without a NOTIFY
+        max_batches: Batches publishing at once; due posts wait for a free slot
+    """
+
+    def __init__(self, connect, claim=None, publish=None, max_sleep=MAX_SLEEP_SECONDS,
+                 max_batches=MAX_CONCURRENT_BATCHES):
+        self.connect = connect
+        self.claim = claim
+        self.publish = publish
+        self.max_sleep = max_sleep
+        self.max_batches = max_batches
+        self._conn = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._restart = False
+        self._slots = threading.BoundedSemaphore(max_batches)
+        self._executor = None
+        self._batches = set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def start(self):
+        if self.claim is None or self.publish is None:
+            from workers.post_scheduler import claim_scheduled_posts, publish_scheduled_batch
+            self.claim = self.claim or claim_scheduled_posts
+            self.publish = self.publish or publish_scheduled_batch
+
+        with self._lock:
+            if self.running:
+                return
+            previous = self._thread
+
+        if previous is not None:
+            # Previous loop is still exiting after stop(); it only ever waits
+            # on short slices, but never block re-election behind it
+            previous.join(START_JOIN_TIMEOUT_SECONDS)
+
+        with self._lock:
+            if self.running:
+                return
+            if self._thread is not None and self._thread.is_alive():
+                # Still exiting - it starts the new loop on its way out
+                self._restart = True
+                return
+            self._start_thread()
+
+    def _start_thread(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="post-dispatcher", daemon=True)
+        self._thread.start()
+        logger.info("📡 Post dispatcher started (LISTEN/NOTIFY)")
+
+    def stop(self, timeout=None):
+        """
+        Stop dispatching
+
+        Args:
+            timeout: Seconds to wait for in-flight publish batches (None waits,
+                0 returns immediately and lets them finish in the background)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._restart = False
+            self._stop.set()
+            thread = self._thread
+
+        if thread is not None:
+            thread.join(timeout)
+            with self._lock:
+                if self._thread is thread and not thread.is_alive():
+                    self._thread = None
+
+        remaining = None if deadline is None else max(0, deadline - time.monotonic())
+        futures.wait(self._batches.copy(), timeout=remaining)
+        logger.info("🛑 Post dispatcher stopped")
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._step()
+            except Exception as e:
+                logger.error(f"❌ Post dispatcher error: {e}")
+                self._close()
+                self._stop.wait(ERROR_BACKOFF_SECONDS)
+        self._close()
+
+        with self._lock:
+            # start() was called while this loop was still exiting
+            if self._restart:
+                self._restart = False
+                self._start_thread()
+
+    def _step(self):
+        """Claim whatever is due, otherwise sleep until the next slot or a NOTIFY"""
+        self._listen()
+
+        cursor = self._conn.cursor()
+        try:
+            delay = seconds_until_next_due(cursor)
+        finally:
+            cursor.close()
+
+        if delay is not None and delay <= 0:
+            self._dispatch()
+            return
+
+        timeout = self.max_sleep if delay is None else min(delay + WAKE_SLACK_SECONDS, self.max_sleep)
+        self._wait(timeout)
+
+    def _dispatch(self):
+        """Claim a batch and hand it to a publish worker (waits for a free slot)"""
+        while not self._slots.acquire(timeout=1.0):
+            if self._stop.is_set():
+                return
+
+        try:
+            batch = self.claim()
+        except BaseException:
+            self._slots.release()
+            raise
+
+        if not batch:
+            self._slots.release()
+            # Due but nothing claimable (e.g. claim failed) - don't spin
+            self._stop.wait(RETRY_DELAY_SECONDS)
+            return
+
+        if self._executor is None:
+            self._executor = futures.ThreadPoolExecutor(
+                max_workers=self.max_batches, thread_name_prefix="post-publisher"
+            )
+        future = self._executor.submit(self._publish, batch)
+        self._batches.add(future)
+        future.add_done_callback(self._batches.discard)
+
+    def _publish(self, batch):
+        try:
+            self.publish(batch)
+        except Exception as e:
+            logger.error(f"❌ Post dispatcher publish error: {e}")
+        finally:
+            self._slots.release()
+
+    def _listen(self):
+        if self._conn is not None and not self._conn.closed:
+            return
+        self._conn = self.connect()
+        self._conn.autocommit = True
+        cursor = self._conn.cursor()
+        cursor.execute(f"LISTEN {SCHEDULE_CHANNEL}")
+        cursor.close()
+
+    def _wait(self, timeout):
+        """
+        Block until a NOTIFY arrives, the timeout passes or stop() is called
+
+        Returns:
+            True if woken by a NOTIFY
+        """
+        deadline = time.monotonic() + timeout
+        while not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+
+            # Short slices so stop() is noticed; waiting on the socket costs no queries
+            readable, _, _ = select.select([self._conn], [], [], min(remaining, 1.0))
+            if not readable:
+                continue
+
+            self._conn.poll()
+            if self._conn.notifies:
+                logger.debug(f"🔔 Calendar changed ({len(self._conn.notifies)} notification(s))")
+                self._conn.notifies.clear()
+                return True
+        return False
+
+    def _close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
@@ -1,160 +1,578 @@
 """
 Scheduled post worker - checks for due posts and publishes them
 """
-import psycopg2
 from datetime import datetime, timezone
+import asyncio
 import logging
 import json
 import os
+import random
+import re
+import socket
+import uuid
+from db_pool import get_worker_db_connection, run_in_worker_pool
+from http_clients import http_client_scope
+from utils.platforms import PLATFORM_ALIASES
+from workers.post_dispatcher import notify_schedule_changed
 
 logger = logging.getLogger(__name__)
 
+# Posts claimed per run
+CLAIM_BATCH_SIZE = int(os.getenv("SCHEDULER_CLAIM_BATCH_SIZE", "200"))
+
+# How long a claim lasts before the post is recovered for a retry.
+# Must comfortably exceed the slowest publish (video uploads).
+CLAIM_LEASE_SECONDS = int(os.getenv("SCHEDULER_CLAIM_LEASE_SECONDS", "900"))
+
+# Publishes in flight per run
+PUBLISH_CONCURRENCY = int(os.getenv("SCHEDULER_PUBLISH_CONCURRENCY", "20"))
+
+# Publishes in flight per platform - video platforms are slow and tightly rate limited
+PLATFORM_CONCURRENCY = {
+    "youtube": 2,
+    "tiktok": 2,
+    "instagram": 4,
+    "facebook": 4,
+    "linkedin": 4,
+}
+DEFAULT_PLATFORM_CONCURRENCY = int(os.getenv("SCHEDULER_PLATFORM_CONCURRENCY", "5"))
+
+# Publishes in flight per connected account (keeps a user's posts in schedule order)
+ACCOUNT_CONCURRENCY = int(os.getenv("SCHEDULER_ACCOUNT_CONCURRENCY", "1"))
+
+# Transient failures are retried with jittered exponential backoff; after
+# MAX_PUBLISH_ATTEMPTS the post is parked as 'dead_letter'
+MAX_PUBLISH_ATTEMPTS = int(os.getenv("SCHEDULER_MAX_PUBLISH_ATTEMPTS", "5"))
+RETRY_BASE_SECONDS = int(os.getenv("SCHEDULER_RETRY_BASE_SECONDS", "60"))
+RETRY_MAX_SECONDS = int(os.getenv("SCHEDULER_RETRY_MAX_SECONDS", "3600"))
+
+# Marking a post 'published' is retried on database errors, never the publish
+FINISH_MAX_RETRIES = 3
+FINISH_RETRY_BASE_SECONDS = 0.5
+
+# An HTTP status where publishers report one ("API error: 503",
+# "error (429): ...", "failed: 500 - ...", "HTTP 502", "Server error '503 ..."),
+# not any three-digit number in the text (IDs, byte counts, timestamps)
+_STATUS_FIELD = re.compile(r"\b(?:http|status(?: code)?|error|failed)\s*[:(']?\s*([1-5]\d\d)\b")
+
+# Status codes worth retrying: timeouts, rate limits and server errors
+RETRYABLE_STATUS_CODES = {408, 425, 429}
+
+# Publisher errors that need the user to fix something - retrying can't help
+PERMANENT_ERROR_MARKERS = (
+    "reconnect",
+    "require",
+    "not found",
+    "not supported",
+    "not selected",
+    "no active",
+    "incomplete",
+    "invalid",
+    "unauthorized",
+    "forbidden",
+    "permission",
+    "no oauth token",
+)
+
+
+def is_transient_error(error: str) -> bool:
+    """
+    Classify a publish error as transient (retry) or permanent (fail now)
 
-def check_scheduled_posts():
+    The HTTP status the publisher reported decides first (retryable codes
+    vs other 4xx), then known "fix your settings" messages are permanent. Anything unrecognised
+    (network errors, timeouts, unexpected exceptions) is treated as
+    transient - the attempt cap bounds the cost of guessing wrong.
+    """
+    error = (error or "").lower()
+
+    match = _STATUS_FIELD.search(error)
+    if match:
+        status_code = int(match.group(1))
+        if status_code in RETRYABLE_STATUS_CODES or status_code >= 500:
+            return True
+        if status_code >= 400:
+            return False
+    return not any(marker in error for marker in PERMANENT_ERROR_MARKERS)
+
+
+def retry_delay(attempts: int) -> float:
+    """
+    Seconds to wait before the next attempt ("equal jitter" backoff)
+
+    Doubles from RETRY_BASE_SECONDS per attempt up to RETRY_MAX_SECONDS;
+    half of it is randomised so posts that failed together (e.g. during a
+    platform outage) don't all retry at the same instant.
+    """
+    delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def recover_expired_claims(cursor) -> int:
+    """
+    Hand posts whose publishing lease ran out back for an immediate retry
+
+    A lease only expires if the worker that claimed the post died or hung
+    mid-publish, so the post is retried (at-least-once delivery). The attempt
+    still counts, so a post that keeps killing its worker ends up dead-lettered.
+    """
+    cursor.execute("""
+        UPDATE content_calendar
+        SET status = CASE WHEN attempts >= %s THEN 'dead_letter' ELSE 'retrying' END,
+            next_attempt_at = CASE WHEN attempts >= %s THEN NULL ELSE NOW() END,
+            last_error = 'Publishing lease expired before the post was released',
+            claimed_by = NULL,
+            lease_expires_at = NULL
+        WHERE status = 'publishing'
+        AND lease_expires_at < NOW()
+    """, (MAX_PUBLISH_ATTEMPTS, MAX_PUBLISH_ATTEMPTS))
+    return cursor.rowcount
+
+
+def claim_due_posts(cursor, worker_id: str, limit: int = CLAIM_BATCH_SIZE) -> list:
+    """
+    Atomically claim up to `limit` due posts for this worker
+
+    FOR UPDATE SKIP LOCKED makes concurrent schedulers take disjoint batches
+    instead of blocking on (or double-publishing) each other's rows.
+
+    The same statement prefetches everything publishing needs: the library
+    content and the credentials of each distinct (user, platform) account,
+    so a batch costs one round trip instead of two queries per post.
+    """
+    cursor.execute("""
+        WITH claimed AS (
+            UPDATE content_calendar c
+            SET status = 'publishing',
+                attempts = c.attempts + 1,
+                claimed_by = %s,
+                lease_expires_at = NOW() + make_interval(secs => %s)
+            FROM (
+                SELECT id
+                FROM content_calendar
+                WHERE (status = 'scheduled' AND scheduled_date <= NOW())
+                OR (status = 'retrying' AND next_attempt_at <= NOW())
+                ORDER BY scheduled_date ASC
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            ) due
+            WHERE c.id = due.id
+            RETURNING
+                c.id,
+                c.user_id,
+                c.content_id,
+                c.title,
+                c.content_type,
+                c.platform,
+                -- utils.platforms.service_type_for(), e.g. x -> twitter
+                COALESCE(%s::jsonb ->> lower(c.platform), lower(c.platform)) AS service_type,
+                c.scheduled_date,
+                c.notes,
+                c.attempts
+        ),
+        accounts AS (
+            SELECT DISTINCT ON (cs.user_id, cs.service_type)
+                cs.user_id,
+                cs.service_type,
+                cs.access_token,
+                cs.refresh_token,
+                cs.token_expires_at,
+                cs.service_id,
+                cs.service_metadata,
+                cs.is_active
+            FROM connected_services cs
+            JOIN (SELECT DISTINCT user_id, service_type FROM claimed) wanted
+                ON wanted.user_id = cs.user_id AND wanted.service_type = cs.service_type
+            WHERE cs.is_active = true
+            ORDER BY cs.user_id, cs.service_type, cs.connected_at DESC
+        )
+        SELECT
+            claimed.*,
+            cl.content AS library_content,
+            accounts.service_type IS NOT NULL AS has_credentials,
+            accounts.access_token,
+            accounts.refresh_token,
+            accounts.token_expires_at,
+            accounts.service_id,
+            accounts.service_metadata,
+            accounts.is_active
+        FROM claimed
+        LEFT JOIN content_library cl
+            ON cl.id = claimed.content_id AND cl.user_id = claimed.user_id
+        LEFT JOIN accounts
+            ON accounts.user_id = claimed.user_id AND accounts.service_type = claimed.service_type
+        ORDER BY claimed.scheduled_date ASC
+    """, (worker_id, CLAIM_LEASE_SECONDS, limit, json.dumps(PLATFORM_ALIASES)))
+
+    return cursor.fetchall()
+
+
+def claim_post(cursor, post_id, user_id: str, worker_id: str):
+    """
+    Claim one of the user's posts for an immediate (manual) publish
+
+    Same transition as claim_due_posts(), so a post the scheduler holds, or
+    one already published, is never picked up twice. Drafts and dead-lettered
+    posts can be published by hand too; a dead-lettered post starts a fresh
+    attempt count. Release it with finish_post().
+
+    Returns:
+        The claimed row, or None if the post is missing or not publishable
+    """
+    cursor.execute("""
+        UPDATE content_calendar
+        SET status = 'publishing',
+            attempts = CASE WHEN status = 'dead_letter' THEN 1 ELSE attempts + 1 END,
+            claimed_by = %s,
+            lease_expires_at = NOW() + make_interval(secs => %s)
+        WHERE id = %s
+        AND user_id = %s
+        AND status IN ('draft', 'scheduled', 'retrying', 'failed', 'dead_letter')
+        RETURNING id, title, content_type, platform, content, media_url, notes
+    """, (worker_id, CLAIM_LEASE_SECONDS, post_id, user_id))
+    return cursor.fetchone()
+
+
+def new_worker_id() -> str:
+    """Unique owner for one run's claims (host:pid:random)"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def renew_claim(cursor, post_id, worker_id: str) -> bool:
+    """
+    Extend this worker's lease right before publishing
+
+    Returns False if the claim was lost (lease expired and the post was
+    recovered by another run), in which case the post must not be published.
+    """
+    cursor.execute("""
+        UPDATE content_calendar
+        SET lease_expires_at = NOW() + make_interval(secs => %s)
+        WHERE id = %s
+        AND status = 'publishing'
+        AND claimed_by = %s
+    """, (CLAIM_LEASE_SECONDS, post_id, worker_id))
+    return cursor.rowcount == 1
+
+
+def finish_post(cursor, post_id, worker_id: str, status: str, error: str = None,
+                retry_in: float = None) -> bool:
+    """
+    Release a claimed post with its outcome
+
+    The error goes to last_error - notes hold the post text and are never
+    overwritten. Only applies while this worker still holds the claim - if
+    the lease expired and another worker took the post over, the update is
+    skipped. A retry notifies the dispatcher in the same transaction: it is
+    sleeping until the claim's lease expires, not until next_attempt_at.
+
+    Args:
+        status: 'published', 'retrying', 'failed' or 'dead_letter'
+        error: Why the attempt failed (cleared on success)
+        retry_in: Seconds until the next attempt (status 'retrying' only)
+    """
+    cursor.execute("""
+        UPDATE content_calendar
+        SET status = %s,
+            last_error = %s,
+            next_attempt_at = NOW() + make_interval(secs => %s),
+            claimed_by = NULL,
+            lease_expires_at = NULL,
+            updated_at = NOW()
+        WHERE id = %s
+        AND status = 'publishing'
+        AND claimed_by = %s
+    """, (status, error, retry_in, post_id, worker_id))
+
+    if cursor.rowcount == 0:
+        logger.warning(f"⚠️  Lost claim on post {post_id} before marking it {status}")
+        return False
+
+    if status == 'retrying':
+        notify_schedule_changed(cursor, post_id)
+    return True
+
+
+# Same shape as publisher.get_user_service_credentials()
+CREDENTIAL_COLUMNS = ('access_token', 'refresh_token', 'token_expires_at', 'service_id', 'service_metadata', 'is_active')
+
+
+def build_publish_jobs(rows: list) -> list:
+    """
+    Turn claimed rows into publish jobs (text + credentials per post)
+
+    Posts for the same (user, platform) share one credentials dict.
+    """
+    accounts = {}
+    jobs = []
+
+    for row in rows:
+        notes = row['notes']
+
+        if row['content_id'] and row['library_content'] is not None:
+            content_json = row['library_content']
+            post_content = content_json.get('text', '') if isinstance(content_json, dict) else notes
+        elif row['content_id']:
+            post_content = notes  # Fallback to notes if content not found
+        else:
+            # No content_id, use notes as content
+            post_content = notes if notes else row['title']
+
+        account = (str(row['user_id']), row['service_type'])
+        if account not in accounts:
+            accounts[account] = (
+                {column: row[column] for column in CREDENTIAL_COLUMNS} if row['has_credentials'] else None
+            )
+
+        jobs.append({
+            'id': row['id'],
+            'user_id': row['user_id'],
+            'title': row['title'],
+            'platform': row['service_type'],
+            'scheduled_date': row['scheduled_date'],
+            'attempts': row['attempts'],
+            'content': post_content,
+            'credentials': accounts[account],
+        })
+
+    return jobs
+
+
+def _renew_claim(post_id, worker_id: str) -> bool:
+    with get_worker_db_connection() as conn:
+        cursor = conn.cursor()
+        renewed = renew_claim(cursor, post_id, worker_id)
+        conn.commit()
+        cursor.close()
+        return renewed
+
+
+def _finish_post(post_id, worker_id: str, status: str, error: str = None, retry_in: float = None) -> bool:
+    with get_worker_db_connection() as conn:
+        cursor = conn.cursor()
+        finished = finish_post(cursor, post_id, worker_id, status, error, retry_in)
+        conn.commit()
+        cursor.close()
+        return finished
+
+
+async def _mark_published(post_id, worker_id: str):
+    """
+    Release a successfully published post, retrying the update on database errors
+
+    Never raises: the platform already accepted the post, so a failure here
+    must not reach _fail_post and schedule it again. If every attempt fails
+    the claim is left as it is.
+    """
+    for attempt in range(FINISH_MAX_RETRIES + 1):
+        try:
+            await run_in_worker_pool(_finish_post, post_id, worker_id, 'published')
+            return
+        except Exception as e:
+            if attempt < FINISH_MAX_RETRIES:
+                logger.warning(f"⚠️  Failed to mark post {post_id} published ({e}) - retrying")
+                await asyncio.sleep(FINISH_RETRY_BASE_SECONDS * 2 ** attempt)
+            else:
+                logger.error(f"❌ Post {post_id} was published but could not be marked published: {e}")
+
+
+async def _fail_post(job: dict, worker_id: str, error: str) -> str:
+    """
+    Schedule a retry, or give up on the post
+
+    Returns:
+        str: 'retrying', 'failed' (permanent error), 'dead_letter' (out of
+        attempts) or 'skipped' (claim lost, nothing was recorded)
+    """
+    post_id = job['id']
+
+    if not is_transient_error(error):
+        status, retry_in = 'failed', None
+    elif job['attempts'] >= MAX_PUBLISH_ATTEMPTS:
+        status, retry_in = 'dead_letter', None
+    else:
+        status, retry_in = 'retrying', retry_delay(job['attempts'])
+
+    if not await run_in_worker_pool(_finish_post, post_id, worker_id, status, error, retry_in):
+        # Lease lost - whoever holds the post now decides what happens to it
+        return 'skipped'
+
+    if status == 'retrying':
+        logger.warning(
+            f"🔁 Publish attempt {job['attempts']}/{MAX_PUBLISH_ATTEMPTS} for post {post_id} failed "
+            f"({error}) - retrying in {retry_in:.0f}s"
+        )
+    elif status == 'dead_letter':
+        logger.error(f"☠️  Post {post_id} dead-lettered after {job['attempts']} attempts: {error}")
+    else:
+        logger.error(f"❌ Post {post_id} failed permanently: {error}")
+
+    return status
+
+
+class PublishLimits:
+    """Semaphores for one scheduler run (created inside its event loop)"""
+
+    def __init__(self):
+        self.overall = asyncio.Semaphore(PUBLISH_CONCURRENCY)
+        self._platforms = {}
+        self._accounts = {}
+
+    def platform(self, platform: str) -> asyncio.Semaphore:
+        if platform not in self._platforms:
+            limit = PLATFORM_CONCURRENCY.get(platform, DEFAULT_PLATFORM_CONCURRENCY)
+            self._platforms[platform] = asyncio.Semaphore(limit)
+        return self._platforms[platform]
+
+    def account(self, platform: str, user_id) -> asyncio.Semaphore:
+        key = (platform, str(user_id))
+        if key not in self._accounts:
+            self._accounts[key] = asyncio.Semaphore(ACCOUNT_CONCURRENCY)
+        return self._accounts[key]
+
+
+async def publish_claimed_post(job: dict, worker_id: str, limits) -> str:
+    """
+    Publish one claimed post under its account, platform and global limits
+
+    Returns:
+        str: 'published', 'retrying', 'failed', 'dead_letter' or 'skipped' (claim lost)
+    """
+    post_id = job['id']
+    title = job['title']
+    platform = job['platform']
+
+    # Narrowest limit first so a queued post never sits on a global slot
+    async with limits.account(platform, job['user_id']), limits.platform(platform), limits.overall:
+        try:
+            # Earlier posts may have used up most of the lease while this one queued
+            if not await run_in_worker_pool(_renew_claim, post_id, worker_id):
+                logger.warning(f"⚠️  Lost claim on post {post_id}, skipping")
+                return 'skipped'
+
+            if not job['credentials']:
+                logger.error(f"❌ No OAuth token found for user {job['user_id']} on {platform}")
+                return await _fail_post(job, worker_id, 'No OAuth token found')
+
+            logger.info(f"🚀 Publishing: {title} to {platform}")
+
+            publish_result = await publish_post(
+                user_id=job['user_id'],
+                platform=platform,
+                content=job['content'],
+                credentials=job['credentials']
+            )
+
+            if publish_result['success']:
+                logger.info(f"✅ Published: {title} to {platform}")
+                await _mark_published(post_id, worker_id)
+                return 'published'
+
+            error_msg = publish_result.get('error', 'Unknown error')
+            logger.error(f"❌ Failed to publish {title}: {error_msg}")
+            return await _fail_post(job, worker_id, f"Failed: {error_msg}")
+
+        except Exception as post_error:
+            logger.error(f"❌ Error publishing post {post_id}: {post_error}")
+            try:
+                return await _fail_post(job, worker_id, f"Error: {str(post_error)}")
+            except Exception as update_error:
+                # Claim stays 'publishing' until its lease expires, then it is retried
+                logger.error(f"❌ Failed to update status: {update_error}")
+                return 'failed'
+
+
+async def publish_claimed_posts(jobs: list, worker_id: str) -> dict:
+    """Publish a batch of claimed posts concurrently, returning outcome counts"""
+    limits = PublishLimits()
+    # Posts in the batch share warm connections per platform
+    async with http_client_scope():
+        outcomes = await asyncio.gather(*(
+            publish_claimed_post(job, worker_id, limits) for job in jobs
+        ))
+
+    counts = {}
+    for outcome in outcomes:
+        counts[outcome] = counts.get(outcome, 0) + 1
+    return counts
+
+
+def claim_scheduled_posts():
     """
-    Check for scheduled posts that are due and publish them
-    Runs every minute via APScheduler
+    Claim the scheduled posts that are due, without publishing them
+    Safe to run on several instances - each post is claimed by one run
+
+    Returns:
+        (worker_id, jobs) for publish_scheduled_batch(), or None if nothing
+        was due or the claim failed
     """
     try:
         logger.info("🔍 Checking for scheduled posts...")
 
-        # Connect to database
-        DATABASE_URL = os.getenv("DATABASE_URL")
-        if not DATABASE_URL:
+        if not os.getenv("DATABASE_URL"):
             logger.error("❌ DATABASE_URL not set")
-            return
+            return None
 
-        conn = psycopg2.connect(DATABASE_URL)
-        cursor = conn.cursor()
+        worker_id = new_worker_id()
 
-        # Find scheduled posts that are due (scheduled_date <= now AND status='scheduled')
-        cursor.execute("""
-            SELECT
-                id,
-                user_id,
-                content_id,
-                title,
-                content_type,
-                platform,
-                scheduled_date,
-                notes
-            FROM content_calendar
-            WHERE status = 'scheduled'
-            AND scheduled_date <= NOW()
-            ORDER BY scheduled_date ASC
-            LIMIT 50
-        """)
-
-        due_posts = cursor.fetchall()
-
-        if not due_posts:
-            logger.info("✅ No scheduled posts due")
+        with get_worker_db_connection() as conn:
+            cursor = conn.cursor()
+
+            recovered = recover_expired_claims(cursor)
+            if recovered:
+                logger.warning(f"♻️  Recovered {recovered} post(s) with expired publishing leases")
+
+            # Claim (and prefetch) in its own short transaction so row locks are held for milliseconds
+            claimed = claim_due_posts(cursor, worker_id)
+            conn.commit()
             cursor.close()
-            conn.close()
-            return
 
-        logger.info(f"📬 Found {len(due_posts)} scheduled post(s) to publish")
+        if not claimed:
+            logger.info("✅ No scheduled posts due")
+            return None
 
-        # Process each scheduled post
-        for post in due_posts:
-            post_id, user_id, content_id, title, content_type, platform, scheduled_date, notes = post
+        jobs = build_publish_jobs(claimed)
+        accounts = len({(str(job['user_id']), job['platform']) for job in jobs})
+        logger.info(f"📬 Claimed {len(jobs)} scheduled post(s) for {accounts} account(s) ({worker_id})")
+        return worker_id, jobs
 
-            try:
-                logger.info(f"🚀 Publishing: {title} to {platform}")
-
-                # Get post content from content_library (if content_id provided)
-                if content_id:
-                    cursor.execute("""
-                        SELECT content
-                        FROM content_library
-                        WHERE id = %s AND user_id = %s
-                    """, (content_id, user_id))
-
-                    content_row = cursor.fetchone()
-                    if content_row:
-                        content_json = content_row[0]
-                        post_content = content_json.get('text', '') if isinstance(content_json, dict) else notes
-                    else:
-                        post_content = notes  # Fallback to notes if content not found
-                else:
-                    # No content_id, use notes as content
-                    post_content = notes if notes else title
-
-                # Get user's OAuth token for the platform
-                cursor.execute("""
-                    SELECT access_token, service_metadata
-                    FROM connected_services
-                    WHERE user_id = %s
-                    AND service_type = %s
-                    AND is_active = true
-                """, (user_id, platform))
-
-                token_row = cursor.fetchone()
-
-                if not token_row:
-                    logger.error(f"❌ No OAuth token found for user {user_id} on {platform}")
-                    # Mark as failed
-                    cursor.execute("""
-                        UPDATE content_calendar
-                        SET status = 'failed', notes = 'No OAuth token found'
-                        WHERE id = %s
-                    """, (post_id,))
-                    conn.commit()
-                    continue
-
-                access_token, service_metadata = token_row
-
-                # Publish the post via publisher
-                publish_result = publish_post(
-                    user_id=user_id,
-                    platform=platform,
-                    content=post_content,
-                    access_token=access_token,
-                    service_metadata=service_metadata
-                )
-
-                if publish_result['success']:
-                    # Mark as published
-                    cursor.execute("""
-                        UPDATE content_calendar
-                        SET status = 'published', updated_at = NOW()
-                        WHERE id = %s
-                    """, (post_id,))
-                    conn.commit()
-                    logger.info(f"✅ Published: {title} to {platform}")
-                else:
-                    # Mark as failed
-                    error_msg = publish_result.get('error', 'Unknown error')
-                    cursor.execute("""
-                        UPDATE content_calendar
-                        SET status = 'failed', notes = %s
-                        WHERE id = %s
-                    """, (f"Failed: {error_msg}", post_id))
-                    conn.commit()
-                    logger.error(f"❌ Failed to publish {title}: {error_msg}")
-
-            except Exception as post_error:
-                logger.error(f"❌ Error publishing post {post_id}: {post_error}")
-                # Mark as failed
-                try:
-                    cursor.execute("""
-                        UPDATE content_calendar
-                        SET status = 'failed', notes = %s
-                        WHERE id = %s
-                    """, (f"Error: {str(post_error)}", post_id))
-                    conn.commit()
-                except Exception as update_error:
-                    logger.error(f"❌ Failed to update status: {update_error}")
+    except Exception as e:
+        logger.error(f"❌ Error claiming scheduled posts: {e}")
+        return None
 
-        cursor.close()
-        conn.close()
-        logger.info("✅ Scheduled post check complete")
 
+def publish_scheduled_batch(batch) -> int:
+    """
+    Publish a batch from claim_scheduled_posts() concurrently
+
+    Returns:
+        Number of posts in the batch
+    """
+    worker_id, jobs = batch
+    try:
+        # Connection is back in the worker pool for the (slow) publishing phase
+        counts = asyncio.run(publish_claimed_posts(jobs, worker_id))
+        logger.info(f"✅ Scheduled post batch complete: {counts}")
     except Exception as e:
-        logger.error(f"❌ Error in scheduled post checker: {e}")
+        # Unreleased claims are retried once their lease expires
+        logger.error(f"❌ Error publishing scheduled posts: {e}")
+    return len(jobs)
 
 
-def publish_post(user_id: str, platform: str, content: str, access_token: str, service_metadata: dict) -> dict:
+def check_scheduled_posts():
+    """
+    Claim scheduled posts that are due and publish them concurrently
+
+    Returns:
+        Number of posts claimed (0 if none were due or the claim failed)
+    """
+    batch = claim_scheduled_posts()
+    if batch is None:
+        return 0
+    return publish_scheduled_batch(batch)
+
+
+async def publish_post(user_id: str, platform: str, content: str, credentials: dict) -> dict:
     """
     Publish a post to the specified platform
 
@@ -162,65 +580,28 @@ def publish_post(user_id: str, platform: str, content: str, access_token: str, s
         user_id: User ID
         platform: Platform name
         content: Post content (text)
-        access_token: OAuth access token
-        service_metadata: Platform-specific metadata (e.g., Facebook page_id)
+        credentials: connected_services row (access token and service_metadata)
 
     Returns:
         dict: {'success': bool, 'error': str (if failed)}
     """
     try:
-        # Import publisher classes
-        from routes.publisher import (
-            InstagramPublisher,
-            LinkedInPublisher,
-            TwitterPublisher,
-            FacebookPublisher,
-            TikTokPublisher,
-            YouTubePublisher,
-            RedditPublisher,
-            TumblrPublisher,
-            WordPressPublisher
+        # Imported here - routes.publisher pulls in the whole API stack
+        from routes.publisher import PublishRequest, publish_with_credentials
+
+        # Scheduled posts are text-only for now (Phase 5 will add media)
+        publish_request = PublishRequest(
+            platform=platform,
+            content_type='text',
+            caption=content or '',
         )
 
-        # Map platform to publisher class
-        publishers = {
-            'instagram': InstagramPublisher,
-            'linkedin': LinkedInPublisher,
-            'twitter': TwitterPublisher,
-            'x': TwitterPublisher,
-            'facebook': FacebookPublisher,
-            'tiktok': TikTokPublisher,
-            'youtube': YouTubePublisher,
-            'reddit': RedditPublisher,
-            'tumblr': TumblrPublisher,
-            'wordpress': WordPressPublisher
-        }
-
-        publisher_class = publishers.get(platform.lower())
-
-        if not publisher_class:
-            return {'success': False, 'error': f'Unknown platform: {platform}'}
-
-        # Create publisher instance
-        publisher = publisher_class(access_token)
-
-        # Prepare post data
-        post_data = {
-            'text': content,
-            'imageUrls': [],  # Scheduled posts are text-only for now (Phase 5 will add media)
-        }
-
-        # Add platform-specific data
-        if platform.lower() == 'facebook' and service_metadata:
-            post_data['page_id'] = service_metadata.get('selected_page_id')
-
-        if platform.lower() == 'reddit':
-            post_data['subreddit'] = service_metadata.get('subreddit', 'test')
-
-        # Publish
-        result = publisher.publish(post_data)
-
-        return {'success': True, 'result': result}
+        response = await publish_with_credentials(publish_request, credentials, user_id=str(user_id))
+
+        if not response.success:
+            return {'success': False, 'error': response.error or 'Unknown error'}
+
+        return {'success': True, 'result': response.model_dump()}
 
     except Exception as e:
         logger.error(f"❌ Publish error: {e}")